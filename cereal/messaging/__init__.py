@@ -99,6 +99,11 @@ class SubMaster:
     self.alive = {s: False for s in services}
     self.freq_ok = {s: False for s in services}
     self.recv_dts: Dict[str, Deque[float]] = {}
+    self.recv_dts_sum: Dict[str, float] = {}
+    self.recent_dts_sum: Dict[str, float] = {}
+    self.recent_dts_len: Dict[str, int] = {}
+    self.recv_dts_count: Dict[str, int] = {}
+    self.alive_timeout: Dict[str, float] = {}
     self.sock = {}
     self.data = {}
     self.valid = {}
@@ -116,6 +121,9 @@ class SubMaster:
     self.ignore_valid = [] if ignore_valid is None else ignore_valid
 
     self.simulation = bool(int(os.getenv("SIMULATION", "0")))
+    self.checked_services = [s for s in services if SERVICE_LIST[s].frequency > 1e-5 and not self.simulation]
+    self.unchecked_services = [s for s in services if s not in self.checked_services]
+    self.updated_services: List[str] = []
 
     # if freq and poll aren't specified, assume the max to be conservative
     assert frequency is None or poll is None, "Do not specify 'frequency' - frequency of the polled service will be used."
@@ -149,6 +157,12 @@ class SubMaster:
       self.max_freq[s] = max_freq*1.2
       self.min_freq[s] = min_freq*0.8
       self.recv_dts[s] = deque(maxlen=int(10*freq))
+      self.recv_dts_sum[s] = 0.
+      self.recent_dts_sum[s] = 0.
+      self.recent_dts_len[s] = int(self.recv_dts[s].maxlen / 10)
+      self.recv_dts_count[s] = 0
+      if s in self.checked_services:
+        self.alive_timeout[s] = 10. / SERVICE_LIST[s].frequency
 
   def __getitem__(self, s: str) -> capnp.lib.capnp._DynamicStructReader:
     return self.data[s]
@@ -166,9 +180,44 @@ class SubMaster:
       msgs.append(recv_one_or_none(self.sock[s]))
     self.update_msgs(time.monotonic(), msgs)
 
+  def _append_recv_dt(self, s: str, dt: float) -> None:
+    # keep running sums of the whole window and its most recent tenth
+    dts = self.recv_dts[s]
+    assert dts.maxlen is not None
+    if len(dts) == dts.maxlen:
+      self.recv_dts_sum[s] -= dts[0]
+    if len(dts) >= self.recent_dts_len[s]:
+      self.recent_dts_sum[s] -= dts[-self.recent_dts_len[s]]
+    dts.append(dt)
+    self.recv_dts_sum[s] += dt
+    self.recent_dts_sum[s] += dt
+
+    # resync once per window so float error can't accumulate
+    self.recv_dts_count[s] += 1
+    if self.recv_dts_count[s] % dts.maxlen == 0:
+      self.recv_dts_sum[s] = sum(dts)
+      self.recent_dts_sum[s] = sum(dts[i] for i in range(-min(self.recent_dts_len[s], len(dts)), 0))
+
+  def _update_freq_ok(self, s: str) -> None:
+    # check average frequency; slow to fall, quick to recover
+    n = len(self.recv_dts[s])
+    n_recent = min(n, self.recent_dts_len[s])
+    try:
+      avg_freq = 1 / (self.recv_dts_sum[s] / n)
+      avg_freq_recent = 1 / (self.recent_dts_sum[s] / n_recent)
+    except ZeroDivisionError:
+      avg_freq = 0
+      avg_freq_recent = 0
+
+    avg_freq_ok = self.min_freq[s] <= avg_freq <= self.max_freq[s]
+    recent_freq_ok = self.min_freq[s] <= avg_freq_recent <= self.max_freq[s]
+    self.freq_ok[s] = avg_freq_ok or recent_freq_ok
+
   def update_msgs(self, cur_time: float, msgs: List[capnp.lib.capnp._DynamicStructReader]) -> None:
     self.frame += 1
-    self.updated = dict.fromkeys(self.updated, False)
+    for s in self.updated_services:
+      self.updated[s] = False
+    self.updated_services = []
     for msg in msgs:
       if msg is None:
         continue
@@ -176,40 +225,31 @@ class SubMaster:
       s = msg.which()
       self.seen[s] = True
       self.updated[s] = True
+      self.updated_services.append(s)
 
       if self.recv_time[s] > 1e-5:
-        self.recv_dts[s].append(cur_time - self.recv_time[s])
+        self._append_recv_dt(s, cur_time - self.recv_time[s])
       self.recv_time[s] = cur_time
       self.recv_frame[s] = self.frame
       self.data[s] = getattr(msg, s)
       self.logMonoTime[s] = msg.logMonoTime
       self.valid[s] = msg.valid
 
-    for s in self.data:
-      if SERVICE_LIST[s].frequency > 1e-5 and not self.simulation:
-        # alive if delay is within 10x the expected frequency
-        self.alive[s] = (cur_time - self.recv_time[s]) < (10. / SERVICE_LIST[s].frequency)
-
-        # check average frequency; slow to fall, quick to recover
-        dts = self.recv_dts[s]
-        assert dts.maxlen is not None
-        recent_dts = list(dts)[-int(dts.maxlen / 10):]
-        try:
-          avg_freq = 1 / (sum(dts) / len(dts))
-          avg_freq_recent = 1 / (sum(recent_dts) / len(recent_dts))
-        except ZeroDivisionError:
-          avg_freq = 0
-          avg_freq_recent = 0
-
-        avg_freq_ok = self.min_freq[s] <= avg_freq <= self.max_freq[s]
-        recent_freq_ok = self.min_freq[s] <= avg_freq_recent <= self.max_freq[s]
-        self.freq_ok[s] = avg_freq_ok or recent_freq_ok
+    for s in self.checked_services:
+      # alive if delay is within 10x the expected frequency
+      self.alive[s] = (cur_time - self.recv_time[s]) < self.alive_timeout[s]
+
+    # the average frequencies only change when a new message is received
+    for s in (self.checked_services if self.frame == 0 else self.updated_services):
+      if s in self.alive_timeout:
+        self._update_freq_ok(s)
+
+    for s in self.unchecked_services:
+      self.freq_ok[s] = True
+      if self.simulation:
+        self.alive[s] = self.seen[s] # alive is defined as seen when simulation flag set
       else:
-        self.freq_ok[s] = True
-        if self.simulation:
-          self.alive[s] = self.seen[s] # alive is defined as seen when simulation flag set
-        else:
-          self.alive[s] = True
+        self.alive[s] = True
 
   def all_alive(self, service_list: Optional[List[str]] = None) -> bool:
     if service_list is None:
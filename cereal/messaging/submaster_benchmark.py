@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+from unittest import mock
+
+import cereal.messaging as messaging
+from cereal.services import SERVICE_LIST
+
+# controlsd's SubMaster
+SERVICES = ['deviceState', 'pandaStates', 'peripheralState', 'modelV2', 'liveCalibration', 'carOutput', 'driverMonitoringState',
+            'longitudinalPlan', 'liveLocationKalman', 'managerState', 'liveParameters', 'radarState', 'liveTorqueParameters',
+            'testJoystick', 'frogpilotCarState', 'frogpilotPlan', 'roadCameraState', 'driverCameraState', 'wideRoadCameraState',
+            'accelerometer', 'gyroscope']
+IGNORE = ['accelerometer', 'gyroscope', 'testJoystick']
+DT_CTRL = 0.01
+
+
+class PreviousSubMaster(messaging.SubMaster):
+  """update_msgs before receive frequencies were tracked incrementally"""
+  def update_msgs(self, cur_time, msgs):
+    self.frame += 1
+    self.updated = dict.fromkeys(self.updated, False)
+    for msg in msgs:
+      if msg is None:
+        continue
+
+      s = msg.which()
+      self.seen[s] = True
+      self.updated[s] = True
+
+      if self.recv_time[s] > 1e-5:
+        self.recv_dts[s].append(cur_time - self.recv_time[s])
+      self.recv_time[s] = cur_time
+      self.recv_frame[s] = self.frame
+      self.data[s] = getattr(msg, s)
+      self.logMonoTime[s] = msg.logMonoTime
+      self.valid[s] = msg.valid
+
+    for s in self.data:
+      if SERVICE_LIST[s].frequency > 1e-5 and not self.simulation:
+        self.alive[s] = (cur_time - self.recv_time[s]) < (10. / SERVICE_LIST[s].frequency)
+
+        dts = self.recv_dts[s]
+        assert dts.maxlen is not None
+        recent_dts = list(dts)[-int(dts.maxlen / 10):]
+        try:
+          avg_freq = 1 / (sum(dts) / len(dts))
+          avg_freq_recent = 1 / (sum(recent_dts) / len(recent_dts))
+        except ZeroDivisionError:
+          avg_freq = 0
+          avg_freq_recent = 0
+
+        avg_freq_ok = self.min_freq[s] <= avg_freq <= self.max_freq[s]
+        recent_freq_ok = self.min_freq[s] <= avg_freq_recent <= self.max_freq[s]
+        self.freq_ok[s] = avg_freq_ok or recent_freq_ok
+      else:
+        self.freq_ok[s] = True
+        if self.simulation:
+          self.alive[s] = self.seen[s]
+        else:
+          self.alive[s] = True
+
+
+def make_sub_master(cls):
+  with mock.patch.object(messaging, "Poller", lambda: None), \
+       mock.patch.object(messaging, "sub_sock", lambda *args, **kwargs: None):
+    return cls(SERVICES, ignore_alive=IGNORE, ignore_avg_freq=IGNORE + ['radarState', 'testJoystick'], ignore_valid=['testJoystick'],
+               frequency=int(1 / DT_CTRL))
+
+
+def new_event(s, valid):
+  try:
+    return messaging.new_message(s, valid=valid).as_reader()
+  except Exception:
+    # list services
+    return messaging.new_message(s, 1, valid=valid).as_reader()
+
+
+def replay(seconds, seed):
+  """
+  controlsd's 100Hz ticks with every service arriving at its frequency with jitter. A few services drop out, come back
+  slowed down or turn invalid for a while, so alive, freq_ok and valid all change during the replay.
+  Returns the messages received on each tick and the tick times.
+  """
+  rng = random.Random(seed)
+  events = {s: (new_event(s, True), new_event(s, False)) for s in SERVICES}
+  next_time = {s: rng.uniform(0, 1 / SERVICE_LIST[s].frequency) for s in SERVICES if SERVICE_LIST[s].frequency > 0}
+  start = 1000.
+
+  ticks = []
+  for tick in range(int(seconds / DT_CTRL)):
+    t = tick * DT_CTRL
+    msgs = []
+    for s, due in next_time.items():
+      if due > t:
+        continue
+      period = 1 / SERVICE_LIST[s].frequency
+      phase = (t + 7 * SERVICES.index(s)) % 60
+      if s in ('modelV2', 'radarState') and 20 < phase < 23:
+        # drops out
+        next_time[s] = t + period
+        continue
+      if s in ('liveLocationKalman', 'roadCameraState') and 35 < phase < 45:
+        # arrives at half rate
+        period *= 2
+      valid = not (s == 'longitudinalPlan' and 50 < phase < 52)
+      msgs.append(events[s][0 if valid else 1])
+      next_time[s] = due + period * rng.uniform(0.8, 1.2)
+    # conflated sockets return at most one message per service, polled in whatever order
+    rng.shuffle(msgs)
+    ticks.append((start + t + rng.uniform(0, 2e-3), msgs))
+  return ticks
+
+
+def time_replay(sm, ticks):
+  t = time.perf_counter()
+  for cur_time, msgs in ticks:
+    sm.update_msgs(cur_time, msgs)
+  return (time.perf_counter() - t) / len(ticks)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Replays controlsd's services at their frequencies through SubMaster.update_msgs, compares the "
+                                               "time per tick with the previous implementation and checks that both give the same state",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--seconds", type=float, default=300.)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  ticks = replay(args.seconds, args.seed)
+
+  before, after = make_sub_master(PreviousSubMaster), make_sub_master(messaging.SubMaster)
+  changes, all_checks = 0, None
+  for frame, (cur_time, msgs) in enumerate(ticks):
+    before.update_msgs(cur_time, msgs)
+    after.update_msgs(cur_time, msgs)
+    for name in ('alive', 'freq_ok', 'valid', 'updated'):
+      assert getattr(after, name) == getattr(before, name), f"{name} differs on tick {frame}: {getattr(before, name)} != {getattr(after, name)}"
+    changes += before.all_checks() != all_checks
+    all_checks = before.all_checks()
+  print(f"alive, freq_ok, valid and updated identical on all {len(ticks)} ticks, all_checks() changed {changes} times")
+
+  before_s = time_replay(make_sub_master(PreviousSubMaster), ticks)
+  after_s = time_replay(make_sub_master(messaging.SubMaster), ticks)
+  print(f"update_msgs: {before_s * 1e6:.1f} us before, {after_s * 1e6:.1f} us after per tick ({before_s / after_s:.1f}x)")
@@ -0,0 +1,114 @@
+import atexit
+import threading
+from enum import IntEnum
+
+from openpilot.common.params import Params
+
+FLUSH_INTERVAL = 5.  # seconds a coalesced write may wait before it is put
+
+
+class Durability(IntEnum):
+  VOLATILE = 0   # put_nonblocking right away, the caller doesn't wait for the fsync
+  COALESCED = 1  # only the latest value of the window is put, within FLUSH_INTERVAL
+  DURABLE = 2    # Params.put before put returns
+
+
+class ParamsWriter:
+  """
+  Writes params for processes that update them often, always through Params.put or Params.put_nonblocking.
+  Coalesced keys only keep their latest value until the next flush. A write is skipped when the stored
+  value is already the same, which is read back from disk each time since other processes may write the key too.
+  """
+  def __init__(self, params: Params | None = None, durability: dict[str, Durability] | None = None,
+               default: Durability = Durability.COALESCED, flush_interval: float = FLUSH_INTERVAL):
+    self.params = params if params is not None else Params()
+    self.durability = durability or {}
+    self.default = default
+    self.flush_interval = flush_interval
+
+    self.lock = threading.Lock()
+    self.flush_lock = threading.Lock()
+    self.pending: dict[str, bytes] = {}
+    # last value handed to put_nonblocking, which may not be on disk yet
+    self.queued: dict[str, bytes] = {}
+    self.writes = 0
+
+    self.stop = threading.Event()
+    self.flush_thread: threading.Thread | None = None
+    atexit.register(self.close)
+
+  def put(self, key: str, dat: str | bytes) -> None:
+    self.params.check_key(key)
+    dat = dat.encode() if isinstance(dat, str) else dat
+    durability = self.durability.get(key, self.default)
+
+    with self.lock:
+      if durability == Durability.COALESCED:
+        self.pending[key] = dat
+        self._start_flush_thread()
+        return
+
+      # an older value may still be queued to be written after the read
+      if self.queued.get(key, dat) == dat and self.params.get(key) == dat:
+        return
+
+      if durability == Durability.DURABLE:
+        self.params.put(key, dat)
+      else:
+        self.params.put_nonblocking(key, dat)
+        self.queued[key] = dat
+      self.writes += 1
+
+  def put_bool(self, key: str, val: bool) -> None:
+    self.put(key, b"1" if val else b"0")
+
+  def put_int(self, key: str, val: int) -> None:
+    self.put(key, str(int(val)))
+
+  def put_float(self, key: str, val: float) -> None:
+    # same format as Params.put_float
+    self.put(key, f"{val:f}")
+
+  def remove(self, key: str) -> None:
+    with self.lock:
+      self.pending.pop(key, None)
+      self.queued.pop(key, None)
+      self.params.remove(key)
+
+  def flush(self) -> None:
+    # puts only wait for the lock, not for the writes
+    with self.flush_lock:
+      with self.lock:
+        pending, self.pending = self.pending, {}
+
+      for key, dat in pending.items():
+        if self.params.get(key) == dat:
+          continue
+        try:
+          self.params.put(key, dat)
+        except Exception:
+          with self.lock:
+            # retry on the next flush, unless it was written again since
+            self.pending.setdefault(key, dat)
+          raise
+        with self.lock:
+          self.writes += 1
+
+  def close(self) -> None:
+    self.stop.set()
+    if self.flush_thread is not None and self.flush_thread is not threading.current_thread():
+      self.flush_thread.join()
+    self.flush()
+
+  def _start_flush_thread(self) -> None:
+    if self.flush_thread is None and not self.stop.is_set():
+      self.flush_thread = threading.Thread(target=self._flush_loop, name="params_writer", daemon=True)
+      self.flush_thread.start()
+
+  def _flush_loop(self) -> None:
+    while not self.stop.wait(self.flush_interval):
+      try:
+        self.flush()
+      except Exception:
+        pass
+
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+from collections import defaultdict
+from unittest import mock
+
+from openpilot.common.params_writer import FLUSH_INTERVAL, Durability, ParamsWriter
+
+# durability of the keys each process writes through its ParamsWriter, everything else is the default
+PROCESSES = {
+  "hardwared": {"IsEngaged": Durability.VOLATILE, "NetworkMetered": Durability.VOLATILE},
+  "paramsd": {},
+  "torqued": {},
+  "calibrationd": {},
+}
+DEFAULT = Durability.COALESCED
+# process writing each key in the simulation
+KEY_PROCESS = {"IsEngaged": "hardwared", "NetworkMetered": "hardwared", "LiveParameters": "paramsd", "LiveTorqueParameters": "torqued",
+               "CalibrationParams": "calibrationd"}
+DT = 0.05
+
+
+class FsyncParams:
+  """
+  The Params calls ParamsWriter and the processes use, with the write protocol of params.cc in Python so that
+  its fsyncs go through os.fsync: write a temp file, fsync it, rename it over the key and fsync the directory.
+  put_nonblocking does the same put, params.cc only does it on another thread.
+  """
+  def __init__(self, path):
+    self.path = path
+    # key of the put in progress, its fsyncs are counted for it
+    self.writing: str | None = None
+
+  def check_key(self, key):
+    return True
+
+  def get(self, key):
+    try:
+      with open(os.path.join(self.path, key), "rb") as f:
+        return f.read()
+    except FileNotFoundError:
+      return None
+
+  def put(self, key, dat):
+    dat = dat.encode() if isinstance(dat, str) else dat
+    self.writing = key
+    tmp_path = os.path.join(self.path, f".tmp_value_{key}")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+      os.write(fd, dat)
+      os.fsync(fd)
+    finally:
+      os.close(fd)
+    os.rename(tmp_path, os.path.join(self.path, key))
+    dir_fd = os.open(self.path, os.O_RDONLY)
+    try:
+      os.fsync(dir_fd)
+    finally:
+      os.close(dir_fd)
+    self.writing = None
+
+  def put_nonblocking(self, key, dat):
+    self.put(key, dat)
+
+  def put_bool(self, key, val):
+    self.put(key, b"1" if val else b"0")
+
+  def put_bool_nonblocking(self, key, val):
+    self.put_nonblocking(key, b"1" if val else b"0")
+
+  def remove(self, key):
+    try:
+      os.remove(os.path.join(self.path, key))
+    except FileNotFoundError:
+      pass
+
+
+def drive(minutes, seed, params, writers):
+  """
+  Simulated driving with the writes each process makes. Without writers, the processes call Params like they
+  did before ParamsWriter, otherwise they go through their writer. Returns the fsyncs of each key.
+  """
+  rng = random.Random(seed)
+  fsyncs: dict[str, int] = defaultdict(int)
+  real_fsync = os.fsync
+
+  def counting_fsync(fd):
+    if params.writing is not None:
+      fsyncs[params.writing] += 1
+    real_fsync(fd)
+
+  with mock.patch.object(os, "fsync", counting_fsync):
+    engaged = False
+    for frame in range(int(minutes * 60 / DT)):
+      # hardwared runs at 2Hz, engagement changes every few seconds while driving
+      if frame % 10 == 0:
+        if rng.random() < 0.1:
+          engaged = not engaged
+          if writers is None:
+            params.put_bool("IsEngaged", engaged)
+          else:
+            writers["hardwared"].put_bool("IsEngaged", engaged)
+        if writers is None:
+          params.put_bool_nonblocking("NetworkMetered", False)
+        else:
+          writers["hardwared"].put_bool("NetworkMetered", False)
+
+      # another process resetting IsEngaged, which hardwared has to write again. Not counted, it's the same either way
+      if frame % 1200 == 600:
+        with mock.patch.object(os, "fsync", real_fsync):
+          params.put_bool("IsEngaged", not engaged)
+
+      # paramsd and torqued once a minute, calibrationd every 50 seconds
+      writes = []
+      if frame % 1200 == 0:
+        writes.append(("paramsd", "LiveParameters", json.dumps({"steerRatio": 15 + rng.random()})))
+        writes.append(("torqued", "LiveTorqueParameters", rng.randbytes(4096)))
+      if frame % 1000 == 500:
+        writes.append(("calibrationd", "CalibrationParams", rng.randbytes(256)))
+      for process, key, dat in writes:
+        if writers is None:
+          params.put_nonblocking(key, dat)
+        else:
+          writers[process].put(key, dat)
+
+      if writers is not None and frame % int(FLUSH_INTERVAL / DT) == 0:
+        for writer in writers.values():
+          writer.flush()
+
+    if writers is not None:
+      for writer in writers.values():
+        writer.flush()
+  return fsyncs
+
+
+def run(minutes, seed, use_writers):
+  path = tempfile.mkdtemp(prefix="params_writer_")
+  try:
+    params = FsyncParams(path)
+    writers = None
+    if use_writers:
+      writers = {process: ParamsWriter(params, durability, DEFAULT) for process, durability in PROCESSES.items()}
+      for writer in writers.values():
+        # flushed by the simulated clock
+        writer.stop.set()
+    fsyncs = drive(minutes, seed, params, writers)
+    stored = {key: params.get(key) for key in os.listdir(path)}
+    return fsyncs, stored
+  finally:
+    shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Counts the fsyncs per minute of simulated driving for each durability class, with the "
+                                               "previous direct Params calls and with ParamsWriter, and checks that both leave the same values",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--minutes", type=int, default=10)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--durability", nargs="*", default=[], metavar="KEY=CLASS", help="moves keys to another durability class, e.g. IsEngaged=DURABLE")
+  args = parser.parse_args()
+
+  for override in args.durability:
+    key, durability = override.split("=")
+    PROCESSES[KEY_PROCESS[key]][key] = Durability[durability]
+
+  before, before_stored = run(args.minutes, args.seed, use_writers=False)
+  after, after_stored = run(args.minutes, args.seed, use_writers=True)
+  assert before_stored == after_stored, f"stored params differ: {before_stored.keys() ^ after_stored.keys() or before_stored}"
+
+  classes = {key: next((d[key] for d in PROCESSES.values() if key in d), DEFAULT) for key in before.keys() | after.keys()}
+  print(f"{'durability':<12} {'keys':<50} {'fsyncs/min before':>18} {'fsyncs/min after':>17}")
+  for durability in Durability:
+    keys = sorted(k for k, d in classes.items() if d == durability)
+    if not keys:
+      print(f"{durability.name:<12} {'(no key written)':<50}")
+      continue
+    print(f"{durability.name:<12} {', '.join(keys):<50} {sum(before[k] for k in keys) / args.minutes:18.1f} {sum(after[k] for k in keys) / args.minutes:17.1f}")
+  print(f"{'total':<63} {sum(before.values()) / args.minutes:18.1f} {sum(after.values()) / args.minutes:17.1f}")
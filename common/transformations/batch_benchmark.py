@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+import numpy as np
+
+from openpilot.common.transformations import coordinates, orientation, transformations
+
+ECEF_INIT = np.array([-2712470.0, -4262340.0, 3879690.0])
+LOCAL_COORD = coordinates.LocalCoord.from_ecef(ECEF_INIT)
+
+
+def random_quats(n):
+  quats = np.random.randn(n, 4)
+  return quats / np.linalg.norm(quats, axis=1, keepdims=True)
+
+
+def random_eulers(n):
+  return np.random.uniform(-np.pi / 2, np.pi / 2, (n, 3))
+
+
+def random_geodetic(n):
+  return np.column_stack([np.random.uniform(-80, 80, n), np.random.uniform(-180, 180, n), np.random.uniform(0, 1000, n)])
+
+
+def random_ecef(n):
+  return coordinates.geodetic2ecef(random_geodetic(n))
+
+
+# name, single function, input shape, output shape, leading args, input generator
+CASES = [
+  ("euler2quat", transformations.euler2quat_single, (3,), (4,), (), random_eulers),
+  ("quat2euler", transformations.quat2euler_single, (4,), (3,), (), random_quats),
+  ("quat2rot", transformations.quat2rot_single, (4,), (3, 3), (), random_quats),
+  ("rot2quat", transformations.rot2quat_single, (3, 3), (4,), (), lambda n: orientation.quat2rot(random_quats(n))),
+  ("euler2rot", transformations.euler2rot_single, (3,), (3, 3), (), random_eulers),
+  ("rot2euler", transformations.rot2euler_single, (3, 3), (3,), (), lambda n: orientation.euler2rot(random_eulers(n))),
+  ("ecef_euler_from_ned", transformations.ecef_euler_from_ned_single, (3,), (3,), (ECEF_INIT,), random_eulers),
+  ("ned_euler_from_ecef", transformations.ned_euler_from_ecef_single, (3,), (3,), (ECEF_INIT,), random_eulers),
+  ("geodetic2ecef", transformations.geodetic2ecef_single, (3,), (3,), (), random_geodetic),
+  ("ecef2geodetic", transformations.ecef2geodetic_single, (3,), (3,), (), random_ecef),
+  ("LocalCoord.ecef2ned", coordinates.LocalCoord_single.ecef2ned_single, (3,), (3,), (LOCAL_COORD,), random_ecef),
+  ("LocalCoord.ned2ecef", coordinates.LocalCoord_single.ned2ecef_single, (3,), (3,), (LOCAL_COORD,), lambda n: np.random.uniform(-1000, 1000, (n, 3))),
+]
+
+
+def wrapped_function(name):
+  if name.startswith("LocalCoord."):
+    return getattr(coordinates.LocalCoord, name.split(".")[1])
+  return getattr(orientation, name, None) or getattr(coordinates, name)
+
+
+def time_call(f, args, inp, min_time):
+  calls, start = 0, time.perf_counter()
+  while True:
+    out = f(*args, inp)
+    calls += 1
+    elapsed = time.perf_counter() - start
+    if elapsed >= min_time:
+      return out, elapsed / calls
+
+
+def benchmark(rows, min_time):
+  print(f"{'function':<24} {'rows':>7} {'per row us':>11} {'batch us':>11} {'speedup':>8}")
+  for name, single, input_shape, output_shape, args, generate in CASES:
+    per_row = orientation.numpy_wrap(single, input_shape, output_shape)
+    wrapped = wrapped_function(name)
+    has_batch = orientation.get_batch_function(coordinates.LocalCoord_single if name.startswith("LocalCoord.") else transformations,
+                                               name.split(".")[-1] + "_batch") is not None
+
+    for n in rows:
+      inp = generate(n)
+      expected, per_row_time = time_call(per_row, args, inp, min_time)
+      out, batch_time = time_call(wrapped, args, inp, min_time)
+      np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-9, err_msg=f"{name} diverged with {n} rows")
+
+      batch_column = f"{batch_time * 1e6:11.1f}" if has_batch else f"{'n/a':>11}"
+      speedup = f"{per_row_time / batch_time:7.2f}x" if has_batch else f"{'':>8}"
+      print(f"{name:<24} {n:>7} {per_row_time * 1e6:11.1f} {batch_column} {speedup}")
+
+  if not hasattr(transformations, "euler2quat_batch"):
+    print("transformations.so has no *_batch entry points, rebuild it from transformations.pyx to compare")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Compares the per row and the batch paths of the orientation and coordinate transforms",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 100_000])
+  parser.add_argument("--min-time", type=float, default=0.2, help="seconds to repeat each measurement for")
+  args = parser.parse_args()
+
+  benchmark(args.rows, args.min_time)
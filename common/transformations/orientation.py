@@ -1,6 +1,7 @@
 import numpy as np
 from collections.abc import Callable
 
+from openpilot.common.transformations import transformations
 from openpilot.common.transformations.transformations import (ecef_euler_from_ned_single,
                                                     euler2quat_single,
                                                     euler2rot_single,
@@ -11,36 +12,42 @@ from openpilot.common.transformations.transformations import (ecef_euler_from_ne
                                                     rot2quat_single)
 
 
-def numpy_wrap(function, input_shape, output_shape) -> Callable[..., np.ndarray]:
-  """Wrap a function to take either an input or list of inputs and return the correct shape"""
+def get_batch_function(owner, name):
+  """The *_batch entry point of transformations.so, None if the shipped .so predates them"""
+  return getattr(owner, name, None)
+
+
+def numpy_wrap(function, input_shape, output_shape, batch_function=None) -> Callable[..., np.ndarray]:
+  """Wrap a function to take either an input or list of inputs and return the correct shape.
+  Lists of inputs are converted in one call to batch_function when given."""
   def f(*inps):
     *args, inp = inps
     inp = np.array(inp)
     shape = inp.shape
 
+    # single input, skip the batching overhead
     if len(shape) == len(input_shape):
-      out_shape = output_shape
-    else:
-      out_shape = (shape[0],) + output_shape
+      result = np.asarray(function(*args, inp))
+      result.shape = output_shape
+      return result
 
-    # Add empty dimension if inputs is not a list
-    if len(shape) == len(input_shape):
-      inp.shape = (1, ) + inp.shape
+    if batch_function is not None:
+      return batch_function(*args, np.ascontiguousarray(inp, dtype=np.float64).reshape((shape[0],) + input_shape))
 
     result = np.asarray([function(*args, i) for i in inp])
-    result.shape = out_shape
+    result.shape = (shape[0],) + output_shape
     return result
   return f
 
 
-euler2quat = numpy_wrap(euler2quat_single, (3,), (4,))
-quat2euler = numpy_wrap(quat2euler_single, (4,), (3,))
-quat2rot = numpy_wrap(quat2rot_single, (4,), (3, 3))
-rot2quat = numpy_wrap(rot2quat_single, (3, 3), (4,))
-euler2rot = numpy_wrap(euler2rot_single, (3,), (3, 3))
-rot2euler = numpy_wrap(rot2euler_single, (3, 3), (3,))
-ecef_euler_from_ned = numpy_wrap(ecef_euler_from_ned_single, (3,), (3,))
-ned_euler_from_ecef = numpy_wrap(ned_euler_from_ecef_single, (3,), (3,))
+euler2quat = numpy_wrap(euler2quat_single, (3,), (4,), get_batch_function(transformations, "euler2quat_batch"))
+quat2euler = numpy_wrap(quat2euler_single, (4,), (3,), get_batch_function(transformations, "quat2euler_batch"))
+quat2rot = numpy_wrap(quat2rot_single, (4,), (3, 3), get_batch_function(transformations, "quat2rot_batch"))
+rot2quat = numpy_wrap(rot2quat_single, (3, 3), (4,), get_batch_function(transformations, "rot2quat_batch"))
+euler2rot = numpy_wrap(euler2rot_single, (3,), (3, 3), get_batch_function(transformations, "euler2rot_batch"))
+rot2euler = numpy_wrap(rot2euler_single, (3, 3), (3,), get_batch_function(transformations, "rot2euler_batch"))
+ecef_euler_from_ned = numpy_wrap(ecef_euler_from_ned_single, (3,), (3,), get_batch_function(transformations, "ecef_euler_from_ned_batch"))
+ned_euler_from_ecef = numpy_wrap(ned_euler_from_ecef_single, (3,), (3,), get_batch_function(transformations, "ned_euler_from_ecef_batch"))
 
 quats_from_rotations = rot2quat
 quat_from_rot = rot2quat
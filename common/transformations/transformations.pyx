@@ -111,6 +111,148 @@ def ecef2geodetic_single(ecef):
     return [g.lat, g.lon, g.alt]
 
 
+# batch versions of the above, taking (N, ...) arrays and looping over the rows natively
+
+cdef void matrix2buffer(Matrix3 m, double[:, ::1] out):
+    cdef int r, c
+    for r in range(3):
+        for c in range(3):
+            out[r, c] = m(r, c)
+
+cdef Matrix3 buffer2matrix(double[:, ::1] m):
+    # Eigen expects column major data, the rows of the transposed matrix
+    cdef double data[9]
+    cdef int r, c
+    for r in range(3):
+        for c in range(3):
+            data[c * 3 + r] = m[r, c]
+    return Matrix3(data)
+
+def euler2quat_batch(double[:, ::1] euler):
+    cdef Py_ssize_t i
+    cdef Quaternion q
+    out = np.empty((euler.shape[0], 4))
+    cdef double[:, ::1] o = out
+    for i in range(euler.shape[0]):
+        q = euler2quat_c(Vector3(euler[i, 0], euler[i, 1], euler[i, 2]))
+        o[i, 0] = q.w()
+        o[i, 1] = q.x()
+        o[i, 2] = q.y()
+        o[i, 3] = q.z()
+    return out
+
+def quat2euler_batch(double[:, ::1] quat):
+    cdef Py_ssize_t i
+    cdef Vector3 e
+    out = np.empty((quat.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(quat.shape[0]):
+        e = quat2euler_c(Quaternion(quat[i, 0], quat[i, 1], quat[i, 2], quat[i, 3]))
+        o[i, 0] = e(0)
+        o[i, 1] = e(1)
+        o[i, 2] = e(2)
+    return out
+
+def quat2rot_batch(double[:, ::1] quat):
+    cdef Py_ssize_t i
+    out = np.empty((quat.shape[0], 3, 3))
+    cdef double[:, :, ::1] o = out
+    for i in range(quat.shape[0]):
+        matrix2buffer(quat2rot_c(Quaternion(quat[i, 0], quat[i, 1], quat[i, 2], quat[i, 3])), o[i])
+    return out
+
+def rot2quat_batch(double[:, :, ::1] rot):
+    cdef Py_ssize_t i
+    cdef Quaternion q
+    out = np.empty((rot.shape[0], 4))
+    cdef double[:, ::1] o = out
+    for i in range(rot.shape[0]):
+        q = rot2quat_c(buffer2matrix(rot[i]))
+        o[i, 0] = q.w()
+        o[i, 1] = q.x()
+        o[i, 2] = q.y()
+        o[i, 3] = q.z()
+    return out
+
+def euler2rot_batch(double[:, ::1] euler):
+    cdef Py_ssize_t i
+    out = np.empty((euler.shape[0], 3, 3))
+    cdef double[:, :, ::1] o = out
+    for i in range(euler.shape[0]):
+        matrix2buffer(euler2rot_c(Vector3(euler[i, 0], euler[i, 1], euler[i, 2])), o[i])
+    return out
+
+def rot2euler_batch(double[:, :, ::1] rot):
+    cdef Py_ssize_t i
+    cdef Vector3 e
+    out = np.empty((rot.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(rot.shape[0]):
+        e = rot2euler_c(buffer2matrix(rot[i]))
+        o[i, 0] = e(0)
+        o[i, 1] = e(1)
+        o[i, 2] = e(2)
+    return out
+
+def ecef_euler_from_ned_batch(ecef_init, double[:, ::1] ned_pose):
+    cdef ECEF init = list2ecef(ecef_init)
+    cdef Py_ssize_t i
+    cdef Vector3 e
+    out = np.empty((ned_pose.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(ned_pose.shape[0]):
+        e = ecef_euler_from_ned_c(init, Vector3(ned_pose[i, 0], ned_pose[i, 1], ned_pose[i, 2]))
+        o[i, 0] = e(0)
+        o[i, 1] = e(1)
+        o[i, 2] = e(2)
+    return out
+
+def ned_euler_from_ecef_batch(ecef_init, double[:, ::1] ecef_pose):
+    cdef ECEF init = list2ecef(ecef_init)
+    cdef Py_ssize_t i
+    cdef Vector3 e
+    out = np.empty((ecef_pose.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(ecef_pose.shape[0]):
+        e = ned_euler_from_ecef_c(init, Vector3(ecef_pose[i, 0], ecef_pose[i, 1], ecef_pose[i, 2]))
+        o[i, 0] = e(0)
+        o[i, 1] = e(1)
+        o[i, 2] = e(2)
+    return out
+
+def geodetic2ecef_batch(double[:, ::1] geodetic):
+    cdef Py_ssize_t i
+    cdef Geodetic g
+    cdef ECEF e
+    out = np.empty((geodetic.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(geodetic.shape[0]):
+        g.lat = geodetic[i, 0]
+        g.lon = geodetic[i, 1]
+        g.alt = geodetic[i, 2]
+        e = geodetic2ecef_c(g)
+        o[i, 0] = e.x
+        o[i, 1] = e.y
+        o[i, 2] = e.z
+    return out
+
+def ecef2geodetic_batch(double[:, ::1] ecef):
+    cdef Py_ssize_t i
+    cdef ECEF e
+    cdef Geodetic g
+    out = np.empty((ecef.shape[0], 3))
+    cdef double[:, ::1] o = out
+    for i in range(ecef.shape[0]):
+        e.x = ecef[i, 0]
+        e.y = ecef[i, 1]
+        e.z = ecef[i, 2]
+        g = ecef2geodetic_c(e)
+        o[i, 0] = g.lat
+        o[i, 1] = g.lon
+        o[i, 2] = g.alt
+    return out
+
+
 cdef class LocalCoord:
     cdef LocalCoord_c * lc
 
@@ -169,5 +311,73 @@ cdef class LocalCoord:
         cdef Geodetic g = self.lc.ned2geodetic(n)
         return [g.lat, g.lon, g.alt]
 
+    def ecef2ned_batch(self, double[:, ::1] ecef):
+        assert self.lc
+        cdef Py_ssize_t i
+        cdef ECEF e
+        cdef NED n
+        out = np.empty((ecef.shape[0], 3))
+        cdef double[:, ::1] o = out
+        for i in range(ecef.shape[0]):
+            e.x = ecef[i, 0]
+            e.y = ecef[i, 1]
+            e.z = ecef[i, 2]
+            n = self.lc.ecef2ned(e)
+            o[i, 0] = n.n
+            o[i, 1] = n.e
+            o[i, 2] = n.d
+        return out
+
+    def ned2ecef_batch(self, double[:, ::1] ned):
+        assert self.lc
+        cdef Py_ssize_t i
+        cdef NED n
+        cdef ECEF e
+        out = np.empty((ned.shape[0], 3))
+        cdef double[:, ::1] o = out
+        for i in range(ned.shape[0]):
+            n.n = ned[i, 0]
+            n.e = ned[i, 1]
+            n.d = ned[i, 2]
+            e = self.lc.ned2ecef(n)
+            o[i, 0] = e.x
+            o[i, 1] = e.y
+            o[i, 2] = e.z
+        return out
+
+    def geodetic2ned_batch(self, double[:, ::1] geodetic):
+        assert self.lc
+        cdef Py_ssize_t i
+        cdef Geodetic g
+        cdef NED n
+        out = np.empty((geodetic.shape[0], 3))
+        cdef double[:, ::1] o = out
+        for i in range(geodetic.shape[0]):
+            g.lat = geodetic[i, 0]
+            g.lon = geodetic[i, 1]
+            g.alt = geodetic[i, 2]
+            n = self.lc.geodetic2ned(g)
+            o[i, 0] = n.n
+            o[i, 1] = n.e
+            o[i, 2] = n.d
+        return out
+
+    def ned2geodetic_batch(self, double[:, ::1] ned):
+        assert self.lc
+        cdef Py_ssize_t i
+        cdef NED n
+        cdef Geodetic g
+        out = np.empty((ned.shape[0], 3))
+        cdef double[:, ::1] o = out
+        for i in range(ned.shape[0]):
+            n.n = ned[i, 0]
+            n.e = ned[i, 1]
+            n.d = ned[i, 2]
+            g = self.lc.ned2geodetic(n)
+            o[i, 0] = g.lat
+            o[i, 1] = g.lon
+            o[i, 2] = g.alt
+        return out
+
     def __dealloc__(self):
         del self.lc
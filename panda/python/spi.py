@@ -29,25 +29,51 @@ CHECKSUM_START = 0xAB
 MIN_ACK_TIMEOUT_MS = 100
 MAX_XFER_RETRY_COUNT = 5
 
+# ACK polling: spin for a short window, then back off exponentially up to a bounded sleep.
+# The cap bounds how late the ACK is seen, which adds to every transfer on slow ACKs
+ACK_SPIN_S = 200e-6
+ACK_BACKOFF_MIN_S = 20e-6
+ACK_BACKOFF_MAX_S = 100e-6
+
 XFER_SIZE = 0x40*31
 
 DEV_PATH = "/dev/spidev0.0"
 
 
-def crc8(data):
-  crc = 0xFF    # standard init value
-  poly = 0xD5   # standard crc8: x8+x7+x6+x4+x2+1
-  size = len(data)
-  for i in range(size - 1, -1, -1):
-    crc ^= data[i]
+def _crc8_table(poly):
+  table = []
+  for i in range(256):
+    crc = i
     for _ in range(8):
       if ((crc & 0x80) != 0):
         crc = ((crc << 1) ^ poly) & 0xFF
       else:
         crc <<= 1
+    table.append(crc)
+  return table
+
+CRC8_TABLE = _crc8_table(0xD5)  # standard crc8: x8+x7+x6+x4+x2+1
+
+
+def crc8(data):
+  crc = 0xFF    # standard init value
+  for b in reversed(data):
+    crc = CRC8_TABLE[crc ^ b]
   return crc
 
 
+def xor_checksum(data, start: int = CHECKSUM_START) -> int:
+  """XOR of start and all bytes of data, folded as one big integer instead of byte by byte"""
+  data = bytes(data)
+  n = len(data)
+  x = int.from_bytes(data, "little")
+  while n > 1:
+    half = (n + 1) // 2
+    x = (x & ((1 << (half * 8)) - 1)) ^ (x >> (half * 8))
+    n = half
+  return x ^ start
+
+
 class PandaSpiException(Exception):
   pass
 
@@ -144,24 +170,36 @@ class PandaSpiHandle(BaseHandle):
       self.ioctl_data.rx_buf = ctypes.addressof(rx_buf_raw)
       self.fileno = self.dev._spidev.fileno()
 
+    self._poll_bufs: dict[tuple[int, int], list[int]] = {}
+
   # helpers
   def _calc_checksum(self, data: bytes) -> int:
-    cksum = CHECKSUM_START
-    for b in data:
-      cksum ^= b
-    return cksum
+    return xor_checksum(data)
 
   def _wait_for_ack(self, spi, ack_val: int, timeout: int, tx: int, length: int = 1) -> bytes:
     timeout_s = max(MIN_ACK_TIMEOUT_MS, timeout) * 1e-3
 
+    # spidev may write the received bytes into the list it is given, so poll with a copy of the cached one
+    poll = self._poll_bufs.setdefault((tx, length), [tx, ] * length)
+
+    backoff = ACK_BACKOFF_MIN_S
     start = time.monotonic()
-    while (timeout == 0) or ((time.monotonic() - start) < timeout_s):
-      dat = spi.xfer2([tx, ] * length)
+    while True:
+      elapsed = time.monotonic() - start
+      if timeout != 0 and elapsed >= timeout_s:
+        break
+
+      dat = spi.xfer2(poll.copy())
       if dat[0] == NACK:
         raise PandaSpiNackResponse
       elif dat[0] == ack_val:
         return bytes(dat)
 
+      # the panda usually answers right away, only yield the core for longer waits
+      if elapsed > ACK_SPIN_S:
+        time.sleep(backoff)
+        backoff = min(backoff * 2, ACK_BACKOFF_MAX_S)
+
     raise PandaSpiMissingAck
 
   def _transfer_spidev(self, spi, endpoint: int, data, timeout: int, max_rx_len: int = 1000, expect_disconnect: bool = False) -> bytes:
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import struct
+import time
+from contextlib import contextmanager
+
+from panda.python.spi import CHECKSUM_START, DACK, HACK, MIN_ACK_TIMEOUT_MS, NACK, PandaSpiHandle, \
+                              PandaSpiMissingAck, PandaSpiNackResponse, crc8
+
+ACK_DELAYS_US = (0, 50, 200, 1000, 5000)
+
+
+def crc8_loop(data):
+  """crc8 before the table lookup"""
+  crc = 0xFF    # standard init value
+  poly = 0xD5   # standard crc8: x8+x7+x6+x4+x2+1
+  size = len(data)
+  for i in range(size - 1, -1, -1):
+    crc ^= data[i]
+    for _ in range(8):
+      if ((crc & 0x80) != 0):
+        crc = ((crc << 1) ^ poly) & 0xFF
+      else:
+        crc <<= 1
+  return crc
+
+
+def checksum_loop(data):
+  cksum = CHECKSUM_START
+  for b in data:
+    cksum ^= b
+  return cksum
+
+
+class PreviousPandaSpiHandle(PandaSpiHandle):
+  """PandaSpiHandle before the checksum was folded and the ACK polling backed off"""
+  def _calc_checksum(self, data: bytes) -> int:
+    return checksum_loop(data)
+
+  def _wait_for_ack(self, spi, ack_val: int, timeout: int, tx: int, length: int = 1) -> bytes:
+    timeout_s = max(MIN_ACK_TIMEOUT_MS, timeout) * 1e-3
+
+    start = time.monotonic()
+    while (timeout == 0) or ((time.monotonic() - start) < timeout_s):
+      dat = spi.xfer2([tx, ] * length)
+      if dat[0] == NACK:
+        raise PandaSpiNackResponse
+      elif dat[0] == ack_val:
+        return bytes(dat)
+
+    raise PandaSpiMissingAck
+
+
+class FakePandaSpi:
+  """
+  The panda side of the SPI protocol: checks the header and data checksums, ACKs the header and the data once
+  ack_delay has passed since they were received and answers with a random payload of the requested length.
+  NACKs anything with a bad checksum, like the firmware does.
+  """
+  def __init__(self, ack_delay, seed):
+    self.ack_delay = ack_delay
+    self.rng = random.Random(seed)
+    self.state = "header"
+    self.ready = 0.
+    self.max_rx = 0
+    self.tx_len = 0
+    self.pending = b""
+    self.payloads = []
+
+  def xfer2(self, tx):
+    tx = bytes(tx)
+    if self.state == "header":
+      _, _, self.tx_len, self.max_rx = struct.unpack("<BBHH", tx[:6])
+      self.state = "header ack" if checksum_loop(tx[:7]) == 0 else "nack"
+      self.ready = time.monotonic() + self.ack_delay
+      return [0] * len(tx)
+
+    if self.state == "data":
+      self.state = "data ack" if checksum_loop(tx[:self.tx_len + 1]) == 0 else "nack"
+      self.ready = time.monotonic() + self.ack_delay
+      return [0] * len(tx)
+
+    if time.monotonic() < self.ready:
+      return [0] * len(tx)
+
+    if self.state == "nack":
+      self.state = "header"
+      return [NACK] + [0] * (len(tx) - 1)
+
+    if self.state == "header ack":
+      self.state = "data"
+      return [HACK] + [0] * (len(tx) - 1)
+
+    payload = self.rng.randbytes(self.rng.randint(0, self.max_rx))
+    self.payloads.append(payload)
+    packet = bytes([DACK]) + struct.pack("<H", len(payload)) + payload
+    packet += bytes([checksum_loop(packet)])
+    self.state = "header"
+    self.pending = packet[len(tx):]
+    return list(packet[:len(tx)].ljust(len(tx), b"\x00"))
+
+  def readbytes(self, n):
+    dat, self.pending = self.pending[:n], self.pending[n:]
+    return list(dat)
+
+
+class FakeSpiDevice:
+  def __init__(self, spi):
+    self.spi = spi
+
+  @contextmanager
+  def acquire(self):
+    yield self.spi
+
+  def close(self):
+    pass
+
+
+def make_handle(cls, ack_delay, seed):
+  handle = cls.__new__(cls)
+  handle.dev = FakeSpiDevice(FakePandaSpi(ack_delay, seed))
+  handle._transfer_raw = handle._transfer_spidev
+  handle._poll_bufs = {}
+  return handle
+
+
+def check_checksums(seed):
+  rng = random.Random(seed)
+  handle = make_handle(PandaSpiHandle, 0, seed)
+  checks = 0
+  for n in (0, 1, 2, 3, 7, 8, 63, 64, 65, 1000, 1984):
+    for _ in range(200):
+      data = rng.randbytes(n)
+      for d in (data, list(data), bytearray(data)):
+        assert crc8(d) == crc8_loop(d), f"crc8 differs for {data.hex()}"
+        assert handle._calc_checksum(d) == checksum_loop(d), f"checksum differs for {data.hex()}"
+        checks += 1
+  return checks
+
+
+def run_transfers(cls, ack_delay, transfers, seed):
+  """Returns the transfers per second and the CPU time per transfer for bulkReads and bulkWrites"""
+  handle = make_handle(cls, ack_delay, seed)
+  rng = random.Random(seed)
+  panda = handle.dev.spi
+
+  t, cpu = time.perf_counter(), time.process_time()
+  for i in range(transfers):
+    if i % 2:
+      handle.bulkWrite(3, rng.randbytes(rng.randint(1, 1000)))
+    else:
+      assert handle.bulkRead(1, 0x4000) == panda.payloads[-1]
+  t, cpu = time.perf_counter() - t, time.process_time() - cpu
+  return transfers / t, cpu / transfers
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Runs SPI transfers against a fake panda that ACKs after a delay, compares the throughput "
+                                               "and CPU time with the previous busy polling, and checks the checksums against the previous loops",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--transfers", type=int, default=200, help="transfers per ACK delay")
+  parser.add_argument("--ack-delays-us", type=int, nargs="+", default=ACK_DELAYS_US, help="delay of the panda's header and data ACKs")
+  parser.add_argument("--max-slowdown", type=float, default=0.05, help="allowed drop in transfers/s against the previous polling")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  print(f"crc8 and checksum identical on {check_checksums(args.seed)} inputs")
+
+  print(f"{'ACK delay us':>12} {'before/s':>9} {'after/s':>9} {'before CPU us':>14} {'after CPU us':>13}")
+  for delay_us in args.ack_delays_us:
+    before, before_cpu = run_transfers(PreviousPandaSpiHandle, delay_us * 1e-6, args.transfers, args.seed)
+    after, after_cpu = run_transfers(PandaSpiHandle, delay_us * 1e-6, args.transfers, args.seed)
+    print(f"{delay_us:>12} {before:9.0f} {after:9.0f} {before_cpu * 1e6:14.0f} {after_cpu * 1e6:13.0f}")
+    assert after >= before * (1 - args.max_slowdown), f"transfers/s dropped from {before:.0f} to {after:.0f} with {delay_us} us ACK delay"
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 import numpy as np
 
@@ -12,8 +13,13 @@ def gen_chi2_ppf_lookup(max_dim=200):
   np.save('chi2_lookup_table', table)
 
 
+@lru_cache(maxsize=None)
+def load_chi2_ppf_lookup():
+  return np.load(os.path.dirname(os.path.realpath(__file__)) + '/chi2_lookup_table.npy')
+
+
 def chi2_ppf(p, dim):
-  table = np.load(os.path.dirname(os.path.realpath(__file__)) + '/chi2_lookup_table.npy')
+  table = load_chi2_ppf_lookup()
   result = np.interp(p, np.arange(.01, .99, .01), table[dim])
   return result
 
@@ -1,6 +1,5 @@
 import os
 import logging
-from bisect import bisect_right
 
 import numpy as np
 import sympy as sp
@@ -214,7 +213,74 @@ def gen_code(folder, name, f_sym, dt_sym, x_sym, obs_eqs, dim_x, dim_err, eskf_p
   open(os.path.join(folder, f"{name}.cpp"), 'w', encoding='utf-8').write(code)
 
 
+class RewindBuffer():
+  """Fixed capacity ring buffer of filter checkpoints, ordered by filter time."""
+  def __init__(self, capacity, dim_x, dim_err):
+    self.capacity = capacity
+    self.t = np.zeros(capacity, dtype=np.float64)
+    self.x = np.zeros((capacity, dim_x, 1), dtype=np.float64)
+    self.P = np.zeros((capacity, dim_err, dim_err), dtype=np.float64)
+    self.obscache = [None] * capacity
+    self.start = 0
+    self.size = 0
+
+  def __len__(self):
+    return self.size
+
+  def reset(self):
+    self.obscache = [None] * self.capacity
+    self.start = 0
+    self.size = 0
+
+  def _physical(self, idx):
+    return (self.start + idx) % self.capacity
+
+  def first_t(self):
+    return self.t[self.start]
+
+  def last_t(self):
+    return self.t[self._physical(self.size - 1)]
+
+  def push(self, t, x, P, obs):
+    if self.size < self.capacity:
+      pos = self._physical(self.size)
+      self.size += 1
+    else:
+      # full, overwrite the oldest checkpoint
+      pos = self.start
+      self.start = (self.start + 1) % self.capacity
+    self.t[pos] = t
+    self.x[pos] = x
+    self.P[pos] = P
+    self.obscache[pos] = obs
+
+  def bisect_right(self, t):
+    # the stored times are sorted in logical order, which is at most two sorted runs physically
+    end = self.start + self.size
+    head = self.t[self.start:min(end, self.capacity)]
+    idx = int(np.searchsorted(head, t, side='right'))
+    if idx == len(head) and end > self.capacity:
+      idx += int(np.searchsorted(self.t[:end - self.capacity], t, side='right'))
+    return idx
+
+  def get(self, idx):
+    assert 0 <= idx < self.size
+    pos = self._physical(idx)
+    return self.t[pos], self.x[pos], self.P[pos]
+
+  def truncate(self, idx):
+    """Drops checkpoints idx and later, returning their cached observations."""
+    ret = [self.obscache[self._physical(i)] for i in range(idx, self.size)]
+    for i in range(idx, self.size):
+      self.obscache[self._physical(i)] = None
+    self.size = idx
+    return ret
+
+
 class EKF_sym():
+  # only keep a certain number of checkpoints around for rewinding
+  REWIND_TO_KEEP = 512
+
   def __init__(self, folder, name, Q, x_initial, P_initial, dim_main, dim_main_err,  # pylint: disable=dangerous-default-value
                N=0, dim_augment=0, dim_augment_err=0, maha_test_kinds=[], quaternion_idxs=[], global_vars=None, max_rewind_age=1.0, logger=logging):
     """Generates process function and all observation functions for the kalman filter."""
@@ -238,6 +304,7 @@ class EKF_sym():
     # kinds that should get mahalanobis distance
     # tested for outlier rejection
     self.maha_test_kinds = maha_test_kinds
+    self.maha_thresh_cache = {}
 
     # quaternions need normalization
     self.quaternion_idxs = quaternion_idxs
@@ -247,9 +314,7 @@ class EKF_sym():
 
     # rewind stuff
     self.max_rewind_age = max_rewind_age
-    self.rewind_t = []
-    self.rewind_states = []
-    self.rewind_obscache = []
+    self.rewinder = RewindBuffer(self.REWIND_TO_KEEP, self.dim_x, self.dim_err)
     self.init_state(x_initial, P_initial, None)
 
     ffi, lib = load_code(folder, name)
@@ -350,14 +415,10 @@ class EKF_sym():
     self.P = np.array(covs).astype(np.float64)
     self.filter_time = filter_time
     self.augment_times = [0] * self.N
-    self.rewind_obscache = []
-    self.rewind_t = []
-    self.rewind_states = []
+    self.rewinder.reset()
 
   def reset_rewind(self):
-    self.rewind_obscache = []
-    self.rewind_t = []
-    self.rewind_states = []
+    self.rewinder.reset()
 
   def augment(self):
     # TODO this is not a generalized way of doing this and implies that the augmented states
@@ -414,37 +475,20 @@ class EKF_sym():
 
   def rewind(self, t):
     # find where we are rewinding to
-    idx = bisect_right(self.rewind_t, t)
-    assert self.rewind_t[idx - 1] <= t
-    assert self.rewind_t[idx] > t    # must be true, or rewind wouldn't be called
+    idx = self.rewinder.bisect_right(t)
+    assert self.rewinder.get(idx - 1)[0] <= t
+    assert self.rewinder.get(idx)[0] > t    # must be true, or rewind wouldn't be called
 
     # set the state to the time right before that
-    self.filter_time = self.rewind_t[idx - 1]
-    self.x[:] = self.rewind_states[idx - 1][0]
-    self.P[:] = self.rewind_states[idx - 1][1]
-
-    # return the observations we rewound over for fast forwarding
-    ret = self.rewind_obscache[idx:]
+    filter_time, self.x[:], self.P[:] = self.rewinder.get(idx - 1)
+    self.filter_time = float(filter_time)
 
-    # throw away the old future
-    # TODO: is this making a copy?
-    self.rewind_t = self.rewind_t[:idx]
-    self.rewind_states = self.rewind_states[:idx]
-    self.rewind_obscache = self.rewind_obscache[:idx]
-
-    return ret
+    # throw away the old future and return the observations we rewound over for fast forwarding
+    return self.rewinder.truncate(idx)
 
   def checkpoint(self, obs):
     # push to rewinder
-    self.rewind_t.append(self.filter_time)
-    self.rewind_states.append((np.copy(self.x), np.copy(self.P)))
-    self.rewind_obscache.append(obs)
-
-    # only keep a certain number around
-    REWIND_TO_KEEP = 512
-    self.rewind_t = self.rewind_t[-REWIND_TO_KEEP:]
-    self.rewind_states = self.rewind_states[-REWIND_TO_KEEP:]
-    self.rewind_obscache = self.rewind_obscache[-REWIND_TO_KEEP:]
+    self.rewinder.push(self.filter_time, self.x, self.P, obs)
 
   def predict(self, t):
     # initialize time
@@ -463,7 +507,7 @@ class EKF_sym():
 
     # rewind
     if self.filter_time is not None and t < self.filter_time:
-      if len(self.rewind_t) == 0 or t < self.rewind_t[0] or t < self.rewind_t[-1] - self.max_rewind_age:
+      if len(self.rewinder) == 0 or t < self.rewinder.first_t() or t < self.rewinder.last_t() - self.max_rewind_age:
         self.logger.error(f"observation too old at {t:.3f} with filter at {self.filter_time:.3f}, ignoring")
         return None
       rewound = self.rewind(t)
@@ -598,7 +642,7 @@ class EKF_sym():
     if self.msckf and kind in self.maha_test_kinds:
       a = np.linalg.inv(H.dot(P).dot(H.T) + R)
       maha_dist = y.T.dot(a.dot(y))
-      if maha_dist > chi2_ppf(0.95, y.shape[0]):
+      if maha_dist > self.maha_thresh(0.95, y.shape[0]):
         R = 10e16 * R
 
     # *** same below this line ***
@@ -620,6 +664,12 @@ class EKF_sym():
     self.err_function(x, delta_x, x_new)
     return x_new, P, y.flatten()
 
+  def maha_thresh(self, p, dim):
+    key = (p, dim)
+    if key not in self.maha_thresh_cache:
+      self.maha_thresh_cache[key] = chi2_ppf(p, dim)
+    return self.maha_thresh_cache[key]
+
   def maha_test(self, x, P, kind, z, R, extra_args=[], maha_thresh=0.95):  # pylint: disable=dangerous-default-value
     # init vars
     z = z.reshape((-1, 1))
@@ -640,7 +690,7 @@ class EKF_sym():
 
     a = np.linalg.inv(H.dot(P).dot(H.T) + R)
     maha_dist = y.T.dot(a.dot(y))
-    if maha_dist > chi2_ppf(maha_thresh, y.shape[0]):
+    if maha_dist > self.maha_thresh(maha_thresh, y.shape[0]):
       return False
     else:
       return True
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import random
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from rednose.helpers.ekf_sym import EKF_sym, RewindBuffer
+
+# observations a filter like locationd's gets: rate in Hz, mean and jitter of their latency in seconds, dimension
+SENSORS = {
+  "imu": (100., 0.005, 0.002, 3),
+  "odometry": (20., 0.05, 0.02, 6),
+  "gps": (10., 0.2, 0.4, 3),
+}
+
+
+class ReplayEKF(EKF_sym):
+  """
+  EKF_sym with a cheap stand-in for the generated predict and update functions, so that the rewinding, the
+  checkpoints and the fast forwarding run as they do in the filter without compiling any code
+  """
+  def __init__(self, dim_x, dim_err, max_rewind_age):  # pylint: disable=super-init-not-called
+    self.dim_x, self.dim_err = dim_x, dim_err
+    self.x = np.zeros((dim_x, 1))
+    self.P = np.eye(dim_err)
+    self.filter_time = None
+    self.max_rewind_age = max_rewind_age
+    self.quaternion_idxs = []
+    self.logger = logging.getLogger("ekf_sym_benchmark")
+    self.logger.setLevel(logging.CRITICAL)
+    self.rewinder = RewindBuffer(self.REWIND_TO_KEEP, dim_x, dim_err)
+
+  def _predict(self, x, P, dt):
+    return x * (1 - 0.1 * dt) + dt, P * (1 - 0.05 * dt) + dt * np.eye(self.dim_err)
+
+  def _update(self, x, P, kind, z, R, extra_args=[]):  # pylint: disable=dangerous-default-value
+    y = z.reshape(-1, 1) - x[:z.shape[0]]
+    x = x.copy()
+    x[:z.shape[0]] += 0.5 * y
+    return x, P * 0.99, y
+
+
+class PreviousReplayEKF(ReplayEKF):
+  """ReplayEKF with EKF_sym's rewinding before RewindBuffer, lists that are bisected, sliced and trimmed"""
+  def __init__(self, dim_x, dim_err, max_rewind_age):
+    super().__init__(dim_x, dim_err, max_rewind_age)
+    self.rewind_t = []
+    self.rewind_states = []
+    self.rewind_obscache = []
+
+  def rewind(self, t):
+    # find where we are rewinding to
+    idx = bisect_right(self.rewind_t, t)
+    assert self.rewind_t[idx - 1] <= t
+    assert self.rewind_t[idx] > t    # must be true, or rewind wouldn't be called
+
+    # set the state to the time right before that
+    self.filter_time = self.rewind_t[idx - 1]
+    self.x[:] = self.rewind_states[idx - 1][0]
+    self.P[:] = self.rewind_states[idx - 1][1]
+
+    # return the observations we rewound over for fast forwarding
+    ret = self.rewind_obscache[idx:]
+
+    # throw away the old future
+    self.rewind_t = self.rewind_t[:idx]
+    self.rewind_states = self.rewind_states[:idx]
+    self.rewind_obscache = self.rewind_obscache[:idx]
+
+    return ret
+
+  def checkpoint(self, obs):
+    # push to rewinder
+    self.rewind_t.append(self.filter_time)
+    self.rewind_states.append((np.copy(self.x), np.copy(self.P)))
+    self.rewind_obscache.append(obs)
+
+    # only keep a certain number around
+    REWIND_TO_KEEP = 512
+    self.rewind_t = self.rewind_t[-REWIND_TO_KEEP:]
+    self.rewind_states = self.rewind_states[-REWIND_TO_KEEP:]
+    self.rewind_obscache = self.rewind_obscache[-REWIND_TO_KEEP:]
+
+  def predict_and_update_batch(self, t, kind, z, R, extra_args=[[]], augment=False):  # pylint: disable=dangerous-default-value
+    # rewind
+    if self.filter_time is not None and t < self.filter_time:
+      if len(self.rewind_t) == 0 or t < self.rewind_t[0] or t < self.rewind_t[-1] - self.max_rewind_age:
+        self.logger.error(f"observation too old at {t:.3f} with filter at {self.filter_time:.3f}, ignoring")
+        return None
+      rewound = self.rewind(t)
+    else:
+      rewound = []
+
+    ret = self._predict_and_update_batch(t, kind, z, R, extra_args, augment)
+
+    # optional fast forward
+    for r in rewound:
+      self._predict_and_update_batch(*r)
+
+    return ret
+
+
+def observations(seconds, seed):
+  """Observations of every sensor in the order they arrive, late ones make the filter rewind or are too old"""
+  rng = random.Random(seed)
+  obs = []
+  for kind, (rate, latency, jitter, dim) in enumerate(SENSORS.values()):
+    for i in range(int(seconds * rate)):
+      t = i / rate + rng.uniform(0, 1 / rate)
+      arrival = t + max(0., rng.gauss(latency, jitter))
+      z = np.array([[rng.gauss(0, 1) for _ in range(dim)]])
+      obs.append((arrival, t, kind, z, np.eye(dim)[None]))
+  obs.sort(key=lambda o: o[0])
+  return [o[1:] for o in obs]
+
+
+def checkpoints(ekf):
+  if isinstance(ekf, PreviousReplayEKF):
+    return ekf.rewind_t, [x for x, _ in ekf.rewind_states], [P for _, P in ekf.rewind_states], ekf.rewind_obscache
+  buf = ekf.rewinder
+  pos = [buf._physical(i) for i in range(len(buf))]
+  return [buf.t[p] for p in pos], [buf.x[p] for p in pos], [buf.P[p] for p in pos], [buf.obscache[p] for p in pos]
+
+
+def replay(cls, obs, dim_x, dim_err, max_rewind_age):
+  """Returns the time per observation and the part of it spent in checkpoint() and rewind()"""
+  ekf = cls(dim_x, dim_err, max_rewind_age)
+  spent = [0.]
+  for name in ("checkpoint", "rewind"):
+    def timed(*args, f=getattr(ekf, name)):
+      t = time.perf_counter()
+      ret = f(*args)
+      spent[0] += time.perf_counter() - t
+      return ret
+    setattr(ekf, name, timed)
+
+  t = time.perf_counter()
+  for obs_t, kind, z, R in obs:
+    ekf.predict_and_update_batch(obs_t, kind, z, R)
+  return (time.perf_counter() - t) / len(obs), spent[0] / len(obs)
+
+
+def check(obs, dim_x, dim_err, max_rewind_age, check_every):
+  """
+  Feeds obs to both filters side by side, compares their outputs on every observation and their state and
+  checkpoints every check_every observations. Returns the number of rewinds and of observations too old
+  """
+  before, after = PreviousReplayEKF(dim_x, dim_err, max_rewind_age), ReplayEKF(dim_x, dim_err, max_rewind_age)
+  rewinds = too_old = 0
+  for i, (t, kind, z, R) in enumerate(obs):
+    late = before.filter_time is not None and t < before.filter_time
+    a, b = before.predict_and_update_batch(t, kind, z, R), after.predict_and_update_batch(t, kind, z, R)
+    assert same(a, b), f"output differs on observation {i}"
+    rewinds += late and a is not None
+    too_old += a is None
+    if i % check_every == 0:
+      assert same((before.filter_time, before.x, before.P, *checkpoints(before)), (after.filter_time, after.x, after.P, *checkpoints(after))), \
+        f"state or checkpoints differ after observation {i}"
+  return rewinds, too_old
+
+
+def same(a, b):
+  if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+    return np.array_equal(a, b)
+  if isinstance(a, (list, tuple)):
+    return isinstance(b, (list, tuple)) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b, strict=True))
+  return a == b
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Replays late and out of order observations through EKF_sym's rewinding with RewindBuffer "
+                                               "and with the previous lists, checks that the filter outputs, states and checkpoints are "
+                                               "identical and compares the time per observation",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--seconds", type=float, default=60.)
+  parser.add_argument("--dim-x", type=int, default=23)
+  parser.add_argument("--dim-err", type=int, default=22)
+  parser.add_argument("--max-rewind-age", type=float, default=1.)
+  parser.add_argument("--check-every", type=int, default=7, help="observations between comparisons of the states and checkpoints")
+  parser.add_argument("--seeds", type=int, default=3)
+  args = parser.parse_args()
+
+  print(f"{'':>4} {'':>6} {'':>8} {'':>8} | {'per observation':^21} | {'in checkpoint and rewind':^32}")
+  print(f"{'seed':>4} {'obs':>6} {'rewinds':>8} {'too old':>8} | {'before us':>10} {'after us':>10} | {'before us':>11} {'after us':>11} {'speedup':>8}")
+  for seed in range(args.seeds):
+    obs = observations(args.seconds, seed)
+    rewinds, too_old = check(obs, args.dim_x, args.dim_err, args.max_rewind_age, args.check_every)
+
+    before, before_rewinder = replay(PreviousReplayEKF, obs, args.dim_x, args.dim_err, args.max_rewind_age)
+    after, after_rewinder = replay(ReplayEKF, obs, args.dim_x, args.dim_err, args.max_rewind_age)
+    print(f"{seed:>4} {len(obs):>6} {rewinds:>8} {too_old:>8} | {before * 1e6:10.1f} {after * 1e6:10.1f} | "
+          f"{before_rewinder * 1e6:11.1f} {after_rewinder * 1e6:11.1f} {before_rewinder / after_rewinder:7.1f}x")
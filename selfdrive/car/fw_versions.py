@@ -12,9 +12,9 @@ from openpilot.common.params import Params
 from openpilot.common.swaglog import cloudlog
 from openpilot.selfdrive.car.ecu_addrs import get_ecu_addrs
 from openpilot.selfdrive.car.fingerprints import FW_VERSIONS
-from openpilot.selfdrive.car.fw_query_definitions import AddrType, EcuAddrBusType, FwQueryConfig, LiveFwVersions, OfflineFwVersions
+from openpilot.selfdrive.car.fw_query_definitions import AddrType, EcuAddrBusType, FwQueryConfig, LiveFwVersions, OfflineFwVersions, Request
 from openpilot.selfdrive.car.interfaces import get_interface_attr
-from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery, get_data_concurrent
 
 Ecu = car.CarParams.Ecu
 ESSENTIAL_ECUS = [Ecu.engine, Ecu.eps, Ecu.abs, Ecu.fwdRadar, Ecu.fwdCamera, Ecu.vsa]
@@ -27,6 +27,7 @@ MODEL_TO_BRAND = {c: b for b, e in VERSIONS.items() for c in e}
 REQUESTS = [(brand, config, r) for brand, config in FW_QUERY_CONFIGS.items() for r in config.requests]
 
 T = TypeVar('T')
+FwQuery = tuple[str, FwQueryConfig, Request, list[AddrType]]
 
 
 def chunks(l: list[T], n: int = 128) -> Iterator[list[T]]:
@@ -260,6 +261,36 @@ def get_fw_versions_ordered(logcan, sendcan, vin: str, ecu_rx_addrs: set[EcuAddr
   return all_car_fw
 
 
+def get_fw_query_plan(queries: list[FwQuery]) -> list[tuple[bool | None, list[int]]]:
+  """
+  Groups queries into rounds that can be in flight at once, returns (OBD multiplexing, query indexes) per round.
+  Queries that share a request or response address keep their order in separate rounds, regardless of bus
+  since an ECU may be reachable on more than one bus through a gateway. Queries on a multiplexed bus only
+  share a round with queries that need the same OBD multiplexing state.
+  """
+  rounds: list[tuple[bool | None, list[int]]] = []
+  last_round: dict[int, int] = {}  # address -> last round using it
+
+  for idx, (_, _, r, query_addrs) in enumerate(queries):
+    addrs = {a for tx_addr, _ in query_addrs for a in (tx_addr, uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset))}
+    obd_multiplexing = r.obd_multiplexing if r.bus % 4 == 1 else None
+
+    round_idx = max((last_round[a] + 1 for a in addrs if a in last_round), default=0)
+    while round_idx < len(rounds) and obd_multiplexing is not None and rounds[round_idx][0] not in (None, obd_multiplexing):
+      round_idx += 1
+
+    if round_idx == len(rounds):
+      rounds.append((obd_multiplexing, []))
+    elif rounds[round_idx][0] is None:
+      rounds[round_idx] = (obd_multiplexing, rounds[round_idx][1])
+
+    rounds[round_idx][1].append(idx)
+    for a in addrs:
+      last_round[a] = round_idx
+
+  return rounds
+
+
 def get_fw_versions(logcan, sendcan, query_brand: str = None, extra: OfflineFwVersions = None, timeout: float = 0.1, num_pandas: int = 1,
                     debug: bool = False, progress: bool = False) -> list[capnp.lib.capnp._DynamicStructBuilder]:
   versions = VERSIONS.copy()
@@ -293,45 +324,61 @@ def get_fw_versions(logcan, sendcan, query_brand: str = None, extra: OfflineFwVe
 
   addrs.insert(0, parallel_addrs)
 
-  # Get versions and build capnp list to put into CarParams
-  car_fw = []
+  queries: list[FwQuery] = []
   requests = [(brand, config, r) for brand, config, r in REQUESTS if is_brand(brand, query_brand)]
-  for addr_group in tqdm(addrs, disable=not progress):  # split by subaddr, if any
+  for addr_group in addrs:  # split by subaddr, if any
     for addr_chunk in chunks(addr_group):
       for brand, config, r in requests:
         # Skip query if no panda available
         if r.bus > num_pandas * 4 - 1:
           continue
 
-        # Toggle OBD multiplexing for each request
-        if r.bus % 4 == 1:
-          set_obd_multiplexing(params, r.obd_multiplexing)
-
-        try:
-          query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
-                         (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
-
-          if query_addrs:
-            query = IsoTpParallelQuery(sendcan, logcan, r.bus, query_addrs, r.request, r.response, r.rx_offset, debug=debug)
-            for (tx_addr, sub_addr), version in query.get_data(timeout).items():
-              f = car.CarParams.CarFw.new_message()
-
-              f.ecu = ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
-              f.fwVersion = version
-              f.address = tx_addr
-              f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
-              f.request = r.request
-              f.brand = brand
-              f.bus = r.bus
-              f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
-              f.obdMultiplexing = r.obd_multiplexing
-
-              if sub_addr is not None:
-                f.subAddress = sub_addr
-
-              car_fw.append(f)
-        except Exception:
-          cloudlog.exception("FW query exception")
+        query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
+                       (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+        if query_addrs:
+          queries.append((brand, config, r, query_addrs))
+
+  # Queries on different ECUs are sent together, each round ends as soon as all of its ECUs answered or timed out
+  results: list[dict[AddrType, bytes]] = [{} for _ in queries]
+  for obd_multiplexing, round_queries in tqdm(get_fw_query_plan(queries), disable=not progress):
+    if obd_multiplexing is not None:
+      set_obd_multiplexing(params, obd_multiplexing)
+
+    round_started, iso_tp_queries = [], []
+    for idx in round_queries:
+      _, _, r, query_addrs = queries[idx]
+      try:
+        iso_tp_queries.append(IsoTpParallelQuery(sendcan, logcan, r.bus, query_addrs, r.request, r.response, r.rx_offset, debug=debug))
+        round_started.append(idx)
+      except Exception:
+        cloudlog.exception("FW query exception")
+
+    try:
+      for idx, data in zip(round_started, get_data_concurrent(iso_tp_queries, timeout), strict=True):
+        results[idx] = data
+    except Exception:
+      cloudlog.exception("FW query exception")
+
+  # Build capnp list to put into CarParams, in query order
+  car_fw = []
+  for (brand, config, r, _), data in zip(queries, results, strict=True):
+    for (tx_addr, sub_addr), version in data.items():
+      f = car.CarParams.CarFw.new_message()
+
+      f.ecu = ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
+      f.fwVersion = version
+      f.address = tx_addr
+      f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
+      f.request = r.request
+      f.brand = brand
+      f.bus = r.bus
+      f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
+      f.obdMultiplexing = r.obd_multiplexing
+
+      if sub_addr is not None:
+        f.subAddress = sub_addr
+
+      car_fw.append(f)
 
   return car_fw
 
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
+
+import panda.python.uds as uds
+from cereal import car
+from openpilot.common.swaglog import cloudlog
+from openpilot.selfdrive.car import fw_versions, isotp_parallel_query
+from openpilot.selfdrive.car.fw_versions import FW_QUERY_CONFIGS, REQUESTS, VERSIONS, chunks, is_brand, set_obd_multiplexing
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+
+Ecu = car.CarParams.Ecu
+
+
+def get_fw_versions_serial(logcan, sendcan, query_brand=None, timeout=0.1, num_pandas=1):
+  """get_fw_versions before queries were scheduled in rounds: one query at a time, OBD multiplexing set before each one"""
+  versions = VERSIONS.copy()
+  params = fw_versions.Params()
+
+  if query_brand is not None:
+    versions = {query_brand: versions[query_brand]}
+
+  addrs = []
+  parallel_addrs = []
+  ecu_types = {}
+
+  for brand, brand_versions in versions.items():
+    config = FW_QUERY_CONFIGS[brand]
+    for ecu_type, addr, sub_addr in config.get_all_ecus(brand_versions):
+      a = (brand, addr, sub_addr)
+      if a not in ecu_types:
+        ecu_types[a] = ecu_type
+
+      if sub_addr is None:
+        if a not in parallel_addrs:
+          parallel_addrs.append(a)
+      else:
+        if [a] not in addrs:
+          addrs.append([a])
+
+  addrs.insert(0, parallel_addrs)
+
+  car_fw = []
+  requests = [(brand, config, r) for brand, config, r in REQUESTS if is_brand(brand, query_brand)]
+  for addr_group in addrs:
+    for addr_chunk in chunks(addr_group):
+      for brand, config, r in requests:
+        if r.bus > num_pandas * 4 - 1:
+          continue
+
+        if r.bus % 4 == 1:
+          set_obd_multiplexing(params, r.obd_multiplexing)
+
+        try:
+          query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
+                         (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+
+          if query_addrs:
+            query = IsoTpParallelQuery(sendcan, logcan, r.bus, query_addrs, r.request, r.response, r.rx_offset)
+            for (tx_addr, sub_addr), version in query.get_data(timeout).items():
+              f = car.CarParams.CarFw.new_message()
+
+              f.ecu = ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
+              f.fwVersion = version
+              f.address = tx_addr
+              f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
+              f.request = r.request
+              f.brand = brand
+              f.bus = r.bus
+              f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
+              f.obdMultiplexing = r.obd_multiplexing
+
+              if sub_addr is not None:
+                f.subAddress = sub_addr
+
+              car_fw.append(f)
+        except Exception:
+          cloudlog.exception("FW query exception")
+
+  return car_fw
+
+
+class SimulatedParams:
+  """The params set_obd_multiplexing uses, with pandad acknowledging every change right away"""
+  def __init__(self):
+    self.obd_multiplexing = True
+    self.changes = 0
+
+  def get_bool(self, key, block=False):
+    return self.obd_multiplexing if key == "ObdMultiplexingEnabled" else True
+
+  def put_bool(self, key, val):
+    if key == "ObdMultiplexingEnabled":
+      self.obd_multiplexing = val
+      self.changes += 1
+
+  def remove(self, key):
+    pass
+
+
+class SimulatedEcus:
+  """
+  ECUs of several brands sharing the buses, each answering on a fixed response address. ECUs on a multiplexed
+  bus are only reachable in one OBD multiplexing state. An ECU answers the requests of its brand with a version
+  that depends on the request, with a negative response or not at all to the others, and some first answer
+  with response pending. Responses arrive a few frames per wakeup among unrelated traffic.
+  """
+  def __init__(self, params, seed, present, frames_per_wakeup, background_frames):
+    rng = random.Random(seed)
+    self.params = params
+    self.frames_per_wakeup = frames_per_wakeup
+    self.background = [SimpleNamespace(src=bus, address=0x100 + i, dat=b"\x00" * 8, busTime=0) for bus in (0, 1) for i in range(background_frames)]
+
+    self.ecus = {}  # (bus, tx addr, sub addr) -> ECU
+    self.sub_addressed = set()  # (bus, tx addr) of ECUs behind a sub-address
+    brands = list(FW_QUERY_CONFIGS)
+    rng.shuffle(brands)
+    for brand in brands:
+      config = FW_QUERY_CONFIGS[brand]
+      for ecu_type, addr, sub_addr in sorted(config.get_all_ecus(VERSIONS[brand]), key=lambda ecu: (ecu[1], ecu[2] or 0, str(ecu[0]))):
+        if rng.random() > present:
+          continue
+        requests = [r for r in config.requests if len(r.whitelist_ecus) == 0 or ecu_type in r.whitelist_ecus]
+        if not requests:
+          continue
+        native = rng.choice(requests)
+        key = (native.bus, addr, sub_addr)
+        if key in self.ecus:
+          continue
+
+        answers = {}
+        for r in requests:
+          for i, (req, resp) in enumerate(zip(r.request, r.response, strict=True)):
+            version = f"{brand}-{addr:x}-{sub_addr}-{req.hex()}-".encode() * rng.randint(0, 3) if i == len(r.request) - 1 else b""
+            answers.setdefault(req, resp + version)
+
+        if sub_addr is not None:
+          self.sub_addressed.add(key[:2])
+        self.ecus[key] = SimpleNamespace(
+          rx_addr=uds.get_rx_addr_for_tx_addr(addr, native.rx_offset),
+          obd_multiplexing=native.obd_multiplexing if native.bus % 4 == 1 else None,
+          answers=answers,
+          reject_others=rng.random() < 0.5,
+          response_pending=rng.random() < 0.2,
+          remaining=b"",
+        )
+
+    self.queue = []
+    self.delayed = []
+
+  def isotp_frames(self, ecu, bus, sub_addr, dat):
+    max_len = 8 if sub_addr is None else 7
+    prefix = b"" if sub_addr is None else bytes([sub_addr])
+    if len(dat) < max_len:
+      frames = [(bytes([len(dat)]) + dat).ljust(max_len, b"\x00")]
+      ecu.remaining = b""
+    else:
+      frames = [bytes([0x10 | len(dat) >> 8, len(dat) & 0xff]) + dat[:max_len - 2]]
+      ecu.remaining = dat[max_len - 2:]
+    return [SimpleNamespace(src=bus, address=ecu.rx_addr, dat=prefix + f, busTime=0) for f in frames]
+
+  def consecutive_frames(self, ecu, bus, sub_addr):
+    max_len = 8 if sub_addr is None else 7
+    prefix = b"" if sub_addr is None else bytes([sub_addr])
+    rest, ecu.remaining = ecu.remaining, b""
+    frames = []
+    for idx in range(1, (len(rest) + max_len - 2) // (max_len - 1) + 1):
+      frames.append(SimpleNamespace(src=bus, address=ecu.rx_addr, dat=prefix + (bytes([0x20 | idx & 0xf]) + rest[:max_len - 1]).ljust(max_len, b"\x00"), busTime=0))
+      rest = rest[max_len - 1:]
+    return frames
+
+  def send(self, msgs):
+    for addr, _, dat, bus in msgs:
+      sub_addr = dat[0] if (bus, addr) in self.sub_addressed else None
+      ecu = self.ecus.get((bus, addr, sub_addr))
+      if ecu is None or ecu.obd_multiplexing not in (None, self.params.obd_multiplexing):
+        continue
+
+      frame = dat if sub_addr is None else dat[1:]
+      if frame[0] >> 4 == 0:
+        req = frame[1:1 + frame[0]]
+        if req in ecu.answers:
+          if ecu.response_pending:
+            self.queue += self.isotp_frames(ecu, bus, sub_addr, b"\x7f" + req[:1] + b"\x78")
+            self.delayed += self.isotp_frames(ecu, bus, sub_addr, ecu.answers[req])
+          else:
+            self.queue += self.isotp_frames(ecu, bus, sub_addr, ecu.answers[req])
+        elif ecu.reject_others:
+          self.queue += self.isotp_frames(ecu, bus, sub_addr, b"\x7f" + req[:1] + b"\x11")
+      elif frame[0] == 0x30 and ecu.remaining:
+        self.queue += self.consecutive_frames(ecu, bus, sub_addr)
+
+  def drain_sock(self, sock, wait_for_one=False):
+    if not self.queue and not self.delayed:
+      # the real socket blocks until the next frame
+      time.sleep(1e-3)
+    frames, self.queue = self.queue[:self.frames_per_wakeup], self.queue[self.frames_per_wakeup:] + self.delayed
+    self.delayed = []
+    return [SimpleNamespace(can=frames + self.background)]
+
+  def drain_sock_raw(self, sock, wait_for_one=False):
+    self.queue, self.delayed = [], []
+    return []
+
+
+def run_fw_query(get_fw, seed, present, timeout, frames_per_wakeup, background_frames):
+  params = SimulatedParams()
+  ecus = SimulatedEcus(params, seed, present, frames_per_wakeup, background_frames)
+  with mock.patch.object(isotp_parallel_query.messaging, "drain_sock", ecus.drain_sock), \
+       mock.patch.object(isotp_parallel_query.messaging, "drain_sock_raw", ecus.drain_sock_raw), \
+       mock.patch.object(isotp_parallel_query, "can_list_to_can_capnp", lambda msgs, msgtype=None: msgs), \
+       mock.patch.object(fw_versions, "Params", lambda: params):
+    t = time.perf_counter()
+    car_fw = get_fw(None, SimpleNamespace(send=ecus.send), timeout=timeout, num_pandas=2)
+    elapsed = time.perf_counter() - t
+
+  return elapsed, params.changes, [fw.to_dict() for fw in car_fw], ecus
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Queries FW versions of simulated multi-brand cars one query at a time and in planned rounds, "
+                                               "and checks that both give the same carFw list",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--cars", type=int, default=5, help="simulated cars, each with its own random set of ECUs")
+  parser.add_argument("--present", type=float, default=0.5, help="fraction of known ECUs present on each car")
+  parser.add_argument("--timeout", type=float, default=0.1, help="per ECU response timeout")
+  parser.add_argument("--frames-per-wakeup", type=int, default=8, help="response frames delivered per drain of the can socket")
+  parser.add_argument("--background-frames", type=int, default=20, help="unrelated frames per bus in every drain")
+  args = parser.parse_args()
+
+  print(f"{'car':>4} {'ECUs':>5} {'carFw':>6} {'serial s':>9} {'rounds s':>9} {'serial OBD changes':>19} {'rounds OBD changes':>19}")
+  for seed in range(args.cars):
+    serial_time, serial_changes, serial_fw, ecus = run_fw_query(get_fw_versions_serial, seed, args.present, args.timeout,
+                                                                args.frames_per_wakeup, args.background_frames)
+    rounds_time, rounds_changes, rounds_fw, _ = run_fw_query(fw_versions.get_fw_versions, seed, args.present, args.timeout,
+                                                             args.frames_per_wakeup, args.background_frames)
+    assert rounds_fw == serial_fw, f"carFw differs on car {seed}"
+    print(f"{seed:>4} {len(ecus.ecus):>5} {len(serial_fw):>6} {serial_time:9.2f} {rounds_time:9.2f} {serial_changes:>19} {rounds_changes:>19}")
+
+  counts = defaultdict(int)
+  for fw in serial_fw:
+    counts["sub-address"] += fw.get("subAddress", 0) != 0
+    counts["multiplexed bus"] += fw["bus"] % 4 == 1
+    counts["multi-request"] += len(fw["request"]) > 1
+  print("last car: " + ", ".join(f"{v} {k} versions" for k, v in counts.items()))
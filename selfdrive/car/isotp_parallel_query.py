@@ -29,14 +29,21 @@ class IsoTpParallelQuery:
     self.msg_addrs = {tx_addr: get_rx_addr_for_tx_addr(tx_addr[0], rx_offset=response_offset) for tx_addr in real_addrs}
     self.msg_buffer: dict[int, list[tuple[int, int, bytes, int]]] = defaultdict(list)
 
+    # addresses sharing a response address (sub-addresses) are all woken up by its frames
+    self.rx_to_tx: dict[int, list[AddrType]] = defaultdict(list)
+    for tx_addr, rx_addr in self.msg_addrs.items():
+      self.rx_to_tx[rx_addr].append(tx_addr)
+    self.rx_updated: set[int] = set()
+    self.addr_order = {tx_addr: i for i, tx_addr in enumerate(self.msg_addrs)}
+    self.dispatch_table = {(bus, rx_addr): self for rx_addr in self.rx_to_tx}
+
   def rx(self):
     """Drain can socket and sort messages into buffers based on address"""
-    can_packets = messaging.drain_sock(self.logcan, wait_for_one=True)
+    dispatch_packets(messaging.drain_sock(self.logcan, wait_for_one=True), self.dispatch_table)
 
-    for packet in can_packets:
-      for msg in packet.can:
-        if msg.src == self.bus and msg.address in self.msg_addrs.values():
-          self.msg_buffer[msg.address].append((msg.address, msg.busTime, msg.dat, msg.src))
+  def buffer_frame(self, address: int, bus_time: int, dat: bytes, src: int) -> None:
+    self.msg_buffer[address].append((address, bus_time, dat, src))
+    self.rx_updated.add(address)
 
   def _can_tx(self, tx_addr, dat, bus):
     """Helper function to send single message"""
@@ -65,6 +72,12 @@ class IsoTpParallelQuery:
   def _drain_rx(self):
     messaging.drain_sock_raw(self.logcan)
     self.msg_buffer = defaultdict(list)
+    self.rx_updated = set()
+
+  def _set_done(self, tx_addr: AddrType) -> None:
+    if not self.request_done[tx_addr]:
+      self.request_done[tx_addr] = True
+      self.num_pending -= 1
 
   def _create_isotp_msg(self, tx_addr: int, sub_addr: int | None, rx_addr: int):
     can_client = CanClient(self._can_tx, partial(self._can_rx, rx_addr, sub_addr=sub_addr), tx_addr, rx_addr,
@@ -76,98 +89,192 @@ class IsoTpParallelQuery:
     # as well as reduces chances we process messages from previous queries
     return IsoTpMessage(can_client, timeout=0, separation_time=0.01, debug=self.debug, max_len=max_len)
 
-  def get_data(self, timeout: float, total_timeout: float = 60.) -> dict[AddrType, bytes]:
-    self._drain_rx()
+  def start(self, timeout: float, total_timeout: float = 60.) -> None:
+    """Sends the first request to all addresses, responses are then handled by update"""
+    self.timeout = timeout
+    self.total_timeout = total_timeout
 
     # Create message objects
-    msgs = {}
-    request_counter = {}
-    request_done = {}
+    self.msgs = {}
+    self.request_counter = {}
+    self.request_done = {}
     for tx_addr, rx_addr in self.msg_addrs.items():
-      msgs[tx_addr] = self._create_isotp_msg(*tx_addr, rx_addr)
-      request_counter[tx_addr] = 0
-      request_done[tx_addr] = False
+      self.msgs[tx_addr] = self._create_isotp_msg(*tx_addr, rx_addr)
+      self.request_counter[tx_addr] = 0
+      self.request_done[tx_addr] = False
+    self.num_pending = len(self.msgs)
 
     # Send first request to functional addrs, subsequent responses are handled on physical addrs
     if len(self.functional_addrs):
       for addr in self.functional_addrs:
         self._create_isotp_msg(addr, None, -1).send(self.request[0])
 
-    # Send first frame (single or first) to all addresses and receive asynchronously in the loop below.
+    # Send first frame (single or first) to all addresses and receive asynchronously in update.
     # If querying functional addrs, only set up physical IsoTpMessages to send consecutive frames
-    for msg in msgs.values():
+    for msg in self.msgs.values():
       msg.send(self.request[0], setup_only=len(self.functional_addrs) > 0)
 
-    results = {}
-    start_time = time.monotonic()
-    addrs_responded = set()  # track addresses that have ever sent a valid iso-tp frame for timeout logging
-    response_timeouts = {tx_addr: start_time + timeout for tx_addr in self.msg_addrs}
-    while True:
-      self.rx()
+    self.results: dict[AddrType, bytes] = {}
+    self.start_time = time.monotonic()
+    self.addrs_responded = set()  # track addresses that have ever sent a valid iso-tp frame for timeout logging
+    self.response_timeouts = {tx_addr: self.start_time + timeout for tx_addr in self.msg_addrs}
+    self.next_timeout = self.start_time + timeout
+    # addresses whose iso-tp message may still have buffered frames after returning a response
+    self.recv_again: set[AddrType] = set()
 
-      for tx_addr, msg in msgs.items():
-        try:
-          dat, rx_in_progress = msg.recv()
-        except Exception:
-          cloudlog.exception(f"Error processing UDS response: {tx_addr}")
-          request_done[tx_addr] = True
-          continue
+  def update(self) -> bool:
+    """Processes the buffered responses, returns True once all requests are done (finished or timed out)"""
+    timeout = self.timeout
 
-        # Extend timeout for each consecutive ISO-TP frame to avoid timing out on long responses
-        if rx_in_progress:
-          addrs_responded.add(tx_addr)
-          response_timeouts[tx_addr] = time.monotonic() + timeout
+    # only messages with new frames can make progress, the rest would return nothing
+    ready = self.recv_again
+    for rx_addr in self.rx_updated:
+      ready.update(self.rx_to_tx[rx_addr])
+    self.rx_updated = set()
+    self.recv_again = set()
 
-        if dat is None:
-          continue
+    for tx_addr in sorted(ready, key=self.addr_order.__getitem__):
+      msg = self.msgs[tx_addr]
+      try:
+        dat, rx_in_progress = msg.recv()
+      except Exception:
+        cloudlog.exception(f"Error processing UDS response: {tx_addr}")
+        self._set_done(tx_addr)
+        continue
 
-        # Log unexpected empty responses
-        if len(dat) == 0:
-          cloudlog.error(f"iso-tp query empty response: {tx_addr}")
-          request_done[tx_addr] = True
-          continue
+      # Extend timeout for each consecutive ISO-TP frame to avoid timing out on long responses
+      if rx_in_progress:
+        self.addrs_responded.add(tx_addr)
+        self.response_timeouts[tx_addr] = time.monotonic() + timeout
 
-        counter = request_counter[tx_addr]
-        expected_response = self.response[counter]
-        response_valid = dat.startswith(expected_response)
-
-        if response_valid:
-          if counter + 1 < len(self.request):
-            response_timeouts[tx_addr] = time.monotonic() + timeout
-            msg.send(self.request[counter + 1])
-            request_counter[tx_addr] += 1
-          else:
-            results[tx_addr] = dat[len(expected_response):]
-            request_done[tx_addr] = True
+      if dat is None:
+        continue
+      self.recv_again.add(tx_addr)
+
+      # Log unexpected empty responses
+      if len(dat) == 0:
+        cloudlog.error(f"iso-tp query empty response: {tx_addr}")
+        self._set_done(tx_addr)
+        continue
+
+      counter = self.request_counter[tx_addr]
+      expected_response = self.response[counter]
+      response_valid = dat.startswith(expected_response)
+
+      if response_valid:
+        if counter + 1 < len(self.request):
+          self.response_timeouts[tx_addr] = time.monotonic() + timeout
+          msg.send(self.request[counter + 1])
+          self.request_counter[tx_addr] += 1
         else:
-          error_code = dat[2] if len(dat) > 2 else -1
-          if error_code == 0x78:
-            response_timeouts[tx_addr] = time.monotonic() + self.response_pending_timeout
-            cloudlog.error(f"iso-tp query response pending: {tx_addr}")
-          else:
-            request_done[tx_addr] = True
-            cloudlog.error(f"iso-tp query bad response: {tx_addr} - 0x{dat.hex()}")
-
-      # Mark request done if address timed out
-      cur_time = time.monotonic()
-      for tx_addr in response_timeouts:
-        if cur_time - response_timeouts[tx_addr] > 0:
-          if not request_done[tx_addr]:
-            if request_counter[tx_addr] > 0:
-              cloudlog.error(f"iso-tp query timeout after receiving partial response: {tx_addr}")
-            elif tx_addr in addrs_responded:
-              cloudlog.error(f"iso-tp query timeout while receiving response: {tx_addr}")
-            # TODO: handle functional addresses
-            # else:
-            #   cloudlog.error(f"iso-tp query timeout with no response: {tx_addr}")
-          request_done[tx_addr] = True
-
-      # Break if all requests are done (finished or timed out)
-      if all(request_done.values()):
-        break
+          self.results[tx_addr] = dat[len(expected_response):]
+          self._set_done(tx_addr)
+      else:
+        error_code = dat[2] if len(dat) > 2 else -1
+        if error_code == 0x78:
+          self.response_timeouts[tx_addr] = time.monotonic() + self.response_pending_timeout
+          cloudlog.error(f"iso-tp query response pending: {tx_addr}")
+        else:
+          self._set_done(tx_addr)
+          cloudlog.error(f"iso-tp query bad response: {tx_addr} - 0x{dat.hex()}")
+
+    # Mark request done if address timed out. Timeouts are only ever extended,
+    # so nothing can have timed out before the earliest one seen on the last pass
+    cur_time = time.monotonic()
+    if cur_time > self.next_timeout:
+      self.next_timeout = float('inf')
+      for tx_addr, response_timeout in self.response_timeouts.items():
+        if self.request_done[tx_addr]:
+          continue
+        if cur_time - response_timeout > 0:
+          if self.request_counter[tx_addr] > 0:
+            cloudlog.error(f"iso-tp query timeout after receiving partial response: {tx_addr}")
+          elif tx_addr in self.addrs_responded:
+            cloudlog.error(f"iso-tp query timeout while receiving response: {tx_addr}")
+          # TODO: handle functional addresses
+          # else:
+          #   cloudlog.error(f"iso-tp query timeout with no response: {tx_addr}")
+          self._set_done(tx_addr)
+        else:
+          self.next_timeout = min(self.next_timeout, response_timeout)
+
+    if self.num_pending == 0:
+      return True
 
-      if cur_time - start_time > total_timeout:
-        cloudlog.error("iso-tp query timeout while receiving data")
+    if cur_time - self.start_time > self.total_timeout:
+      cloudlog.error("iso-tp query timeout while receiving data")
+      return True
+
+    return False
+
+  def get_results(self) -> dict[AddrType, bytes]:
+    """Responses in the order of the queried addresses, whichever ECU answered first"""
+    return {tx_addr: self.results[tx_addr] for tx_addr in self.msg_addrs if tx_addr in self.results}
+
+  def get_data(self, timeout: float, total_timeout: float = 60.) -> dict[AddrType, bytes]:
+    self._drain_rx()
+    self.start(timeout, total_timeout)
+    while True:
+      self.rx()
+      if self.update():
         break
 
-    return results
+    return self.get_results()
+
+
+def get_dispatch_table(queries: list[IsoTpParallelQuery]) -> dict[tuple[int, int], IsoTpParallelQuery]:
+  """Maps (bus, response address) to the query owning it"""
+  return {key: query for query in queries for key in query.dispatch_table}
+
+
+def dispatch_packets(can_packets, table: dict[tuple[int, int], IsoTpParallelQuery]) -> None:
+  """Walks each received frame once and hands it straight to the query owning its address"""
+  for packet in can_packets:
+    for msg in packet.can:
+      query = table.get((msg.src, msg.address))
+      if query is not None:
+        query.buffer_frame(msg.address, msg.busTime, msg.dat, msg.src)
+
+
+def get_data_concurrent(queries: list[IsoTpParallelQuery], timeout: float, total_timeout: float = 60.) -> list[dict[AddrType, bytes]]:
+  """Runs queries sharing one can socket at the same time, their response addresses must not overlap.
+     Returns the results in the order of the queries, a query that raised returns no results"""
+  if not len(queries):
+    return []
+
+  logcan = queries[0].logcan
+  assert all(q.logcan is logcan for q in queries), "concurrent queries must share a can socket"
+  messaging.drain_sock_raw(logcan)
+
+  table = get_dispatch_table(queries)
+  assert len(table) == sum(len(q.dispatch_table) for q in queries), "concurrent queries must not share response addresses"
+
+  pending = []
+  for query in queries:
+    query.msg_buffer = defaultdict(list)
+    query.rx_updated = set()
+    try:
+      query.start(timeout, total_timeout)
+      pending.append(query)
+    except Exception:
+      cloudlog.exception("iso-tp query exception")
+      query.results = {}
+
+  while len(pending):
+    try:
+      dispatch_packets(messaging.drain_sock(logcan, wait_for_one=True), table)
+    except Exception:
+      # the socket is shared, only the frames of this drain are lost and each query keeps waiting for its own timeouts
+      cloudlog.exception("iso-tp query exception")
+
+    still_pending = []
+    for query in pending:
+      try:
+        if not query.update():
+          still_pending.append(query)
+      except Exception:
+        cloudlog.exception("iso-tp query exception")
+        query.results = {}
+    pending = still_pending
+
+  return [query.get_results() for query in queries]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from openpilot.selfdrive.car import isotp_parallel_query
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+
+REQUEST = b"\x22\xf1\x88"
+RESPONSE = b"\x62\xf1\x88"
+
+
+class SimulatedBus:
+  """
+  ECUs answering REQUEST with a multi-frame response. Their frames arrive a few per wakeup,
+  among unrelated background traffic, the way a busy bus is drained by the query.
+  """
+  def __init__(self, n_ecus, frames_per_wakeup, background_frames):
+    self.responses = {0x600 + 0x10 * i: RESPONSE + f"ECU{i:04d}-FW-VERSION-1234567".encode() for i in range(n_ecus)}
+    self.frames_per_wakeup = frames_per_wakeup
+    self.background = [SimpleNamespace(src=0, address=0x100 + i, dat=b"\x00" * 8, busTime=0) for i in range(background_frames)]
+    self.queue = []
+    self.remaining = {}
+
+  def send(self, msgs):
+    for addr, _, dat, bus in msgs:
+      if addr not in self.responses:
+        continue
+      if dat[0] >> 4 == 0:
+        # single frame request, answered with a first frame
+        response = self.responses[addr]
+        self.queue.append(SimpleNamespace(src=bus, address=addr + 8, dat=bytes([0x10 | len(response) >> 8, len(response) & 0xff]) + response[:6], busTime=0))
+        self.remaining[addr] = response[6:]
+      elif dat[0] == 0x30 and addr in self.remaining:
+        # flow control, answered with all the consecutive frames
+        rest = self.remaining.pop(addr)
+        for idx in range(1, (len(rest) + 6) // 7 + 1):
+          self.queue.append(SimpleNamespace(src=bus, address=addr + 8, dat=bytes([0x20 | idx & 0xf]) + rest[:7].ljust(7, b"\x00"), busTime=0))
+          rest = rest[7:]
+
+  def drain_sock(self, sock, wait_for_one=False):
+    frames, self.queue = self.queue[:self.frames_per_wakeup], self.queue[self.frames_per_wakeup:]
+    return [SimpleNamespace(can=frames + self.background)]
+
+
+class PollingQuery(IsoTpParallelQuery):
+  """Calls recv() on every ISO-TP message on every wakeup, like the query did before frames were dispatched by address"""
+  def update(self):
+    self.rx_updated = set(self.rx_to_tx)
+    return super().update()
+
+
+def run_query(query_cls, n_ecus, frames_per_wakeup, background_frames):
+  bus = SimulatedBus(n_ecus, frames_per_wakeup, background_frames)
+  with mock.patch.object(isotp_parallel_query.messaging, "drain_sock", bus.drain_sock), \
+       mock.patch.object(isotp_parallel_query.messaging, "drain_sock_raw", lambda sock, wait_for_one=False: []), \
+       mock.patch.object(isotp_parallel_query, "can_list_to_can_capnp", lambda msgs, msgtype=None: msgs):
+    query = query_cls(SimpleNamespace(send=bus.send), None, 1, list(bus.responses), [REQUEST], [RESPONSE])
+    t = time.perf_counter()
+    results = query.get_data(0.5)
+    elapsed = time.perf_counter() - t
+
+  assert len(results) == n_ecus, f"{len(results)} of {n_ecus} ECUs responded"
+  return elapsed, results
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Times an ISO-TP query of many simulated ECUs, dispatching frames by address against polling every message",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--ecus", type=int, nargs="+", default=[50, 200, 400])
+  parser.add_argument("--frames-per-wakeup", type=int, default=8, help="response frames delivered per drain of the can socket")
+  parser.add_argument("--background-frames", type=int, default=50, help="unrelated frames in every drain")
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args()
+
+  print(f"{'ECUs':>5} {'polling ms':>11} {'dispatch ms':>12} {'speedup':>8}")
+  for n in args.ecus:
+    times = {}
+    for name, query_cls in (("polling", PollingQuery), ("dispatch", IsoTpParallelQuery)):
+      runs = [run_query(query_cls, n, args.frames_per_wakeup, args.background_frames) for _ in range(args.repeat)]
+      times[name] = np.median([elapsed for elapsed, _ in runs]) * 1e3
+      results = runs[0][1]
+      if name == "polling":
+        expected = results
+      assert list(results.items()) == list(expected.items()), f"{name} results differ with {n} ECUs"
+    print(f"{n:>5} {times['polling']:11.1f} {times['dispatch']:12.1f} {times['polling'] / times['dispatch']:7.1f}x")
@@ -1,14 +1,23 @@
 import onnx
+import hashlib
 import itertools
 import os
 import sys
 import numpy as np
 from typing import Any
 
+from openpilot.common.file_helpers import atomic_write_in_dir
+from openpilot.system.hardware.hw import Paths
+
 from openpilot.selfdrive.classic_modeld.runners.runmodel_pyx import RunModel
 
 ORT_TYPES_TO_NP_TYPES = {'tensor(float16)': np.float16, 'tensor(float)': np.float32, 'tensor(uint8)': np.uint8}
 
+# converted and ORT optimized models, keyed by the hash of the source model
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(Paths.comma_home(), "onnx_cache"))
+# least recently used entries beyond this are removed whenever a new entry is written
+ONNX_CACHE_MAX_BYTES = int(os.getenv("ONNX_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
 def attributeproto_fp16_to_fp32(attr):
   float32_list = np.frombuffer(attr.raw_data, dtype=np.float16)
   attr.data_type = 1
@@ -29,6 +38,49 @@ def convert_fp16_to_fp32(path):
           attributeproto_fp16_to_fp32(a.t)
   return model.SerializeToString()
 
+def get_model_cache_key(path, fp16_to_fp32):
+  with open(path, 'rb') as f:
+    model_hash = hashlib.sha256(f.read()).hexdigest()
+  return f"{model_hash}_{'fp32' if fp16_to_fp32 else 'orig'}"
+
+def touch_cache_entry(path):
+  # the mtime of an entry is its last use, the entries in use are the newest and stay when the cache is pruned
+  try:
+    os.utime(path)
+  except OSError:
+    pass
+
+def prune_onnx_cache(ort_version):
+  """Removes graphs optimized by other ORT versions, then the least recently used entries until the cache fits in ONNX_CACHE_MAX_BYTES"""
+  entries = []
+  for entry in os.scandir(ONNX_CACHE_DIR):
+    if entry.is_file():
+      st = entry.stat()
+      entries.append((st.st_mtime, st.st_size, entry.path))
+
+  total = 0
+  for _, size, path in sorted(entries, reverse=True):
+    stale = "_ort" in os.path.basename(path) and f"_ort{ort_version}_" not in os.path.basename(path)
+    if not stale:
+      total += size
+    if stale or total > ONNX_CACHE_MAX_BYTES:
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+
+def get_fp32_model_path(path, cache_key):
+  """Returns the path of the converted model and whether it was written now"""
+  cache_path = os.path.join(ONNX_CACHE_DIR, f"{cache_key}.onnx")
+  if os.path.isfile(cache_path):
+    touch_cache_entry(cache_path)
+    return cache_path, False
+
+  os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+  with atomic_write_in_dir(cache_path, mode='wb', overwrite=True) as f:
+    f.write(convert_fp16_to_fp32(path))
+  return cache_path, True
+
 def create_ort_session(path, fp16_to_fp32):
   os.environ["OMP_NUM_THREADS"] = "4"
   os.environ["OMP_WAIT_POLICY"] = "PASSIVE"
@@ -50,10 +102,42 @@ def create_ort_session(path, fp16_to_fp32):
     options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
     provider = 'CPUExecutionProvider'
 
-  model_data = convert_fp16_to_fp32(path) if fp16_to_fp32 else path
+  model_data = path
+  optimized_path = None
+  cache_written = False
+  try:
+    cache_key = get_model_cache_key(path, fp16_to_fp32)
+    if fp16_to_fp32:
+      model_data, cache_written = get_fp32_model_path(path, cache_key)
+
+    if provider == 'CPUExecutionProvider':
+      # ORT_ENABLE_ALL optimizations are hardware specific, so only the CPU graph is serialized for reuse
+      optimized_path = os.path.join(ONNX_CACHE_DIR, f"{cache_key}_ort{ort.__version__}_cpu.onnx")
+      if os.path.isfile(optimized_path):
+        touch_cache_entry(optimized_path)
+        model_data = optimized_path
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        optimized_path = None
+      else:
+        options.optimized_model_filepath = optimized_path + ".tmp"
+  except OSError as e:
+    print("Onnx model cache unavailable: ", e, file=sys.stderr)
+    if fp16_to_fp32 and model_data == path:
+      model_data = convert_fp16_to_fp32(path)
+
   print("Onnx selected provider: ", [provider], file=sys.stderr)
   ort_session = ort.InferenceSession(model_data, options, providers=[provider])
   print("Onnx using ", ort_session.get_providers(), file=sys.stderr)
+
+  if optimized_path is not None and os.path.isfile(optimized_path + ".tmp"):
+    os.replace(optimized_path + ".tmp", optimized_path)
+    cache_written = True
+
+  if cache_written:
+    try:
+      prune_onnx_cache(ort.__version__)
+    except OSError as e:
+      print("Onnx model cache not pruned: ", e, file=sys.stderr)
   return ort_session
 
 
@@ -53,9 +53,15 @@ class AlertManager:
       if v.alert.event_type in clear_event_types:
         v.end_frame = -1
 
+      if not v.active(frame):
+        # an inactive entry restarts from scratch when added again, so it's skipped from now on. The key stays
+        # in place since the order of the entries breaks ties between alerts of equal priority and start_frame
+        v.alert = None
+        continue
+
       # sort by priority first and then by start_frame
       greater = current_alert.alert is None or (v.alert.priority, v.start_frame) > (current_alert.alert.priority, current_alert.start_frame)
-      if v.active(frame) and greater:
+      if greater:
         current_alert = v
 
     return current_alert.alert
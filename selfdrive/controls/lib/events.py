@@ -55,6 +55,7 @@ class Events:
     self.events: list[int] = []
     self.static_events: list[int] = []
     self.event_counters = dict.fromkeys(EVENTS.keys(), 0)
+    self.counted_events: set[int] = set()
 
   @property
   def names(self) -> list[int]:
@@ -69,11 +70,17 @@ class Events:
     bisect.insort(self.events, event_name)
 
   def clear(self) -> None:
-    self.event_counters = {k: (v + 1 if k in self.events else 0) for k, v in self.event_counters.items()}
+    # only the counters of events active now or last frame can change
+    active_events = self.event_counters.keys() & self.events
+    for e in self.counted_events - active_events:
+      self.event_counters[e] = 0
+    for e in active_events:
+      self.event_counters[e] += 1
+    self.counted_events = active_events
     self.events = self.static_events.copy()
 
   def contains(self, event_type: str) -> bool:
-    return any(event_type in EVENTS.get(e, {}) for e in self.events)
+    return not EVENTS_BY_TYPE.get(event_type, frozenset()).isdisjoint(self.events)
 
   def create_alerts(self, event_types: list[str], callback_args=None):
     if callback_args is None:
@@ -101,11 +108,7 @@ class Events:
   def to_msg(self):
     ret = []
     for event_name in self.events:
-      event = car.CarEvent.new_message()
-      event.name = event_name
-      for event_type in EVENTS.get(event_name, {}):
-        setattr(event, event_type, True)
-      ret.append(event)
+      ret.append(car.CarEvent.new_message(name=event_name, **EVENT_MSG_FIELDS.get(event_name, {})))
     return ret
 
 
@@ -1243,6 +1246,13 @@ EVENTS: dict[int, dict[str, Alert | AlertCallbackType]] = {
   },
 }
 
+# static lookup tables resolved once from EVENTS
+EVENTS_BY_TYPE: dict[str, frozenset[int]] = {
+  et: frozenset(e for e, alerts in EVENTS.items() if et in alerts)
+  for et in {et for alerts in EVENTS.values() for et in alerts}
+}
+EVENT_MSG_FIELDS: dict[int, dict[str, bool]] = {e: dict.fromkeys(alerts, True) for e, alerts in EVENTS.items()}
+
 
 if __name__ == '__main__':
   # print all alerts by type and priority
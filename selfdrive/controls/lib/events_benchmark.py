@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+
+from cereal import car
+from openpilot.selfdrive.controls.lib.alertmanager import AlertEntry, AlertManager
+from openpilot.selfdrive.controls.lib.events import ET, EVENTS, Alert, Events
+
+# how often an event turns on and off per 100Hz frame: faults that stay on, events that flicker, one frame button presses
+PROFILES = {
+  "sticky": (0.0005, 0.002),
+  "flicker": (0.02, 0.2),
+  "pulse": (0.001, 1.),
+}
+
+
+class PreviousEvents(Events):
+  """Events before the counters and event type lookups were precomputed"""
+  def clear(self):
+    self.event_counters = {k: (v + 1 if k in self.events else 0) for k, v in self.event_counters.items()}
+    self.events = self.static_events.copy()
+
+  def contains(self, event_type):
+    return any(event_type in EVENTS.get(e, {}) for e in self.events)
+
+  def to_msg(self):
+    ret = []
+    for event_name in self.events:
+      event = car.CarEvent.new_message()
+      event.name = event_name
+      for event_type in EVENTS.get(event_name, {}):
+        setattr(event, event_type, True)
+      ret.append(event)
+    return ret
+
+
+class PreviousAlertManager(AlertManager):
+  """AlertManager before expired entries were dropped from the selection"""
+  def process_alerts(self, frame, clear_event_types):
+    current_alert = AlertEntry()
+    for v in self.alerts.values():
+      if not v.alert:
+        continue
+
+      if v.alert.event_type in clear_event_types:
+        v.end_frame = -1
+
+      greater = current_alert.alert is None or (v.alert.priority, v.start_frame) > (current_alert.alert.priority, current_alert.start_frame)
+      if v.active(frame) and greater:
+        current_alert = v
+
+    return current_alert.alert
+
+
+def event_mix(frames, seed):
+  """
+  Events active on each frame. Only events whose alerts need no callback arguments are used, each with a random
+  profile, plus a few static events like controlsd adds at startup.
+  """
+  rng = random.Random(seed)
+  pool = [e for e, alerts in EVENTS.items() if alerts and all(isinstance(a, Alert) for a in alerts.values())]
+  profiles = {e: PROFILES[rng.choice(list(PROFILES))] for e in pool}
+  static = rng.sample(pool, 2)
+
+  active: set[int] = set()
+  mix = []
+  for _ in range(frames):
+    for e in pool:
+      p_on, p_off = profiles[e]
+      if e in active:
+        if rng.random() < p_off:
+          active.discard(e)
+      elif rng.random() < p_on:
+        active.add(e)
+    mix.append(sorted(active))
+  return static, mix
+
+
+def alert_types(events, enabled):
+  """The alert types controlsd's state machine asks for, from the event types present"""
+  types = [ET.PERMANENT]
+  if enabled:
+    if events.contains(ET.USER_DISABLE):
+      types.append(ET.USER_DISABLE)
+    elif events.contains(ET.IMMEDIATE_DISABLE):
+      types.append(ET.IMMEDIATE_DISABLE)
+    elif events.contains(ET.SOFT_DISABLE):
+      types.append(ET.SOFT_DISABLE)
+    elif events.contains(ET.OVERRIDE_LATERAL) or events.contains(ET.OVERRIDE_LONGITUDINAL):
+      types += [ET.OVERRIDE_LATERAL, ET.OVERRIDE_LONGITUDINAL]
+    types.append(ET.WARNING)
+  elif events.contains(ET.ENABLE):
+    types.append(ET.NO_ENTRY if events.contains(ET.NO_ENTRY) else ET.ENABLE)
+  return types
+
+
+def run(events_cls, am_cls, static, mix, record):
+  """Runs controlsd's per frame event and alert work, returns what it produced on each frame if record is set"""
+  events, AM = events_cls(), am_cls()
+  for e in static:
+    events.add(e, static=True)
+
+  enabled = False
+  frames = []
+  for frame, active in enumerate(mix):
+    events.clear()
+    for e in active:
+      events.add(e)
+
+    types = alert_types(events, enabled)
+    if ET.ENABLE in types:
+      enabled = True
+    elif ET.USER_DISABLE in types or ET.IMMEDIATE_DISABLE in types:
+      enabled = False
+
+    clear_event_types = set()
+    if ET.WARNING not in types:
+      clear_event_types.add(ET.WARNING)
+    if enabled:
+      clear_event_types.add(ET.NO_ENTRY)
+
+    AM.add_many(frame, events.create_alerts(types))
+    alert = AM.process_alerts(frame, clear_event_types)
+    msg = events.to_msg()
+
+    if record:
+      frames.append((
+        list(events.names), {e: c for e, c in events.event_counters.items() if c}, types,
+        None if alert is None else alert.alert_type,
+        {k: (v.start_frame, v.end_frame) for k, v in AM.alerts.items() if v.alert and v.active(frame)},
+        [m.to_dict() for m in msg],
+      ))
+  return frames
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Replays random event mixes through Events and AlertManager like controlsd does, compares the "
+                                               "time per frame with the previous clear()/contains()/to_msg()/process_alerts() and checks "
+                                               "that both produce the same events, counters and alerts",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--frames", type=int, default=30000, help="100Hz controlsd frames")
+  parser.add_argument("--seeds", type=int, default=3)
+  args = parser.parse_args()
+
+  print(f"{'seed':>4} {'alerts shown':>13} {'before us':>10} {'after us':>10} {'speedup':>8}")
+  for seed in range(args.seeds):
+    static, mix = event_mix(args.frames, seed)
+    before = run(PreviousEvents, PreviousAlertManager, static, mix, record=True)
+    after = run(Events, AlertManager, static, mix, record=True)
+    for frame, (a, b) in enumerate(zip(before, after, strict=True)):
+      assert a == b, f"seed {seed} frame {frame} differs:\n{a}\n{b}"
+
+    times = {}
+    for name, events_cls, am_cls in (("before", PreviousEvents, PreviousAlertManager), ("after", Events, AlertManager)):
+      t = time.perf_counter()
+      run(events_cls, am_cls, static, mix, record=False)
+      times[name] = (time.perf_counter() - t) / args.frames
+    shown = len({f[3] for f in before} - {None})
+    print(f"{seed:>4} {shown:>13} {times['before'] * 1e6:10.1f} {times['after'] * 1e6:10.1f} {times['before'] / times['after']:7.1f}x")
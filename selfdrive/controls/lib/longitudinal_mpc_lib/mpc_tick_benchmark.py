@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import LEAD_ACCEL_TAU, LongitudinalMpc, N
+
+
+def run_ticks(mpc, ticks):
+  """Per tick time spent in update() outside of the acados solve, in us"""
+  mpc.reset()
+  v_ego, a_ego = 20., 0.
+  x, v, a, j = np.zeros(N+1), np.zeros(N+1), np.zeros(N+1), np.zeros(N+1)
+  no_lead = SimpleNamespace(status=False, modelProb=0.)
+  overheads = []
+  for tick in range(ticks):
+    # a lead slowing down and speeding up again in front of a car cruising at 20 m/s
+    lead = SimpleNamespace(status=True, dRel=40. + 10. * np.sin(tick / 50), vLead=18. + 4. * np.sin(tick / 80), aLeadK=0., aLeadTau=LEAD_ACCEL_TAU, modelProb=1.)
+
+    t = time.perf_counter()
+    mpc.set_weights()
+    mpc.set_accel_limits(-1.2, 1.6)
+    mpc.set_cur_state(v_ego, a_ego)
+    mpc.update(lead, no_lead, 25., x, v, a, j, False, 1.45, False)
+    elapsed = time.perf_counter() - t
+
+    overheads.append(elapsed - mpc.solve_time)
+    v_ego, a_ego = float(mpc.v_solution[1]), float(mpc.a_solution[1])
+  return np.array(overheads) * 1e6
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Compares the per tick Python overhead of LongitudinalMpc with the per stage set/get loops and with set_all/get_all",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--ticks", type=int, default=2000, help="20Hz planner ticks to run")
+  args = parser.parse_args()
+
+  mpc = LongitudinalMpc()
+  modes = [("per stage", False)] + ([("set_all", True)] if mpc.solver_batched else [])
+
+  print(f"{'mode':<12} {'mean us':>9} {'p99 us':>9}")
+  for name, batched in modes:
+    mpc.solver_batched = batched
+    overheads = run_ticks(mpc, args.ticks)
+    print(f"{name:<12} {np.mean(overheads):9.1f} {np.percentile(overheads, 99):9.1f}")
+
+  if not mpc.solver_batched:
+    print("acados_ocp_solver_pyx.so has no set_all/get_all, regenerate the solver to compare")
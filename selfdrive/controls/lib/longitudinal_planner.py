@@ -140,9 +140,10 @@ class Lead:
 
 
 class LongitudinalPlanner:
-  def __init__(self, CP, init_v=0.0, init_a=0.0, dt=DT_MDL):
+  def __init__(self, CP, init_v=0.0, init_a=0.0, dt=DT_MDL, mpc=None):
     self.CP = CP
-    self.mpc = LongitudinalMpc(dt=dt)
+    # an existing solver can be passed in to avoid recreating it, e.g. for offline simulation
+    self.mpc = LongitudinalMpc(dt=dt) if mpc is None else mpc
     self.fcw = False
     self.dt = dt
     self.allow_throttle = True
@@ -14,7 +14,6 @@ A depends on longitudinal speed, u [m/s], and vehicle parameters CP
 """
 
 import numpy as np
-from numpy.linalg import solve
 
 from cereal import car
 
@@ -37,14 +36,25 @@ class VehicleModel:
 
     self.cF_orig: float = CP.tireStiffnessFront
     self.cR_orig: float = CP.tireStiffnessRear
+    self.stiffness_factor: float | None = None
     self.update_params(1.0, CP.steerRatio)
 
   def update_params(self, stiffness_factor: float, steer_ratio: float) -> None:
     """Update the vehicle model with a new stiffness factor and steer ratio"""
+    # called every control cycle, usually with unchanged values
+    if stiffness_factor == self.stiffness_factor and steer_ratio == self.sR:
+      return
+
+    self.stiffness_factor = stiffness_factor
     self.cF: float = stiffness_factor * self.cF_orig
     self.cR: float = stiffness_factor * self.cR_orig
     self.sR: float = steer_ratio
 
+    # speed independent terms of the steady state queries, only depend on the parameters above
+    self.sf: float = calc_slip_factor(self)
+    self.inv_sf: float | None = None if abs(self.sf) < 1e-6 else 1 / self.sf
+    self.curvature_factor_0: float = (1. - self.chi) / self.l
+
   def steady_state_sol(self, sa: float, u: float, roll: float) -> np.ndarray:
     """Returns the steady state solution.
 
@@ -75,7 +85,7 @@ class VehicleModel:
     Returns:
       Curvature factor [1/m]
     """
-    return (self.curvature_factor(u) * sa / self.sR) + self.roll_compensation(roll, u)
+    return (self.curvature_factor_0 / (1. - self.sf * u**2) * sa / self.sR) + self.roll_compensation(roll, u)
 
   def curvature_factor(self, u: float) -> float:
     """Returns the curvature factor.
@@ -87,8 +97,7 @@ class VehicleModel:
     Returns:
       Curvature factor [1/m]
     """
-    sf = calc_slip_factor(self)
-    return (1. - self.chi) / (1. - sf * u**2) / self.l
+    return self.curvature_factor_0 / (1. - self.sf * u**2)
 
   def get_steer_from_curvature(self, curv: float, u: float, roll: float) -> float:
     """Calculates the required steering wheel angle for a given curvature
@@ -102,7 +111,7 @@ class VehicleModel:
       Steering wheel angle [rad]
     """
 
-    return (curv - self.roll_compensation(roll, u)) * self.sR * 1.0 / self.curvature_factor(u)
+    return (curv - self.roll_compensation(roll, u)) * self.sR * (1. - self.sf * u**2) / self.curvature_factor_0
 
   def roll_compensation(self, roll: float, u: float) -> float:
     """Calculates the roll-compensation to curvature
@@ -114,12 +123,10 @@ class VehicleModel:
     Returns:
       Roll compensation curvature [rad]
     """
-    sf = calc_slip_factor(self)
-
-    if abs(sf) < 1e-6:
+    if self.inv_sf is None:
       return 0
     else:
-      return (ACCELERATION_DUE_TO_GRAVITY * roll) / ((1 / sf) - u**2)
+      return (ACCELERATION_DUE_TO_GRAVITY * roll) / (self.inv_sf - u**2)
 
   def get_steer_from_yaw_rate(self, yaw_rate: float, u: float, roll: float) -> float:
     """Calculates the required steering wheel angle for a given yaw_rate
@@ -219,8 +226,12 @@ def dyn_ss_sol(sa: float, u: float, roll: float, VM: VehicleModel) -> np.ndarray
     2x1 matrix with steady state solution
   """
   A, B = create_dyn_state_matrices(u, VM)
-  inp = np.array([[sa], [roll]])
-  return -solve(A, B) @ inp  # type: ignore
+  # B @ [sa, roll], then the 2x2 solve in closed form
+  b0 = B[0, 0] * sa + B[0, 1] * roll
+  b1 = B[1, 0] * sa + B[1, 1] * roll
+  det = A[0, 0] * A[1, 1] - A[0, 1] * A[1, 0]
+  return np.array([[-(A[1, 1] * b0 - A[0, 1] * b1) / det],
+                   [-(A[0, 0] * b1 - A[1, 0] * b0) / det]])
 
 
 def calc_slip_factor(VM: VehicleModel) -> float:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from openpilot.selfdrive.controls.lib.vehicle_model import ACCELERATION_DUE_TO_GRAVITY, VehicleModel, calc_slip_factor, \
+                                                           create_dyn_state_matrices, dyn_ss_sol, kin_ss_sol
+
+# understeering sedan and SUV, and a neutral steering car whose slip factor is zero
+CARS = {
+  "sedan": SimpleNamespace(mass=1500., rotationalInertia=2500., wheelbase=2.7, centerToFront=1.2, tireStiffnessFront=200000.,
+                           tireStiffnessRear=220000., steerRatio=15., steerRatioRear=0.),
+  "suv": SimpleNamespace(mass=2200., rotationalInertia=4200., wheelbase=2.9, centerToFront=1.3, tireStiffnessFront=240000.,
+                         tireStiffnessRear=300000., steerRatio=16.5, steerRatioRear=0.),
+  "neutral": SimpleNamespace(mass=1300., rotationalInertia=2000., wheelbase=2.6, centerToFront=1.3, tireStiffnessFront=180000.,
+                             tireStiffnessRear=180000., steerRatio=14., steerRatioRear=0.),
+}
+
+RTOL, ATOL = 1e-9, 1e-12
+
+
+class RecomputingVehicleModel(VehicleModel):
+  """VehicleModel before the speed independent terms were cached, every query recomputes the slip factor"""
+  def update_params(self, stiffness_factor, steer_ratio):
+    self.cF = stiffness_factor * self.cF_orig
+    self.cR = stiffness_factor * self.cR_orig
+    self.sR = steer_ratio
+
+  def steady_state_sol(self, sa, u, roll):
+    if u > 0.1:
+      return dyn_ss_sol_solve(sa, u, roll, self)
+    else:
+      return kin_ss_sol(sa, u, self)
+
+  def calc_curvature(self, sa, u, roll):
+    return (self.curvature_factor(u) * sa / self.sR) + self.roll_compensation(roll, u)
+
+  def curvature_factor(self, u):
+    sf = calc_slip_factor(self)
+    return (1. - self.chi) / (1. - sf * u**2) / self.l
+
+  def get_steer_from_curvature(self, curv, u, roll):
+    return (curv - self.roll_compensation(roll, u)) * self.sR * 1.0 / self.curvature_factor(u)
+
+  def roll_compensation(self, roll, u):
+    sf = calc_slip_factor(self)
+
+    if abs(sf) < 1e-6:
+      return 0
+    else:
+      return (ACCELERATION_DUE_TO_GRAVITY * roll) / ((1 / sf) - u**2)
+
+
+def dyn_ss_sol_solve(sa, u, roll, VM):
+  A, B = create_dyn_state_matrices(u, VM)
+  inp = np.array([[sa], [roll]])
+  return -np.linalg.solve(A, B) @ inp
+
+
+def check_accuracy():
+  """Compares every steady state query of both models over a grid of params, speeds, steer angles and roll"""
+  speeds = np.linspace(0.05, 40., 25)
+  steer_angles = np.linspace(-1., 1., 9)
+  rolls = np.linspace(-0.1, 0.1, 5)
+  stiffness_factors = (0.5, 1.0, 1.5)
+  steer_ratios = (10., 15., 20.)
+
+  points = 0
+  for CP in CARS.values():
+    before, after = RecomputingVehicleModel(CP), VehicleModel(CP)
+    # changes only the steer ratio, then only the stiffness factor, so stale cached terms would show up
+    param_sets = list(itertools.product(stiffness_factors, steer_ratios)) + [(sf, sr) for sr, sf in itertools.product(steer_ratios, stiffness_factors)]
+    for sf, sr in param_sets:
+      before.update_params(sf, sr)
+      after.update_params(sf, sr)
+      for u, sa, roll in itertools.product(speeds, steer_angles, rolls):
+        curv = before.calc_curvature(sa, u, roll)
+        for name, a, b in (
+          ("calc_curvature", curv, after.calc_curvature(sa, u, roll)),
+          ("curvature_factor", before.curvature_factor(u), after.curvature_factor(u)),
+          ("roll_compensation", before.roll_compensation(roll, u), after.roll_compensation(roll, u)),
+          ("get_steer_from_curvature", before.get_steer_from_curvature(curv, u, roll), after.get_steer_from_curvature(curv, u, roll)),
+          ("get_steer_from_yaw_rate", before.get_steer_from_yaw_rate(curv * u, u, roll), after.get_steer_from_yaw_rate(curv * u, u, roll)),
+          ("steady_state_sol", before.steady_state_sol(sa, u, roll), after.steady_state_sol(sa, u, roll)),
+          ("dyn_ss_sol", dyn_ss_sol_solve(sa, u, roll, before), dyn_ss_sol(sa, u, roll, after)),
+        ):
+          np.testing.assert_allclose(b, a, rtol=RTOL, atol=ATOL, err_msg=f"{name} at u={u}, sa={sa}, roll={roll}, sf={sf}, sr={sr}")
+        points += 1
+  return points
+
+
+def time_ticks(VM, ticks, param_change_every):
+  """Seconds per 100Hz controlsd tick: update_params, the curvature from the steering angle in controlsd and
+     latcontrol_torque, and the steering angle for the desired curvature in latcontrol_pid/angle"""
+  t = time.perf_counter()
+  for tick in range(ticks):
+    # liveParameters arrives at 20Hz, every message moves the estimates a little
+    n = tick // param_change_every
+    VM.update_params(1.0 + 1e-4 * (n % 50), 15. + 1e-3 * (n % 50))
+    u = 5. + (tick % 3000) / 100.
+    VM.calc_curvature(0.05, u, 0.01)
+    VM.calc_curvature(0.05, u, 0.01)
+    VM.calc_curvature(0.1, u, 0.0)
+    VM.calc_curvature(0.02, u, 0.0)
+    VM.get_steer_from_curvature(-0.002, u, 0.01)
+  return (time.perf_counter() - t) / ticks
+
+
+def time_dyn_ss_sol(solve, VM, calls):
+  t = time.perf_counter()
+  for i in range(calls):
+    solve(0.05, 5. + (i % 3000) / 100., 0.01, VM)
+  return (time.perf_counter() - t) / calls
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Times the per tick VehicleModel calls and dyn_ss_sol against the previous recomputing model "
+                                               "and np.linalg.solve, and checks that both agree",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--ticks", type=int, default=100000)
+  parser.add_argument("--param-change-every", type=int, default=5, help="ticks between changes of the stiffness factor and steer ratio")
+  args = parser.parse_args()
+
+  points = check_accuracy()
+  print(f"{points} grid points agree within rtol={RTOL}, atol={ATOL}")
+
+  CP = CARS["sedan"]
+  print(f"{'':<24} {'before us':>10} {'after us':>10} {'speedup':>8}")
+  before = time_ticks(RecomputingVehicleModel(CP), args.ticks, args.param_change_every)
+  after = time_ticks(VehicleModel(CP), args.ticks, args.param_change_every)
+  print(f"{'controlsd tick':<24} {before * 1e6:10.2f} {after * 1e6:10.2f} {before / after:7.1f}x")
+  before = time_dyn_ss_sol(dyn_ss_sol_solve, RecomputingVehicleModel(CP), args.ticks)
+  after = time_dyn_ss_sol(dyn_ss_sol, VehicleModel(CP), args.ticks)
+  print(f"{'dyn_ss_sol':<24} {before * 1e6:10.2f} {after * 1e6:10.2f} {before / after:7.1f}x")
@@ -10,6 +10,7 @@ from datetime import date, timedelta
 from dateutil import easter
 
 from openpilot.common.basedir import BASEDIR
+from openpilot.common.file_helpers import atomic_write_in_dir
 
 from openpilot.selfdrive.frogpilot.assets.download_functions import GITHUB_URL, GITLAB_URL, download_file, get_repository_url, handle_error, handle_request_error, verify_download
 from openpilot.selfdrive.frogpilot.frogpilot_variables import ACTIVE_THEME_PATH, RANDOM_EVENTS_PATH, THEME_SAVE_PATH, params, params_memory, update_frogpilot_toggles
@@ -20,6 +21,13 @@ DOWNLOAD_PROGRESS_PARAM = "ThemeDownloadProgress"
 HOLIDAY_THEME_PATH = os.path.join(BASEDIR, "selfdrive", "frogpilot", "assets", "holiday_themes")
 STOCKOP_THEME_PATH = os.path.join(BASEDIR, "selfdrive", "frogpilot", "assets", "stock_theme")
 
+ASSET_CATALOG_PATH = os.path.join(THEME_SAVE_PATH, "asset_catalog.json")
+ASSET_BRANCHES = ("Themes", "Distance-Icons", "Steering-Wheels")
+ASSET_REPOSITORY = "FrogAi/FrogPilot-Resources"
+
+GITHUB_API_URL = "https://api.github.com/repos"
+GITLAB_API_URL = "https://gitlab.com/api/v4/projects"
+
 def update_theme_asset(asset_type, theme, holiday_theme):
   save_location = os.path.join(ACTIVE_THEME_PATH, asset_type)
 
@@ -103,10 +111,41 @@ def update_wheel_image(image, holiday_theme=None, random_event=True):
     print(f"Linked {destination_file} to {source_file}")
 
 
+def list_directory(path, directories_only=False):
+  try:
+    with os.scandir(path) as entries:
+      return [entry.name for entry in entries if not directories_only or entry.is_dir()]
+  except (FileNotFoundError, NotADirectoryError):
+    return []
+
+def index_local_assets():
+  """Returns the display names of the downloaded assets of each type from a single scan of THEME_SAVE_PATH"""
+  local_assets = {asset_type: set() for asset_type in ("colors", "distance_icons", "icons", "signals", "sounds", "wheels")}
+
+  theme_packs_directory = os.path.join(THEME_SAVE_PATH, "theme_packs")
+  for theme in list_directory(theme_packs_directory, directories_only=True):
+    theme_name = theme.replace('_', ' ').title()
+    for theme_component in list_directory(os.path.join(theme_packs_directory, theme), directories_only=True):
+      if theme_component in ("colors", "icons", "signals", "sounds"):
+        local_assets[theme_component].add(theme_name)
+
+  for distance_icons in list_directory(os.path.join(THEME_SAVE_PATH, "distance_icons")):
+    local_assets["distance_icons"].add(distance_icons.replace('_', ' ').split('.')[0].title())
+
+  for wheel in list_directory(os.path.join(THEME_SAVE_PATH, "steering_wheels")):
+    if wheel != "img_chffr_wheel.png":
+      local_assets["wheels"].add(wheel.replace('_', ' ').split('.')[0].title())
+
+  return local_assets
+
+
 class ThemeManager:
   def __init__(self):
     self.previous_assets = {}
 
+    self.catalog = None
+    self.listed_assets = None
+
   @staticmethod
   def calculate_thanksgiving(year):
     november_first = date(year, 11, 1)
@@ -209,70 +248,109 @@ class ThemeManager:
       handle_request_error(error, None, None, None, None)
       return []
 
-  @staticmethod
-  def fetch_assets(repo_url):
-    repo = "FrogAi/FrogPilot-Resources"
-    branches = ["Themes", "Distance-Icons", "Steering-Wheels"]
+  def load_catalog(self):
+    try:
+      with open(ASSET_CATALOG_PATH) as f:
+        self.catalog = json.load(f)
+    except (OSError, ValueError):
+      self.catalog = {}
 
+  def save_catalog(self):
+    try:
+      os.makedirs(os.path.dirname(ASSET_CATALOG_PATH), exist_ok=True)
+      with atomic_write_in_dir(ASSET_CATALOG_PATH, overwrite=True) as f:
+        json.dump(self.catalog, f)
+    except OSError as error:
+      print(f"Failed to save the asset catalog: {error}")
+
+  def fetch_tree(self, api_url, github):
+    """
+    Returns the blob paths of a branch and whether they were refreshed. The request is conditional on the
+    ETag or Last-Modified of the cached listing, and the cached listing is used if the request fails.
+    """
+    cached = self.catalog.get(api_url)
+
+    headers = {}
+    if cached is not None:
+      if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+      if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+      print(f"Fetching assets: {api_url}")
+      response = requests.get(api_url, headers=headers, timeout=10)
+      if response.status_code == 304 and cached is not None:
+        return cached["paths"], False
+      response.raise_for_status()
+      content = response.json()
+    except (requests.exceptions.RequestException, ValueError) as error:
+      print(f"Error occurred when fetching {api_url}: {error}")
+      return (cached["paths"] if cached is not None else []), False
+
+    items = content.get('tree', []) if github else content
+    paths = [item["path"] for item in items if item["type"] == "blob"]
+
+    self.catalog[api_url] = {
+      "etag": response.headers.get("ETag"),
+      "last_modified": response.headers.get("Last-Modified"),
+      "paths": paths
+    }
+    return paths, True
+
+  def fetch_assets(self, repo_url):
     assets = {
       "themes": {},
       "distance_icons": [],
       "wheels": []
     }
 
-    if "github" in repo_url:
-      base_api_url = "https://api.github.com/repos"
+    github = "github" in repo_url
+    if github:
+      repo_api_url = f"{GITHUB_API_URL}/{ASSET_REPOSITORY}"
     elif "gitlab" in repo_url:
-      base_api_url = "https://gitlab.com/api/v4/projects"
-      repo = repo.replace("/", "%2F")
+      repo_api_url = f"{GITLAB_API_URL}/{ASSET_REPOSITORY.replace('/', '%2F')}"
     else:
       print(f"Unsupported repository URL: {repo_url}")
       return assets
 
-    for branch in branches:
-      if "github" in repo_url:
-        api_url = f"{base_api_url}/{repo}/git/trees/{branch}?recursive=1"
-      elif "gitlab" in repo_url:
-        api_url = f"{base_api_url}/{repo}/repository/tree?ref={branch}&recursive=true"
-
-      try:
-        print(f"Fetching assets from branch '{branch}': {api_url}")
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        content = response.json()
-
-        if "github" in repo_url:
-          items = content.get('tree', [])
-        elif "gitlab" in repo_url:
-          items = content
-
-        for item in items:
-          if item["type"] != "blob":
-            continue
-
-          item_path = item["path"].lower()
-          if branch == "Themes":
-            theme_name = item["path"].split('/')[0]
-            assets["themes"].setdefault(theme_name, set())
-            if "icons" in item_path:
-              assets["themes"][theme_name].add("icons")
-            elif "signals" in item_path:
-              assets["themes"][theme_name].add("signals")
-            elif "sounds" in item_path:
-              assets["themes"][theme_name].add("sounds")
-            else:
-              assets["themes"][theme_name].add("colors")
-
-          elif branch == "Distance-Icons":
-            assets["distance_icons"].append(item["path"])
-
-          elif branch == "Steering-Wheels":
-            assets["wheels"].append(item["path"])
-
-      except requests.exceptions.RequestException as error:
-        print(f"Error occurred when fetching from branch '{branch}': {error}")
-
-    assets["themes"] = {k: list(v) for k, v in assets["themes"].items()}
+    if self.catalog is None:
+      self.load_catalog()
+
+    catalog_updated = False
+    for branch in ASSET_BRANCHES:
+      if github:
+        api_url = f"{repo_api_url}/git/trees/{branch}?recursive=1"
+      else:
+        api_url = f"{repo_api_url}/repository/tree?ref={branch}&recursive=true"
+
+      paths, updated = self.fetch_tree(api_url, github)
+      catalog_updated |= updated
+
+      for path in paths:
+        if branch == "Themes":
+          theme_name = path.split('/')[0]
+          item_path = path.lower()
+          assets["themes"].setdefault(theme_name, set())
+          if "icons" in item_path:
+            assets["themes"][theme_name].add("icons")
+          elif "signals" in item_path:
+            assets["themes"][theme_name].add("signals")
+          elif "sounds" in item_path:
+            assets["themes"][theme_name].add("sounds")
+          else:
+            assets["themes"][theme_name].add("colors")
+
+        elif branch == "Distance-Icons":
+          assets["distance_icons"].append(path)
+
+        elif branch == "Steering-Wheels":
+          assets["wheels"].append(path)
+
+    if catalog_updated:
+      self.save_catalog()
+
+    assets["themes"] = {k: sorted(v) for k, v in assets["themes"].items()}
     return assets
 
   def handle_existing_theme(self, theme_name, theme_param):
@@ -349,40 +427,22 @@ class ThemeManager:
 
     self.handle_verification_failure(extensions, theme_component, theme_name, theme_param, download_path)
 
-  def update_theme_params(self, downloadable_colors, downloadable_distance_icons, downloadable_icons, downloadable_signals, downloadable_sounds, downloadable_wheels):
-    def filter_existing_assets(assets, subfolder):
-      existing_themes = {
-        theme.replace('_', ' ').title()
-        for theme in os.listdir(os.path.join(THEME_SAVE_PATH, "theme_packs"))
-        if os.path.isdir(os.path.join(THEME_SAVE_PATH, "theme_packs", theme, subfolder))
-      }
-      return sorted(set(assets) - existing_themes)
-
-    params.put("DownloadableColors", ','.join(filter_existing_assets(downloadable_colors, "colors")))
+  def update_theme_params(self, downloadable_colors, downloadable_distance_icons, downloadable_icons, downloadable_signals, downloadable_sounds, downloadable_wheels, local_assets):
+    params.put("DownloadableColors", ','.join(sorted(set(downloadable_colors) - local_assets["colors"])))
     print("Colors list updated successfully")
 
-    distance_icons_directory = os.path.join(THEME_SAVE_PATH, "distance_icons")
-    params.put("DownloadableDistanceIcons", ','.join(sorted(set(downloadable_distance_icons) - {
-        distance_icons.replace('_', ' ').split('.')[0].title()
-        for distance_icons in os.listdir(distance_icons_directory)
-      }))
-    )
+    params.put("DownloadableDistanceIcons", ','.join(sorted(set(downloadable_distance_icons) - local_assets["distance_icons"])))
 
-    params.put("DownloadableIcons", ','.join(filter_existing_assets(downloadable_icons, "icons")))
+    params.put("DownloadableIcons", ','.join(sorted(set(downloadable_icons) - local_assets["icons"])))
     print("Icons list updated successfully")
 
-    params.put("DownloadableSignals", ','.join(filter_existing_assets(downloadable_signals, "signals")))
+    params.put("DownloadableSignals", ','.join(sorted(set(downloadable_signals) - local_assets["signals"])))
     print("Signals list updated successfully")
 
-    params.put("DownloadableSounds", ','.join(filter_existing_assets(downloadable_sounds, "sounds")))
+    params.put("DownloadableSounds", ','.join(sorted(set(downloadable_sounds) - local_assets["sounds"])))
     print("Sounds list updated successfully")
 
-    wheel_directory = os.path.join(THEME_SAVE_PATH, "steering_wheels")
-    params.put("DownloadableWheels", ','.join(sorted(set(downloadable_wheels) - {
-        wheel.replace('_', ' ').split('.')[0].title()
-        for wheel in os.listdir(wheel_directory) if wheel != "img_chffr_wheel.png"
-      }))
-    )
+    params.put("DownloadableWheels", ','.join(sorted(set(downloadable_wheels) - local_assets["wheels"])))
 
   def validate_themes(self, frogpilot_toggles):
     asset_mappings = {
@@ -426,6 +486,12 @@ class ThemeManager:
       self.validate_themes(frogpilot_toggles)
 
     assets = self.fetch_assets(repo_url)
+    local_assets = index_local_assets()
+
+    # nothing to update if neither the remote catalog nor the downloaded assets changed since the last run
+    if (assets, local_assets) == self.listed_assets:
+      return
+    self.listed_assets = (assets, local_assets)
 
     downloadable_colors = []
     downloadable_icons = []
@@ -455,4 +521,4 @@ class ThemeManager:
     print(f"Downloadable Distance Icons: {downloadable_distance_icons}")
     print(f"Downloadable Wheels: {downloadable_wheels}")
 
-    self.update_theme_params(downloadable_colors, downloadable_distance_icons, downloadable_icons, downloadable_signals, downloadable_sounds, downloadable_wheels)
+    self.update_theme_params(downloadable_colors, downloadable_distance_icons, downloadable_icons, downloadable_signals, downloadable_sounds, downloadable_wheels, local_assets)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import time
+
+import numpy as np
+
+from openpilot.common.numpy_fast import interp
+from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_features import FrogPilotFeatures
+from openpilot.tools.lib.logreader import LogReader
+
+
+def previous_calculate_lane_width(lane, current_lane, road_edge):
+  """calculate_lane_width before FrogPilotFeatures, converting the model arrays on every call"""
+  current_x = np.array(current_lane.x)
+  current_y = np.array(current_lane.y)
+
+  lane_y_interp = interp(current_x, np.array(lane.x), np.array(lane.y))
+  road_edge_y_interp = interp(current_x, np.array(road_edge.x), np.array(road_edge.y))
+
+  distance_to_lane = np.mean(np.abs(current_y - lane_y_interp))
+  distance_to_road_edge = np.mean(np.abs(current_y - road_edge_y_interp))
+
+  return float(min(distance_to_lane, distance_to_road_edge))
+
+
+def previous_calculate_road_curvature(modelData, v_ego):
+  """calculate_road_curvature before FrogPilotFeatures"""
+  orientation_rate = np.abs(modelData.orientationRate.z)
+  velocity = modelData.velocity.x
+  max_pred_lat_acc = np.amax(orientation_rate * velocity)
+  return max_pred_lat_acc / max(v_ego, 1)**2
+
+
+def converted_features(modelData, v_ego):
+  """The same features as FrogPilotPlanner computed them before FrogPilotFeatures"""
+  lane_width_left = previous_calculate_lane_width(modelData.laneLines[0], modelData.laneLines[1], modelData.roadEdges[0])
+  lane_width_right = previous_calculate_lane_width(modelData.laneLines[3], modelData.laneLines[2], modelData.roadEdges[1])
+  return lane_width_left, lane_width_right, previous_calculate_road_curvature(modelData, v_ego)
+
+
+def extracted_features(frogpilot_features, modelData, v_ego):
+  lane_width_left, lane_width_right = frogpilot_features.calculate_lane_widths(modelData.laneLines, modelData.roadEdges)
+  return lane_width_left, lane_width_right, frogpilot_features.calculate_road_curvature(modelData, v_ego)
+
+
+def benchmark(route):
+  frogpilot_features = FrogPilotFeatures()
+
+  v_ego = 0
+  converted_times, extracted_times = [], []
+  for msg in LogReader(route):
+    if msg.which() == "carState":
+      v_ego = max(msg.carState.vEgo, 0)
+      continue
+    if msg.which() != "modelV2" or len(msg.modelV2.laneLines) != 4:
+      continue
+
+    modelData = msg.modelV2
+
+    t = time.perf_counter()
+    expected = converted_features(modelData, v_ego)
+    converted_times.append(time.perf_counter() - t)
+
+    t = time.perf_counter()
+    features = extracted_features(frogpilot_features, modelData, v_ego)
+    extracted_times.append(time.perf_counter() - t)
+
+    assert all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9) for a, b in zip(expected, features, strict=True)), f"features diverged: {expected} != {features}"
+
+  assert converted_times, f"no modelV2 frames in {route}"
+  converted_times, extracted_times = np.array(converted_times) * 1e6, np.array(extracted_times) * 1e6
+  print(f"{len(converted_times)} modelV2 frames of {route}")
+  print(f"{'':<12} {'mean us':>9} {'p99 us':>9} {'max us':>9}")
+  for name, times in (("converted", converted_times), ("extracted", extracted_times)):
+    print(f"{name:<12} {np.mean(times):9.1f} {np.percentile(times, 99):9.1f} {np.max(times):9.1f}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Times the per frame lane width and road curvature computation of FrogPilotFeatures on a recorded route, "
+                                               "against converting the model arrays where they are used, and checks that both give the same values",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("route", help="route or segment to replay the modelV2 and carState messages of, e.g. a rlog path or '<route>/0'")
+  args = parser.parse_args()
+
+  benchmark(args.route)
@@ -3,33 +3,34 @@ import cereal.messaging as messaging
 from openpilot.common.conversions import Conversions as CV
 
 from openpilot.selfdrive.controls.lib.drive_helpers import V_CRUISE_UNSET
-from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import A_CHANGE_COST, DANGER_ZONE_COST, J_EGO_COST, STOP_DISTANCE
+from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import A_CHANGE_COST, DANGER_ZONE_COST, J_EGO_COST
 from openpilot.selfdrive.controls.lib.longitudinal_planner import Lead
 
 from openpilot.selfdrive.frogpilot.controls.lib.conditional_experimental_mode import ConditionalExperimentalMode
 from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_acceleration import FrogPilotAcceleration
 from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_events import FrogPilotEvents
+from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_features import FrogPilotFeatures
 from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_following import FrogPilotFollowing
 from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_vcruise import FrogPilotVCruise
-from openpilot.selfdrive.frogpilot.frogpilot_utilities import MovingAverageCalculator, calculate_lane_width, calculate_road_curvature
-from openpilot.selfdrive.frogpilot.frogpilot_variables import CRUISING_SPEED, MODEL_LENGTH, NON_DRIVING_GEARS, PLANNER_TIME, THRESHOLD
+from openpilot.selfdrive.frogpilot.frogpilot_variables import NON_DRIVING_GEARS
 
 class FrogPilotPlanner:
   def __init__(self):
     self.cem = ConditionalExperimentalMode(self)
     self.frogpilot_acceleration = FrogPilotAcceleration(self)
     self.frogpilot_events = FrogPilotEvents(self)
+    self.frogpilot_features = FrogPilotFeatures()
     self.frogpilot_following = FrogPilotFollowing(self)
     self.frogpilot_vcruise = FrogPilotVCruise(self)
     self.lead_one = Lead()
 
-    self.tracking_lead_mac = MovingAverageCalculator()
-
     self.lateral_check = False
     self.model_stopped = False
     self.slower_lead = False
     self.tracking_lead = False
 
+    self.lane_width_left = 0
+    self.lane_width_right = 0
     self.model_length = 0
     self.road_curvature = 1
     self.v_cruise = 0
@@ -50,6 +51,9 @@ class FrogPilotPlanner:
     v_ego = max(carState.vEgo, 0)
     v_lead = self.lead_one.vLead
 
+    # the sub-controllers below still see the planner's values of the previous frame until they're updated further down
+    self.frogpilot_features.update(carState, frogpilotCarState, self.frogpilot_vcruise.forcing_stop, self.lead_one, modelData, v_ego, frogpilot_toggles)
+
     self.frogpilot_acceleration.update(controlsState, frogpilotCarState, v_cruise, v_ego, frogpilot_toggles)
 
     run_cem = frogpilot_toggles.conditional_experimental_mode or frogpilot_toggles.force_stops or frogpilot_toggles.green_light_alert or frogpilot_toggles.show_stopping_point
@@ -61,37 +65,20 @@ class FrogPilotPlanner:
     self.frogpilot_events.update(carState, controlsState, frogpilotCarControl, frogpilotCarState, self.lead_one.dRel, modelData, v_lead, frogpilot_toggles)
     self.frogpilot_following.update(carState.aEgo, controlsState, frogpilotCarState, self.lead_one.dRel, v_ego, v_lead, frogpilot_toggles)
 
-    check_lane_width = frogpilot_toggles.adjacent_paths or frogpilot_toggles.adjacent_path_metrics or frogpilot_toggles.blind_spot_path or frogpilot_toggles.lane_detection
-    if check_lane_width and v_ego >= frogpilot_toggles.minimum_lane_change_speed or frogpilot_toggles.adjacent_lead_tracking:
-      self.lane_width_left = calculate_lane_width(modelData.laneLines[0], modelData.laneLines[1], modelData.roadEdges[0])
-      self.lane_width_right = calculate_lane_width(modelData.laneLines[3], modelData.laneLines[2], modelData.roadEdges[1])
-    else:
-      self.lane_width_left = 0
-      self.lane_width_right = 0
+    self.lane_width_left = self.frogpilot_features.lane_width_left
+    self.lane_width_right = self.frogpilot_features.lane_width_right
 
     self.lateral_check = v_ego >= frogpilot_toggles.pause_lateral_below_speed
     self.lateral_check |= frogpilot_toggles.pause_lateral_below_signal and not (carState.leftBlinker or carState.rightBlinker)
     self.lateral_check |= carState.standstill
 
-    self.model_length = modelData.position.x[MODEL_LENGTH - 1]
-    self.model_stopped = self.model_length < CRUISING_SPEED * PLANNER_TIME
-    self.model_stopped |= self.frogpilot_vcruise.forcing_stop
-
-    self.road_curvature = calculate_road_curvature(modelData, v_ego) if not carState.standstill else 1
+    self.model_length = self.frogpilot_features.model_length
+    self.model_stopped = self.frogpilot_features.model_stopped
+    self.road_curvature = self.frogpilot_features.road_curvature
+    self.tracking_lead = self.frogpilot_features.tracking_lead
 
-    self.tracking_lead = self.set_lead_status(frogpilotCarState, v_ego, frogpilot_toggles)
     self.v_cruise = self.frogpilot_vcruise.update(carState, controlsState, frogpilotCarControl, frogpilotCarState, frogpilotNavigation, modelData, v_cruise, v_ego, frogpilot_toggles)
 
-  def set_lead_status(self, frogpilotCarState, v_ego, frogpilot_toggles):
-    distance_offset = frogpilot_toggles.increased_stopped_distance if not frogpilotCarState.trafficModeActive else 0
-
-    following_lead = self.lead_one.status
-    following_lead &= 1 < self.lead_one.dRel < self.model_length + STOP_DISTANCE + distance_offset
-    following_lead &= v_ego > CRUISING_SPEED or self.tracking_lead
-
-    self.tracking_lead_mac.add_data(following_lead)
-    return self.tracking_lead_mac.get_moving_average() >= THRESHOLD
-
   def publish(self, sm, pm, frogpilot_toggles, toggles_updated):
     frogpilot_plan_send = messaging.new_message('frogpilotPlan')
     frogpilot_plan_send.valid = sm.all_checks(service_list=['carState', 'controlsState'])
@@ -1,8 +1,11 @@
+import numpy as np
+
 from openpilot.common.numpy_fast import clip, interp
 
 from openpilot.selfdrive.car.interfaces import ACCEL_MIN, ACCEL_MAX
 from openpilot.selfdrive.controls.lib.longitudinal_planner import A_CRUISE_MIN, get_max_accel
 
+from openpilot.selfdrive.frogpilot.frogpilot_utilities import interp_rows
 from openpilot.selfdrive.frogpilot.frogpilot_variables import CITY_SPEED_LIMIT
 
 A_CRUISE_MIN_ECO =   A_CRUISE_MIN / 2
@@ -13,15 +16,11 @@ A_CRUISE_MAX_BP_CUSTOM =       [0.0,  5., 10., 15., 20., 25., 40.]
 A_CRUISE_MAX_VALS_ECO =        [2.0, 1.5, 1.0, 0.8, 0.6, 0.4, 0.2]
 A_CRUISE_MAX_VALS_SPORT =      [3.0, 2.5, 2.0, 1.5, 1.0, 0.8, 0.6]
 A_CRUISE_MAX_VALS_SPORT_PLUS = [4.0, 3.5, 3.0, 2.5, 2.0, 1.5, 1.0]
+A_CRUISE_MAX_VALS_CUSTOM = np.array([A_CRUISE_MAX_VALS_ECO, A_CRUISE_MAX_VALS_SPORT, A_CRUISE_MAX_VALS_SPORT_PLUS])
 
-def get_max_accel_eco(v_ego):
-  return interp(v_ego, A_CRUISE_MAX_BP_CUSTOM, A_CRUISE_MAX_VALS_ECO)
-
-def get_max_accel_sport(v_ego):
-  return interp(v_ego, A_CRUISE_MAX_BP_CUSTOM, A_CRUISE_MAX_VALS_SPORT)
-
-def get_max_accel_sport_plus(v_ego):
-  return interp(v_ego, A_CRUISE_MAX_BP_CUSTOM, A_CRUISE_MAX_VALS_SPORT_PLUS)
+def get_max_accel_custom(v_ego):
+  # eco, sport and sport+ in a single lookup
+  return interp_rows(v_ego, A_CRUISE_MAX_BP_CUSTOM, A_CRUISE_MAX_VALS_CUSTOM)
 
 def get_max_accel_low_speeds(max_accel, v_cruise):
   return interp(v_cruise, [0., CITY_SPEED_LIMIT / 2, CITY_SPEED_LIMIT], [max_accel / 4, max_accel / 2, max_accel])
@@ -40,6 +39,8 @@ class FrogPilotAcceleration:
     self.min_accel = 0
 
   def update(self, controlsState, frogpilotCarState, v_cruise, v_ego, frogpilot_toggles):
+    max_accel_eco, max_accel_sport, max_accel_sport_plus = get_max_accel_custom(v_ego)
+
     eco_gear = frogpilotCarState.ecoGear
     sport_gear = frogpilotCarState.sportGear
 
@@ -47,19 +48,19 @@ class FrogPilotAcceleration:
       self.max_accel = get_max_accel(v_ego)
     elif frogpilot_toggles.map_acceleration and (eco_gear or sport_gear):
       if eco_gear:
-        self.max_accel = get_max_accel_eco(v_ego)
+        self.max_accel = max_accel_eco
       else:
         if frogpilot_toggles.acceleration_profile == 3:
-          self.max_accel = get_max_accel_sport_plus(v_ego)
+          self.max_accel = max_accel_sport_plus
         else:
-          self.max_accel = get_max_accel_sport(v_ego)
+          self.max_accel = max_accel_sport
     else:
       if frogpilot_toggles.acceleration_profile == 1:
-        self.max_accel = get_max_accel_eco(v_ego)
+        self.max_accel = max_accel_eco
       elif frogpilot_toggles.acceleration_profile == 2:
-        self.max_accel = get_max_accel_sport(v_ego)
+        self.max_accel = max_accel_sport
       elif frogpilot_toggles.acceleration_profile == 3:
-        self.max_accel = get_max_accel_sport_plus(v_ego)
+        self.max_accel = max_accel_sport_plus
       elif controlsState.experimentalMode:
         self.max_accel = ACCEL_MAX
       else:
@@ -67,7 +68,7 @@ class FrogPilotAcceleration:
 
     if frogpilot_toggles.human_acceleration:
       if self.frogpilot_planner.frogpilot_following.following_lead and not frogpilotCarState.trafficModeActive:
-        self.max_accel = clip(self.frogpilot_planner.lead_one.aLeadK, get_max_accel_sport_plus(v_ego), get_max_allowed_accel(v_ego))
+        self.max_accel = clip(self.frogpilot_planner.lead_one.aLeadK, max_accel_sport_plus, get_max_allowed_accel(v_ego))
       self.max_accel = min(get_max_accel_low_speeds(self.max_accel, self.frogpilot_planner.v_cruise), self.max_accel)
       self.max_accel = min(get_max_accel_ramp_off(self.max_accel, self.frogpilot_planner.v_cruise, v_ego), self.max_accel)
 
@@ -0,0 +1,74 @@
+import numpy as np
+
+from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import STOP_DISTANCE
+from openpilot.selfdrive.modeld.constants import ModelConstants
+
+from openpilot.selfdrive.frogpilot.frogpilot_utilities import MovingAverageCalculator, calculate_lane_width, calculate_road_curvature
+from openpilot.selfdrive.frogpilot.frogpilot_variables import CRUISING_SPEED, MODEL_LENGTH, PLANNER_TIME, THRESHOLD
+
+# Lane line next to the current lane, lane line of the current lane, road edge (laneLines/roadEdges indexes) for each side
+LANE_WIDTH_SIDES = ((0, 1, 0), (3, 2, 1))
+
+def fill(buffer, values):
+  # Models output IDX_N points, anything else is copied as is
+  if len(values) == len(buffer):
+    buffer[:] = values
+    return buffer
+  return np.array(values, dtype=np.float64)
+
+class FrogPilotFeatures:
+  def __init__(self):
+    self.lane_line_x = np.zeros((4, ModelConstants.IDX_N))
+    self.lane_line_y = np.zeros((4, ModelConstants.IDX_N))
+    self.road_edge_x = np.zeros((2, ModelConstants.IDX_N))
+    self.road_edge_y = np.zeros((2, ModelConstants.IDX_N))
+    self.orientation_rate = np.zeros(ModelConstants.IDX_N)
+    self.velocity = np.zeros(ModelConstants.IDX_N)
+
+    self.tracking_lead_mac = MovingAverageCalculator()
+
+    self.model_stopped = False
+    self.tracking_lead = False
+
+    self.lane_width_left = 0
+    self.lane_width_right = 0
+    self.model_length = 0
+    self.road_curvature = 1
+
+  def update(self, carState, frogpilotCarState, forcing_stop, lead_one, modelData, v_ego, frogpilot_toggles):
+    check_lane_width = frogpilot_toggles.adjacent_paths or frogpilot_toggles.adjacent_path_metrics or frogpilot_toggles.blind_spot_path or frogpilot_toggles.lane_detection
+    if check_lane_width and v_ego >= frogpilot_toggles.minimum_lane_change_speed or frogpilot_toggles.adjacent_lead_tracking:
+      self.lane_width_left, self.lane_width_right = self.calculate_lane_widths(modelData.laneLines, modelData.roadEdges)
+    else:
+      self.lane_width_left = 0
+      self.lane_width_right = 0
+
+    self.model_length = modelData.position.x[MODEL_LENGTH - 1]
+    self.model_stopped = self.model_length < CRUISING_SPEED * PLANNER_TIME
+    self.model_stopped |= forcing_stop
+
+    self.road_curvature = self.calculate_road_curvature(modelData, v_ego) if not carState.standstill else 1
+
+    self.tracking_lead = self.update_lead_status(frogpilotCarState, lead_one, v_ego, frogpilot_toggles)
+
+  def calculate_lane_widths(self, lane_lines, road_edges):
+    lane_line_x = [fill(self.lane_line_x[i], lane_line.x) for i, lane_line in enumerate(lane_lines)]
+    lane_line_y = [fill(self.lane_line_y[i], lane_line.y) for i, lane_line in enumerate(lane_lines)]
+    road_edge_x = [fill(self.road_edge_x[i], road_edge.x) for i, road_edge in enumerate(road_edges)]
+    road_edge_y = [fill(self.road_edge_y[i], road_edge.y) for i, road_edge in enumerate(road_edges)]
+
+    return [calculate_lane_width(lane_line_x[lane], lane_line_y[lane], lane_line_x[current_lane], lane_line_y[current_lane], road_edge_x[road_edge], road_edge_y[road_edge])
+            for lane, current_lane, road_edge in LANE_WIDTH_SIDES]
+
+  def calculate_road_curvature(self, modelData, v_ego):
+    return calculate_road_curvature(fill(self.orientation_rate, modelData.orientationRate.z), fill(self.velocity, modelData.velocity.x), v_ego)
+
+  def update_lead_status(self, frogpilotCarState, lead_one, v_ego, frogpilot_toggles):
+    distance_offset = frogpilot_toggles.increased_stopped_distance if not frogpilotCarState.trafficModeActive else 0
+
+    following_lead = lead_one.status
+    following_lead &= 1 < lead_one.dRel < self.model_length + STOP_DISTANCE + distance_offset
+    following_lead &= v_ego > CRUISING_SPEED or self.tracking_lead
+
+    self.tracking_lead_mac.add_data(following_lead)
+    return self.tracking_lead_mac.get_moving_average() >= THRESHOLD
@@ -30,14 +30,17 @@ import openpilot.selfdrive.frogpilot.fleetmanager.helpers as fleet
 
 from flask import Flask, Response, jsonify, redirect, render_template, request, send_from_directory, session, url_for
 from requests.exceptions import ConnectionError
+from werkzeug.security import safe_join
 
 from openpilot.common.realtime import set_core_affinity
 from openpilot.common.swaglog import cloudlog
 from openpilot.system.hardware.hw import Paths
 
+from openpilot.selfdrive.frogpilot.fleetmanager.remux_cache import RemuxCache
 from openpilot.selfdrive.frogpilot.frogpilot_variables import has_prime
 
 app = Flask(__name__)
+remux_cache = RemuxCache(fleet.REMUX_CACHE_PATH, fleet.REMUX_CACHE_MAX_BYTES)
 
 @app.route("/")
 def home_page():
@@ -51,15 +54,10 @@ def internal_error(exception):
 
 @app.route("/footage/full/<cameratype>/<route>")
 def full(cameratype, route):
-  chunk_size = 1024 * 512  # 5KiB
-  file_name = cameratype + (".ts" if cameratype == "qcamera" else ".hevc")
-  vidlist = "|".join(Paths.log_root() + "/" + segment + "/" + file_name for segment in fleet.segments_in_route(route))
-
-  def generate_buffered_stream():
-    with fleet.ffmpeg_mp4_concat_wrap_process_builder(vidlist, cameratype, chunk_size) as process:
-      for chunk in iter(lambda: process.stdout.read(chunk_size), b""):
-        yield bytes(chunk)
-  return Response(generate_buffered_stream(), status=200, mimetype='video/mp4')
+  if cameratype not in ("qcamera", "fcamera", "dcamera", "ecamera"):
+    return render_template("error.html", error="invalid camera")
+  segments = sorted(fleet.segments_in_route(route), key=lambda s: int(s.rsplit("--", 1)[1]))
+  return Response(remux_cache.stream_route(segments, cameratype), status=200, mimetype='video/mp4')
 
 
 @app.route("/footage/<cameratype>/<segment>")
@@ -93,7 +91,7 @@ def route(route):
 @app.route("/footage/")
 @app.route("/footage")
 def footage():
-  route_paths = fleet.all_routes()
+  route_paths, page, num_pages = fleet.paginate(fleet.all_routes(), request.args.get("page", 1, type=int))
   gifs = []
   for route_path in route_paths:
     input_path = Paths.log_root() + route_path + "--0/qcamera.ts"
@@ -102,7 +100,7 @@ def footage():
     gif_path = route_path + "--0/preview.gif"
     gifs.append(gif_path)
   zipped = zip(route_paths, gifs)
-  return render_template("footage.html", zipped=zipped)
+  return render_template("footage.html", zipped=zipped, page=page, num_pages=num_pages)
 
 @app.route("/preserved/")
 @app.route("/preserved")
@@ -110,7 +108,7 @@ def preserved():
   query_type = "qcamera"
   route_paths = []
   gifs = []
-  segments = fleet.preserved_routes()
+  segments, page, num_pages = fleet.paginate(fleet.preserved_routes(), request.args.get("page", 1, type=int))
   for segment in segments:
     input_path = Paths.log_root() + segment + "/qcamera.ts"
     output_path = Paths.log_root() + segment + "/preview.gif"
@@ -121,20 +119,22 @@ def preserved():
     gifs.append(gif_path)
 
   zipped = zip(route_paths, gifs, segments)
-  return render_template("preserved.html", zipped=zipped)
+  return render_template("preserved.html", zipped=zipped, page=page, num_pages=num_pages)
 
 @app.route("/screenrecords/")
 @app.route("/screenrecords")
 def screenrecords():
-  rows = fleet.list_file(fleet.SCREENRECORD_PATH)
+  rows = fleet.screenrecord_listing.get()
   if not rows:
     return render_template("error.html", error="no screenrecords found at:<br><br>" + fleet.SCREENRECORD_PATH)
-  return render_template("screenrecords.html", rows=rows, clip=rows[0])
+  rows, page, num_pages = fleet.paginate(rows, request.args.get("page", 1, type=int))
+  return render_template("screenrecords.html", rows=rows, clip=rows[0], page=page, num_pages=num_pages)
 
 
 @app.route("/screenrecords/<clip>")
 def screenrecord(clip):
-  return render_template("screenrecords.html", rows=fleet.list_files(fleet.SCREENRECORD_PATH), clip=clip)
+  rows, page, num_pages = fleet.paginate(fleet.screenrecord_listing.get(), request.args.get("page", 1, type=int))
+  return render_template("screenrecords.html", rows=rows, clip=clip, page=page, num_pages=num_pages)
 
 
 @app.route("/screenrecords/play/pipe/<file>")
@@ -155,17 +155,28 @@ def about():
 
 @app.route("/error_logs")
 def error_logs():
-  rows = fleet.list_file(fleet.ERROR_LOGS_PATH)
+  rows = fleet.error_log_listing.get()
   if not rows:
     return render_template("error.html", error="no error logs found at:<br><br>" + fleet.ERROR_LOGS_PATH)
-  return render_template("error_logs.html", rows=rows)
+  rows, page, num_pages = fleet.paginate(rows, request.args.get("page", 1, type=int))
+  return render_template("error_logs.html", rows=rows, page=page, num_pages=num_pages)
 
 
 @app.route("/error_logs/<file_name>")
 def open_error_log(file_name):
-  f = open(fleet.ERROR_LOGS_PATH + file_name)
-  error = f.read()
-  return render_template("error_log.html", file_name=file_name, file_content=error)
+  path = safe_join(fleet.ERROR_LOGS_PATH, file_name)
+  if path is None or not os.path.isfile(path):
+    return render_template("error.html", error="error log not found")
+
+  # the tail of the log by default, older and newer pages by byte offset
+  content, start, end, size = fleet.read_log_page(path, request.args.get("offset", None, type=int), request.args.get("before", None, type=int))
+  return render_template("error_log.html", file_name=file_name, file_content=content, start=start, end=end, size=size)
+
+
+@app.route("/error_logs/<file_name>/raw")
+def raw_error_log(file_name):
+  # send_from_directory answers range requests, so clients can page through the log themselves
+  return send_from_directory(fleet.ERROR_LOGS_PATH, file_name, mimetype="text/plain")
 
 @app.route("/addr_input", methods=['GET', 'POST'])
 def addr_input():
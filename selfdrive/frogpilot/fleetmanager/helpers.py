@@ -38,12 +38,12 @@ from openpilot.system.hardware.hw import Paths
 from openpilot.system.loggerd.uploader import listdir_by_creation
 from tools.lib.route import SegmentName
 from typing import List
-from openpilot.system.loggerd.xattr_cache import getxattr
 
 # otisserv conversion
 from urllib.parse import parse_qs, quote
 import openpilot.system.sentry as sentry
 
+from openpilot.selfdrive.frogpilot.fleetmanager.listing_cache import DirectoryListing
 from openpilot.selfdrive.frogpilot.frogpilot_variables import params, update_frogpilot_toggles
 
 XOR_KEY = "s8#pL3*Xj!aZ@dWq"
@@ -68,12 +68,16 @@ else:
   SCREENRECORD_PATH = "/data/media/screen_recordings/"
   ERROR_LOGS_PATH = sentry.CRASHES_DIR
 
+# regenerated on demand, the deleter removes it first when space runs low
+REMUX_CACHE_PATH = Paths.remux_cache_root()
+REMUX_CACHE_MAX_BYTES = 4 * 1024**3
 
-def list_files(path): # still used for footage
-  return sorted(listdir_by_creation(path), reverse=True)
+# items per page of the browse pages, and bytes per page of the log viewer
+PAGE_SIZE = 24
+LOG_PAGE_BYTES = 64 * 1024
 
 
-def list_file(path): # new function for screenrecords/error-logs
+def list_file(path): # screenrecords/error-logs
   if os.path.exists(path):
     files = os.listdir(path)
     sorted_files = sorted(files, reverse=True)
@@ -82,6 +86,44 @@ def list_file(path): # new function for screenrecords/error-logs
   return sorted_files
 
 
+def paginate(items, page, page_size=PAGE_SIZE):
+  """Returns the items on a 1-based page, the page clamped to the existing pages, and the number of pages"""
+  num_pages = max(math.ceil(len(items) / page_size), 1)
+  page = min(max(page, 1), num_pages)
+  return items[(page - 1) * page_size:page * page_size], page, num_pages
+
+
+def read_log_page(path, offset=None, before=None, page_bytes=LOG_PAGE_BYTES):
+  """
+  Returns (text, start, end, size) of the page of a log starting at offset, or ending at before, or of its last page.
+  Pages are cut at line boundaries, so the pages before start and from end continue exactly where this one stops.
+  """
+  with open(path, "rb") as f:
+    size = os.fstat(f.fileno()).st_size
+    if offset is None:
+      end = size if before is None else min(max(before, 0), size)
+      start = max(end - page_bytes, 0)
+    else:
+      start = min(max(offset, 0), size)
+      end = min(start + page_bytes, size)
+    f.seek(start)
+    data = f.read(end - start)
+  end = start + len(data)
+
+  # a page ending at a known boundary drops its partial first line, one starting at it its partial last line
+  if offset is None and start > 0:
+    newline = data.find(b"\n")
+    if newline >= 0:
+      data = data[newline + 1:]
+      start += newline + 1
+  elif offset is not None and end < size:
+    newline = data.rfind(b"\n")
+    if newline >= 0:
+      end -= len(data) - newline - 1
+      data = data[:newline + 1]
+  return data.decode("utf-8", errors="replace"), start, end, size
+
+
 def is_valid_segment(segment):
   try:
     segment_to_segment_name(Paths.log_root(), segment)
@@ -95,30 +137,40 @@ def segment_to_segment_name(data_dir, segment):
   return SegmentName(str(os.path.join(data_dir, fake_dongle + "|" + segment)))
 
 
-def all_segment_names():
-  segments = []
-  for segment in listdir_by_creation(Paths.log_root()):
+def build_segment_index(log_root):
+  """Groups the segments in log_root by route in creation order, and finds the preserved ones"""
+  dirs = listdir_by_creation(log_root)
+  routes = {}
+  for d in dirs:
     try:
-      segments.append(segment_to_segment_name(Paths.log_root(), segment))
+      segment_name = segment_to_segment_name(log_root, d)
     except AssertionError:
-      pass
-  return segments
+      continue
+    routes.setdefault(segment_name.time_str, []).append(f"{segment_name.time_str}--{segment_name.segment_num}")
+  return {
+    "routes": routes,
+    "route_names": sorted(routes, reverse=True),
+    "preserved": sorted(get_preserved_segments(dirs), reverse=True),
+  }
+
+
+segment_index = DirectoryListing(Paths.log_root(), build_segment_index)
+screenrecord_listing = DirectoryListing(SCREENRECORD_PATH, list_file)
+error_log_listing = DirectoryListing(ERROR_LOGS_PATH, list_file)
 
 
 def all_routes():
-  segment_names = all_segment_names()
-  route_names = [segment_name.route_name for segment_name in segment_names]
-  route_times = [route_name.time_str for route_name in route_names]
-  unique_routes = list(dict.fromkeys(route_times))
-  return sorted(unique_routes, reverse=True)
+  return segment_index.get()["route_names"]
 
 def preserved_routes():
-  dirs = listdir_by_creation(Paths.log_root())
-  preserved_segments = get_preserved_segments(dirs)
-  return sorted(preserved_segments, reverse=True)
+  return segment_index.get()["preserved"]
 
 def has_preserve_xattr(d: str) -> bool:
-  return getxattr(os.path.join(Paths.log_root(), d), PRESERVE_ATTR_NAME) == PRESERVE_ATTR_VALUE
+  # not through the xattr cache, the segments are preserved by other processes
+  try:
+    return os.getxattr(os.path.join(Paths.log_root(), d), PRESERVE_ATTR_NAME) == PRESERVE_ATTR_VALUE
+  except OSError:
+    return False
 
 def get_preserved_segments(dirs_by_creation: List[str]) -> List[str]:
   preserved = []
@@ -158,28 +210,7 @@ def video_to_img(input_path, output_path, fps=1, duration=6):
   print(f"GIF file created: {output_path}")
 
 def segments_in_route(route):
-  segment_names = [segment_name for segment_name in all_segment_names() if segment_name.time_str == route]
-  segments = [segment_name.time_str + "--" + str(segment_name.segment_num) for segment_name in segment_names]
-  return segments
-
-
-def ffmpeg_mp4_concat_wrap_process_builder(file_list, cameratype, chunk_size=1024*512):
-  command_line = ["ffmpeg"]
-  if not cameratype == "qcamera":
-    command_line += ["-f", "hevc"]
-  command_line += ["-r", "20"]
-  command_line += ["-i", "concat:" + file_list]
-  command_line += ["-c", "copy"]
-  command_line += ["-map", "0"]
-  if not cameratype == "qcamera":
-    command_line += ["-vtag", "hvc1"]
-  command_line += ["-f", "mp4"]
-  command_line += ["-movflags", "empty_moov"]
-  command_line += ["-"]
-  return subprocess.Popen(
-    command_line, stdout=subprocess.PIPE,
-    bufsize=chunk_size
-  )
+  return segment_index.get()["routes"].get(route, [])
 
 
 def ffmpeg_mp4_wrap_process_builder(filename):
@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+# also picks up changes that do not touch the directory itself, like xattrs set on its subdirectories
+LISTING_REFRESH_INTERVAL = 30.
+
+
+class DirectoryListing:
+  """
+  Caches a listing built from a directory. It is rebuilt when the mtime of the directory changes, which covers
+  entries being added, removed or renamed, and at least every refresh_interval seconds for everything else.
+  """
+  def __init__(self, path, build, refresh_interval=LISTING_REFRESH_INTERVAL):
+    self.path = path
+    self.build = build
+    self.refresh_interval = refresh_interval
+    self.lock = threading.Lock()
+    self.mtime = None
+    self.last_refresh = 0.
+    self.value = None
+
+  def get(self):
+    try:
+      mtime = os.stat(self.path).st_mtime_ns
+    except OSError:
+      mtime = None
+
+    now = time.monotonic()
+    with self.lock:
+      if self.value is None or mtime != self.mtime or now - self.last_refresh >= self.refresh_interval:
+        self.value = self.build(self.path)
+        self.mtime = mtime
+        self.last_refresh = now
+      return self.value
+
+  def invalidate(self):
+    with self.lock:
+      self.value = None
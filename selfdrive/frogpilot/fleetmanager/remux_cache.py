@@ -0,0 +1,279 @@
+import os
+import struct
+import subprocess
+import threading
+
+from openpilot.common.swaglog import cloudlog
+from openpilot.system.hardware.hw import Paths
+
+# only the media boxes are kept from each segment, the init boxes come from the first segment
+# and the trailing mfra index would point into the wrong file once the segments are stitched
+FRAGMENT_BOXES = (b"moof", b"mdat")
+
+
+def camera_file_name(cameratype):
+  return cameratype + (".ts" if cameratype == "qcamera" else ".hevc")
+
+
+def iter_boxes(f):
+  """Yields (type, offset, size) of the top level boxes of an mp4 file"""
+  file_size = os.fstat(f.fileno()).st_size
+  offset = 0
+  while offset + 8 <= file_size:
+    f.seek(offset)
+    size, box_type = struct.unpack(">I4s", f.read(8))
+    if size == 1:
+      size = struct.unpack(">Q", f.read(8))[0]
+    elif size == 0:
+      size = file_size - offset
+    if size < 8:
+      break
+    yield box_type, offset, size
+    offset += size
+
+
+def iter_child_boxes(buf, start, end):
+  """Yields (type, offset, size) of the boxes in buf[start:end]"""
+  offset = start
+  while offset + 8 <= end:
+    size, box_type = struct.unpack_from(">I4s", buf, offset)
+    if size < 8:
+      break
+    yield box_type, offset, size
+    offset += size
+
+
+def find_child_boxes(buf, start, end, box_type):
+  return [(offset, size) for child_type, offset, size in iter_child_boxes(buf, start, end) if child_type == box_type]
+
+
+def default_sample_durations(init):
+  """Returns the default sample duration of each track from the trex boxes of the init boxes"""
+  durations = {}
+  for moov, moov_size in find_child_boxes(init, 0, len(init), b"moov"):
+    for mvex, mvex_size in find_child_boxes(init, moov + 8, moov + moov_size, b"mvex"):
+      for trex, _ in find_child_boxes(init, mvex + 8, mvex + mvex_size, b"trex"):
+        track_id, _, duration = struct.unpack_from(">III", init, trex + 12)
+        durations[track_id] = duration
+  return durations
+
+
+def traf_timing(moof, traf, traf_size, default_durations):
+  """Returns the track id, the offset of the tfdt (None without one) and the duration of a track fragment"""
+  tfhd = find_child_boxes(moof, traf + 8, traf + traf_size, b"tfhd")[0][0]
+  tfhd_flags, track_id = struct.unpack_from(">II", moof, tfhd + 8)
+  tfhd_flags &= 0xFFFFFF
+  default_duration = default_durations.get(track_id, 0)
+  if tfhd_flags & 0x08:
+    # the optional base data offset and sample description index come first
+    field = tfhd + 16 + (8 if tfhd_flags & 0x01 else 0) + (4 if tfhd_flags & 0x02 else 0)
+    default_duration = struct.unpack_from(">I", moof, field)[0]
+
+  duration = 0
+  for trun, _ in find_child_boxes(moof, traf + 8, traf + traf_size, b"trun"):
+    trun_flags, sample_count = struct.unpack_from(">II", moof, trun + 8)
+    trun_flags &= 0xFFFFFF
+    if not trun_flags & 0x100:
+      duration += sample_count * default_duration
+      continue
+    sample = trun + 16 + (4 if trun_flags & 0x01 else 0) + (4 if trun_flags & 0x04 else 0)
+    sample_size = 4 * bin(trun_flags & 0xF00).count("1")
+    for _ in range(sample_count):
+      duration += struct.unpack_from(">I", moof, sample)[0]
+      sample += sample_size
+
+  tfdt = find_child_boxes(moof, traf + 8, traf + traf_size, b"tfdt")
+  return track_id, tfdt[0][0] if tfdt else None, duration
+
+
+class FragmentRewriter:
+  """
+  Renumbers the fragments of consecutive segments so they play as one file. Every segment is remuxed on its own,
+  so its mfhd sequence numbers start at 1 again and its tfdt decode times start wherever ffmpeg put them.
+  The sequence numbers are made to continue across segments, and each segment's decode times are shifted to
+  start where the previous segment of the same track ended.
+  """
+  def __init__(self):
+    self.sequence_number = 0
+    self.track_end = {}
+
+  def start_segment(self, init):
+    self.default_durations = default_sample_durations(init)
+    self.segment_start = dict(self.track_end)
+    self.first_decode_time = {}
+
+  def rewrite(self, moof):
+    moof = bytearray(moof)
+    for mfhd, _ in find_child_boxes(moof, 8, len(moof), b"mfhd"):
+      self.sequence_number += 1
+      struct.pack_into(">I", moof, mfhd + 12, self.sequence_number)
+
+    for traf, traf_size in find_child_boxes(moof, 8, len(moof), b"traf"):
+      track_id, tfdt, duration = traf_timing(moof, traf, traf_size, self.default_durations)
+      if tfdt is None:
+        continue
+
+      decode_time_format = ">Q" if moof[tfdt + 8] == 1 else ">I"
+      decode_time = struct.unpack_from(decode_time_format, moof, tfdt + 12)[0]
+
+      first_decode_time = self.first_decode_time.setdefault(track_id, decode_time)
+      decode_time += self.segment_start.get(track_id, 0) - first_decode_time
+      struct.pack_into(decode_time_format, moof, tfdt + 12, decode_time)
+      self.track_end[track_id] = max(self.track_end.get(track_id, 0), decode_time + duration)
+    return bytes(moof)
+
+
+def read_range(src, offset, size, chunk_size=1024*512):
+  src.seek(offset)
+  while size > 0:
+    chunk = src.read(min(chunk_size, size))
+    if not chunk:
+      break
+    yield chunk
+    size -= len(chunk)
+
+
+def copy_range(src, dst, offset, size, chunk_size=1024*512):
+  for chunk in read_range(src, offset, size, chunk_size):
+    dst.write(chunk)
+
+
+class RemuxCache:
+  """
+  Remuxes each segment video once into a fragmented mp4, split into its init boxes (ftyp/moov)
+  and its media fragments (moof/mdat), and keeps them on disk up to max_bytes, evicting the least
+  recently used. A full route is the init boxes of its first segment followed by the fragments of
+  every segment, renumbered while they are streamed.
+
+  Entries are keyed on the size and mtime of the source file, so a segment that is still being
+  recorded is remuxed again once it changes.
+  """
+  def __init__(self, cache_dir, max_bytes):
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+    self.lock = threading.Lock()
+    self.key_locks = {}
+
+  def _key_lock(self, key):
+    with self.lock:
+      return self.key_locks.setdefault(key, threading.Lock())
+
+  def _entry_paths(self, segment, cameratype, st):
+    base = os.path.join(self.cache_dir, f"{segment}--{cameratype}.{st.st_size}-{st.st_mtime_ns}")
+    return base + ".init", base + ".frag"
+
+  def get(self, segment, cameratype):
+    """Returns the (init, fragments) paths of a segment, remuxing it if needed. None if it has no such video"""
+    source = os.path.join(Paths.log_root(), segment, camera_file_name(cameratype))
+    try:
+      st = os.stat(source)
+    except FileNotFoundError:
+      return None
+
+    init_path, frag_path = self._entry_paths(segment, cameratype, st)
+    # concurrent viewers of the same segment wait for a single remux
+    with self._key_lock(f"{segment}--{cameratype}"):
+      try:
+        os.utime(frag_path)
+        os.utime(init_path)
+        return init_path, frag_path
+      except FileNotFoundError:
+        pass
+
+      if not self._remux(source, cameratype, init_path, frag_path):
+        return None
+
+    self._evict(keep=(init_path, frag_path))
+    return init_path, frag_path
+
+  def _remux(self, source, cameratype, init_path, frag_path):
+    os.makedirs(self.cache_dir, exist_ok=True)
+    self._remove_stale(os.path.basename(init_path).rsplit(".", 2)[0] + ".")
+
+    tmp_path = init_path + ".tmp"
+    command_line = ["ffmpeg", "-y", "-loglevel", "error"]
+    if not cameratype == "qcamera":
+      command_line += ["-f", "hevc"]
+    command_line += ["-r", "20"]
+    command_line += ["-i", source]
+    command_line += ["-c", "copy"]
+    command_line += ["-map", "0"]
+    if not cameratype == "qcamera":
+      command_line += ["-vtag", "hvc1"]
+    command_line += ["-f", "mp4"]
+    command_line += ["-movflags", "empty_moov+frag_keyframe+default_base_moof"]
+    command_line += [tmp_path]
+
+    try:
+      subprocess.run(command_line, check=True, stdin=subprocess.DEVNULL, stderr=subprocess.PIPE)
+      with open(tmp_path, "rb") as src, open(init_path + ".part", "wb") as init, open(frag_path + ".part", "wb") as frag:
+        for box_type, offset, size in iter_boxes(src):
+          if box_type in FRAGMENT_BOXES:
+            copy_range(src, frag, offset, size)
+          elif frag.tell() == 0:
+            copy_range(src, init, offset, size)
+      os.replace(frag_path + ".part", frag_path)
+      os.replace(init_path + ".part", init_path)
+      return True
+    except (OSError, subprocess.CalledProcessError):
+      cloudlog.exception(f"fleet_manager: failed to remux {source}")
+      for path in (init_path + ".part", frag_path + ".part"):
+        if os.path.exists(path):
+          os.remove(path)
+      return False
+    finally:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+  def _remove_stale(self, prefix):
+    for name in os.listdir(self.cache_dir):
+      if name.startswith(prefix):
+        os.remove(os.path.join(self.cache_dir, name))
+
+  def _evict(self, keep=()):
+    with self.lock:
+      try:
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith((".init", ".frag"))]
+      except FileNotFoundError:
+        return
+
+      entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+      total = sum(size for _, size, _ in entries)
+      for _, size, path in sorted(entries):
+        if total <= self.max_bytes:
+          break
+        if path in keep:
+          continue
+        try:
+          os.remove(path)
+        except FileNotFoundError:
+          pass
+        total -= size
+
+  def stream_route(self, segments, cameratype, chunk_size=1024*512):
+    """Yields a fragmented mp4 of the given segments, remuxing only those that are not cached yet"""
+    sent_init = False
+    rewriter = FragmentRewriter()
+    for segment in segments:
+      entry = self.get(segment, cameratype)
+      if entry is None:
+        continue
+
+      init_path, frag_path = entry
+      try:
+        # open both before yielding, an evicted file stays readable while it is open
+        with open(init_path, "rb") as init, open(frag_path, "rb") as frag:
+          init_boxes = init.read()
+          if not sent_init:
+            yield init_boxes
+            sent_init = True
+
+          rewriter.start_segment(init_boxes)
+          for box_type, offset, size in iter_boxes(frag):
+            if box_type == b"moof":
+              frag.seek(offset)
+              yield rewriter.rewrite(frag.read(size))
+            else:
+              yield from read_range(frag, offset, size, chunk_size)
+      except FileNotFoundError:
+        cloudlog.warning(f"fleet_manager: {segment} was evicted before it could be streamed")
@@ -1,6 +1,9 @@
 import datetime
 import filecmp
 import glob
+import gzip
+import hashlib
+import io
 import os
 import shutil
 import subprocess
@@ -16,6 +19,140 @@ from openpilot.selfdrive.frogpilot.frogpilot_utilities import copy_if_exists, ru
 from openpilot.selfdrive.frogpilot.frogpilot_variables import ACTIVE_THEME_PATH, MODELS_PATH, THEME_SAVE_PATH, FrogPilotVariables
 
 
+def latest_backup(directory, exclude=None):
+  backups = [b for b in glob.glob(os.path.join(directory, "*_auto")) if os.path.isdir(b) and b != exclude]
+  return max(backups, key=os.path.getmtime, default=None)
+
+
+def read_as_root(path):
+  # the backups used to be made with "sudo rsync", so files only root can read still have to be included
+  print(f"Reading {path} with sudo")
+  return subprocess.run(["sudo", "cat", path], check=True, stdout=subprocess.PIPE).stdout
+
+
+def skip_unreadable_directory(error):
+  print(f"Skipping {error.filename}: {error.strerror}")
+
+
+def same_contents(path, other):
+  try:
+    return filecmp.cmp(path, other, shallow=False)
+  except PermissionError:
+    return False
+
+
+def copy_file(src, dst):
+  try:
+    shutil.copy2(src, dst, follow_symlinks=False)
+  except PermissionError:
+    print(f"Copying {src} with sudo")
+    subprocess.run(["sudo", "cp", "-a", src, dst], check=True)
+
+
+def snapshot_directory(source, destination, previous=None):
+  """
+  Copies source into destination, hardlinking files whose content is unchanged from the previous
+  snapshot instead of copying them. Returns False if the tree is identical to the previous snapshot.
+  """
+  changed = previous is None
+  copied_dirs = []
+  for root, dirs, files in os.walk(source, onerror=skip_unreadable_directory):
+    rel_root = os.path.relpath(root, source)
+    os.makedirs(os.path.join(destination, rel_root), exist_ok=True)
+    copied_dirs.append(rel_root)
+    # symlinks to directories are listed as directories but copied as links
+    links = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+    for name in files + links:
+      rel = os.path.normpath(os.path.join(rel_root, name))
+      src, dst = os.path.join(source, rel), os.path.join(destination, rel)
+      prev = os.path.join(previous, rel) if previous is not None else None
+      if prev is not None and not os.path.islink(src) and os.path.isfile(prev) and same_contents(src, prev):
+        os.link(prev, dst)
+      else:
+        copy_file(src, dst)
+        same_link = prev is not None and os.path.islink(src) and os.path.islink(prev) and os.readlink(src) == os.readlink(prev)
+        changed = changed or not same_link
+
+  # mode and mtime of the directories like rsync -a keeps them, deepest first since adding entries changes the mtime
+  for rel_root in reversed(copied_dirs):
+    shutil.copystat(os.path.join(source, rel_root), os.path.join(destination, rel_root))
+
+  if not changed:
+    # files removed since the previous snapshot
+    for root, dirs, files in os.walk(previous):
+      rel_root = os.path.relpath(root, previous)
+      if any(not os.path.lexists(os.path.join(destination, rel_root, name)) for name in files + dirs):
+        return True
+  return changed
+
+
+def compress_directory(source, destination, arcname, cache_dir):
+  """
+  Writes source as a .tar.gz made of separate gzip members for each tar header and file, which any
+  gzip reader concatenates back into a single tar. The headers hold arcname, which changes with every
+  backup, so they are compressed each time, while file contents are cached by path, size and mtime
+  and only files that changed since the last backup are compressed again.
+  """
+  os.makedirs(cache_dir, exist_ok=True)
+  used = set()
+  offset = 0
+
+  def compressed_member(key, write):
+    path = os.path.join(cache_dir, f"{key}.gz")
+    if not os.path.exists(path):
+      with open(f"{path}.tmp", "wb") as f, gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as gz:
+        write(gz)
+      os.replace(f"{path}.tmp", path)
+    used.add(f"{key}.gz")
+    return path
+
+  # only used to build tar headers the same way tarfile.add would
+  tar = tarfile.open(fileobj=io.BytesIO(), mode="w")
+
+  with open(destination, "wb") as out:
+    for root, dirs, files in os.walk(source, onerror=skip_unreadable_directory):
+      dirs.sort()
+      # symlinks to directories are listed as directories but stored as links
+      links = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+      for name in [None] + sorted(files + links):
+        path = root if name is None else os.path.join(root, name)
+        rel = os.path.relpath(path, source)
+        tarinfo = tar.gettarinfo(path, arcname if rel == "." else os.path.join(arcname, rel))
+        if tarinfo is None:
+          continue
+        header = tarinfo.tobuf(tar.format, tar.encoding, tar.errors)
+        out.write(gzip.compress(header, mtime=0))
+        offset += len(header)
+        if not tarinfo.isreg():
+          continue
+
+        def write(gz, path=path, tarinfo=tarinfo):
+          try:
+            with open(path, "rb") as f:
+              tarfile.copyfileobj(f, gz, tarinfo.size)
+          except PermissionError:
+            data = read_as_root(path)
+            if len(data) != tarinfo.size:
+              raise OSError(f"{path} changed while it was backed up")
+            gz.write(data)
+          gz.write(tarfile.NUL * (-tarinfo.size % tarfile.BLOCKSIZE))
+
+        key = hashlib.sha256(f"{rel}\0{tarinfo.size}\0{tarinfo.mtime!r}".encode()).hexdigest()
+        with open(compressed_member(key, write), "rb") as member:
+          shutil.copyfileobj(member, out)
+        offset += tarinfo.size + -tarinfo.size % tarfile.BLOCKSIZE
+
+    # end of archive, padded to a full record like tarfile does
+    end = tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+    end += tarfile.NUL * (-(offset + len(end)) % tarfile.RECORDSIZE)
+    out.write(gzip.compress(end, mtime=0))
+
+  # keep only what the latest backup used, that is all the next one can reuse
+  for name in os.listdir(cache_dir):
+    if name not in used:
+      os.remove(os.path.join(cache_dir, name))
+
+
 def backup_directory(backup, destination, success_message, fail_message, minimum_backup_size=0, params=None, compressed=False):
   if not compressed:
     if os.path.exists(destination):
@@ -25,7 +162,20 @@ def backup_directory(backup, destination, success_message, fail_message, minimum
     in_progress_destination = f"{destination}_in_progress"
     os.makedirs(in_progress_destination, exist_ok=False)
 
-    run_cmd(["sudo", "rsync", "-avq", os.path.join(backup, "."), in_progress_destination], success_message, fail_message)
+    previous = latest_backup(os.path.dirname(destination), exclude=destination)
+    try:
+      changed = snapshot_directory(backup, in_progress_destination, previous)
+      print(success_message)
+    except Exception as e:
+      print(f"Unexpected error occurred: {e}")
+      print(fail_message)
+      changed = True
+
+    if not changed:
+      shutil.rmtree(in_progress_destination)
+      print(f"No changes since {previous}, skipping backup")
+      return
+
     os.rename(in_progress_destination, destination)
     print(f"Backup successfully created at {destination}")
 
@@ -37,14 +187,17 @@ def backup_directory(backup, destination, success_message, fail_message, minimum
       print("Backup already exists. Aborting")
       return
 
-    in_progress_destination = f"{destination}_in_progress"
-    os.makedirs(in_progress_destination, exist_ok=False)
-
-    run_cmd(["sudo", "rsync", "-avq", os.path.join(backup, "."), in_progress_destination], success_message, fail_message)
-    with tarfile.open(in_progress_destination_compressed, "w:gz") as tar:
-      tar.add(in_progress_destination, arcname=os.path.basename(destination))
+    cache_dir = os.path.join(os.path.dirname(destination), ".cache")
+    try:
+      compress_directory(backup, in_progress_destination_compressed, os.path.basename(destination), cache_dir)
+      print(success_message)
+    except Exception as e:
+      print(f"Unexpected error occurred: {e}")
+      print(fail_message)
+      if os.path.exists(in_progress_destination_compressed):
+        os.remove(in_progress_destination_compressed)
+      return
 
-    shutil.rmtree(in_progress_destination)
     os.rename(in_progress_destination_compressed, destination_compressed)
     print(f"Backup successfully compressed to {destination_compressed}")
 
@@ -78,7 +231,8 @@ def backup_frogpilot(build_metadata, params):
   cleanup_backups(backup_path, maximum_backups, minimum_backup_size, compressed=True)
 
   _, _, free = shutil.disk_usage(backup_path)
-  required_free_space = minimum_backup_size * maximum_backups
+  # the member cache in .cache is about one more compressed backup, and it grows by the changed members before it is pruned
+  required_free_space = minimum_backup_size * (maximum_backups + 1)
 
   if free > required_free_space:
     branch = build_metadata.channel
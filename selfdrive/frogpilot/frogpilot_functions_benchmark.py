@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import random
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import time
+from types import SimpleNamespace
+
+from openpilot.common.basedir import BASEDIR
+from openpilot.selfdrive.frogpilot.frogpilot_functions import backup_directory
+
+
+def rsync(backup, destination):
+  cmd = ["rsync", "-avq", os.path.join(backup, "."), destination]
+  subprocess.run(cmd if os.geteuid() == 0 else ["sudo", *cmd], check=True)
+
+
+def previous_backup_directory(backup, destination, compressed):
+  """backup_directory before the snapshots and the member cache: rsync into a staging copy, then tarfile for compressed backups"""
+  in_progress_destination = f"{destination}_in_progress"
+  os.makedirs(in_progress_destination, exist_ok=False)
+  rsync(backup, in_progress_destination)
+
+  if not compressed:
+    os.rename(in_progress_destination, destination)
+  else:
+    destination_compressed = f"{destination}.tar.gz"
+    in_progress_destination_compressed = f"{destination_compressed}_in_progress.tar.gz"
+    with tarfile.open(in_progress_destination_compressed, "w:gz") as tar:
+      tar.add(in_progress_destination, arcname=os.path.basename(destination))
+    shutil.rmtree(in_progress_destination)
+    os.rename(in_progress_destination_compressed, destination_compressed)
+
+
+def disk_usage(path):
+  """Bytes allocated under path, hardlinked files counted once"""
+  seen = set()
+  total = 0
+  for root, dirs, files in os.walk(path):
+    for name in dirs + files:
+      st = os.lstat(os.path.join(root, name))
+      if (st.st_dev, st.st_ino) not in seen:
+        seen.add((st.st_dev, st.st_ino))
+        total += st.st_blocks * 512
+  return total
+
+
+def tree_state(path):
+  """Type, mode, owner, mtime and contents or link target of everything under path"""
+  state = {}
+  for root, dirs, files in os.walk(path):
+    for name in [None] + dirs + files:
+      p = root if name is None else os.path.join(root, name)
+      st = os.lstat(p)
+      if stat.S_ISREG(st.st_mode):
+        with open(p, "rb") as f:
+          contents = hashlib.sha256(f.read()).hexdigest()
+      elif stat.S_ISLNK(st.st_mode):
+        contents = os.readlink(p)
+      else:
+        contents = None
+      state[os.path.relpath(p, path)] = (stat.S_IFMT(st.st_mode), stat.S_IMODE(st.st_mode), st.st_uid, st.st_gid, int(st.st_mtime), contents)
+  return state
+
+
+def assert_same_tree(a, b):
+  state_a, state_b = tree_state(a), tree_state(b)
+  assert state_a.keys() == state_b.keys(), f"{a} and {b} differ in {sorted(state_a.keys() ^ state_b.keys())[:10]}"
+  differ = [p for p in state_a if state_a[p] != state_b[p]]
+  assert not differ, f"{a} and {b} differ in {differ[:10]}: {state_a[differ[0]]} != {state_b[differ[0]]}"
+
+
+def extract(archive, destination):
+  os.makedirs(destination)
+  subprocess.run(["tar", "-xzf", archive, "-C", destination], check=True)
+  return destination
+
+
+def change_tree(path, files, rng):
+  """Edits a few files, adds one and removes one, like an update or a changed toggle does between backups"""
+  paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names if not os.path.islink(os.path.join(root, name)))
+  for p in rng.sample(paths, min(files, len(paths) - 1)):
+    with open(p, "ab") as f:
+      f.write(rng.randbytes(16))
+  os.remove(rng.choice(paths))
+  with open(os.path.join(path, f"added_{rng.randrange(1 << 32):08x}"), "wb") as f:
+    f.write(rng.randbytes(4096))
+  # mtimes only have a one second resolution in the archives
+  time.sleep(1)
+
+
+def timed(f, *args, **kwargs):
+  t = time.monotonic()
+  with contextlib.redirect_stdout(io.StringIO()):
+    f(*args, **kwargs)
+  return time.monotonic() - t
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Makes a series of backups of a tree with the previous rsync and tarfile path and with "
+                                               "backup_directory, compares time and bytes on disk and checks that the extracted archives "
+                                               "and snapshots are identical",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--source", default=BASEDIR, help="tree to back up, it is copied first and the copy is changed between backups")
+  parser.add_argument("--backups", type=int, default=3)
+  parser.add_argument("--changed-files", type=int, default=20, help="files edited between backups")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  params = SimpleNamespace(put_int=lambda key, value: None)
+  with tempfile.TemporaryDirectory() as work:
+    source = os.path.join(work, "source")
+    shutil.copytree(args.source, source, symlinks=True)
+    dirs = {name: os.path.join(work, name) for name in ("before_compressed", "after_compressed", "before_snapshots", "after_snapshots")}
+    for d in dirs.values():
+      os.makedirs(d)
+    cache_dir = os.path.join(dirs["after_compressed"], ".cache")
+
+    print(f"{'backup':>6} | {'compressed':^48} | {'snapshot':^34}")
+    print(f"{'':>6} | {'before s':>8} {'after s':>8} {'before MB':>9} {'after MB':>9} {'.cache MB':>9} | "
+          f"{'before s':>8} {'after s':>8} {'before +MB':>10} {'after +MB':>9}")
+    for i in range(args.backups):
+      if i > 0:
+        change_tree(source, args.changed_files, rng)
+      name = f"backup{i}_auto"
+
+      before_s = timed(previous_backup_directory, source, os.path.join(dirs["before_compressed"], name), compressed=True)
+      after_s = timed(backup_directory, source, os.path.join(dirs["after_compressed"], name), "", "", params=params, compressed=True)
+      before_archive, after_archive = (os.path.join(dirs[d], f"{name}.tar.gz") for d in ("before_compressed", "after_compressed"))
+      with tempfile.TemporaryDirectory(dir=work) as extracted:
+        assert_same_tree(os.path.join(extract(before_archive, os.path.join(extracted, "before")), name),
+                         os.path.join(extract(after_archive, os.path.join(extracted, "after")), name))
+
+      before_used, after_used = disk_usage(dirs["before_snapshots"]), disk_usage(dirs["after_snapshots"])
+      before_snapshot_s = timed(previous_backup_directory, source, os.path.join(dirs["before_snapshots"], name), compressed=False)
+      after_snapshot_s = timed(backup_directory, source, os.path.join(dirs["after_snapshots"], name), "", "")
+      assert_same_tree(os.path.join(dirs["before_snapshots"], name), os.path.join(dirs["after_snapshots"], name))
+      before_added, after_added = disk_usage(dirs["before_snapshots"]) - before_used, disk_usage(dirs["after_snapshots"]) - after_used
+
+      print(f"{i:>6} | {before_s:8.2f} {after_s:8.2f} {os.path.getsize(before_archive) / 1e6:9.1f} {os.path.getsize(after_archive) / 1e6:9.1f} "
+            f"{disk_usage(cache_dir) / 1e6:9.1f} | {before_snapshot_s:8.2f} {after_snapshot_s:8.2f} {before_added / 1e6:10.1f} {after_added / 1e6:9.1f}")
+
+    print("extracted archives and snapshots identical for every backup")
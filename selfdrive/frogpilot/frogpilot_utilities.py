@@ -1,3 +1,4 @@
+import bisect
 import math
 import numpy as np
 import os
@@ -7,7 +8,7 @@ import threading
 import time
 import urllib.request
 
-from openpilot.common.numpy_fast import interp, mean
+from openpilot.common.numpy_fast import mean
 
 EARTH_RADIUS = 6378137  # Radius of the Earth in meters
 
@@ -16,12 +17,9 @@ def calculate_distance_to_point(ax, ay, bx, by):
   c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
   return EARTH_RADIUS * c
 
-def calculate_lane_width(lane, current_lane, road_edge):
-  current_x = np.array(current_lane.x)
-  current_y = np.array(current_lane.y)
-
-  lane_y_interp = interp(current_x, np.array(lane.x), np.array(lane.y))
-  road_edge_y_interp = interp(current_x, np.array(road_edge.x), np.array(road_edge.y))
+def calculate_lane_width(lane_x, lane_y, current_x, current_y, road_edge_x, road_edge_y):
+  lane_y_interp = np.interp(current_x, lane_x, lane_y)
+  road_edge_y_interp = np.interp(current_x, road_edge_x, road_edge_y)
 
   distance_to_lane = np.mean(np.abs(current_y - lane_y_interp))
   distance_to_road_edge = np.mean(np.abs(current_y - road_edge_y_interp))
@@ -29,12 +27,20 @@ def calculate_lane_width(lane, current_lane, road_edge):
   return float(min(distance_to_lane, distance_to_road_edge))
 
 # Credit goes to Pfeiferj!
-def calculate_road_curvature(modelData, v_ego):
-  orientation_rate = np.abs(modelData.orientationRate.z)
-  velocity = modelData.velocity.x
-  max_pred_lat_acc = np.amax(orientation_rate * velocity)
+def calculate_road_curvature(orientation_rate, velocity, v_ego):
+  max_pred_lat_acc = np.amax(np.abs(orientation_rate) * velocity)
   return max_pred_lat_acc / max(v_ego, 1)**2
 
+def interp_rows(x, xp, table):
+  # Same as interp(x, xp, row) for every row of table, with the breakpoint search done once
+  if x <= xp[0]:
+    return table[:, 0]
+  if x >= xp[-1]:
+    return table[:, -1]
+  hi = bisect.bisect_left(xp, x)
+  weight = (x - xp[hi - 1]) / (xp[hi] - xp[hi - 1])
+  return table[:, hi - 1] + weight * (table[:, hi] - table[:, hi - 1])
+
 def copy_if_exists(source, destination, single_file_name=None):
   if not os.path.exists(source):
     print(f"Source directory {source} does not exist. Skipping copy.")
@@ -76,20 +82,24 @@ def run_cmd(cmd, success_message, fail_message):
     print(fail_message)
 
 class MovingAverageCalculator:
-  def __init__(self):
+  def __init__(self, window=5):
+    self.window = window
     self.reset_data()
 
   def add_data(self, value):
-    if len(self.data) == 5:
-      self.total -= self.data.pop(0)
-    self.data.append(value)
-    self.total += value
+    # Fixed size ring buffer, the oldest value is overwritten once the window is full
+    self.total += value - self.data[self.index]
+    self.data[self.index] = value
+    self.index = (self.index + 1) % self.window
+    self.count = min(self.count + 1, self.window)
 
   def get_moving_average(self):
-    if len(self.data) == 0:
+    if self.count == 0:
       return None
-    return self.total / len(self.data)
+    return self.total / self.count
 
   def reset_data(self):
-    self.data = []
+    self.data = [0] * self.window
+    self.count = 0
+    self.index = 0
     self.total = 0
@@ -8,6 +8,7 @@ import cereal.messaging as messaging
 from cereal import car
 from cereal import log
 from openpilot.common.params import Params
+from openpilot.common.params_writer import ParamsWriter
 from openpilot.common.realtime import config_realtime_process, DT_MDL
 from openpilot.common.numpy_fast import clip
 from openpilot.selfdrive.locationd.models.car_kf import CarKalman, ObservationKind, States
@@ -129,6 +130,7 @@ def main():
   sm = messaging.SubMaster(['liveLocationKalman', 'carState'], poll='liveLocationKalman')
 
   params_reader = Params()
+  params_writer = ParamsWriter(params_reader)
   # wait for stats about the car to come in from controls
   cloudlog.info("paramsd is waiting for CarParams")
   with car.CarParams.from_bytes(params_reader.get("CarParams", block=True)) as msg:
@@ -261,7 +263,7 @@ def main():
           'stiffnessFactor': liveParameters.stiffnessFactor,
           'angleOffsetAverageDeg': liveParameters.angleOffsetAverageDeg,
         }
-        params_reader.put_nonblocking("LiveParameters", json.dumps(params))
+        params_writer.put("LiveParameters", json.dumps(params))
 
       pm.send('liveParameters', msg)
 
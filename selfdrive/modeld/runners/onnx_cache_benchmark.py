@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import argparse
+import importlib
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+def random_inputs(session, onnxmodel):
+  rng = np.random.default_rng(0)
+  inputs = {}
+  for x in session.get_inputs():
+    shape = [1] + [d if isinstance(d, int) else 1 for d in x.shape[1:]]
+    inputs[x.name] = rng.random(shape).astype(onnxmodel.ORT_TYPES_TO_NP_TYPES[x.type])
+  return inputs
+
+
+def time_session(onnxmodel, path, cache_dir):
+  onnxmodel.ONNX_CACHE_DIR = cache_dir
+  t = time.perf_counter()
+  session = onnxmodel.create_ort_session(path, fp16_to_fp32=True)
+  return time.perf_counter() - t, session
+
+
+def benchmark(onnxmodel, path, repeat):
+  work_dir = tempfile.mkdtemp(prefix="onnx_cache_")
+  try:
+    # a file where the cache directory should be makes create_ort_session fall back to converting in memory every time
+    uncached_dir = os.path.join(work_dir, "uncached")
+    open(uncached_dir, "w").close()
+    cache_dir = os.path.join(work_dir, "cache")
+
+    times = {"uncached": [], "cold cache": [], "warm cache": []}
+    outputs = {}
+    for _ in range(repeat):
+      shutil.rmtree(cache_dir, ignore_errors=True)
+      for name, directory in (("uncached", uncached_dir), ("cold cache", cache_dir), ("warm cache", cache_dir)):
+        elapsed, session = time_session(onnxmodel, path, directory)
+        times[name].append(elapsed)
+        if name not in outputs:
+          outputs[name] = session.run(None, random_inputs(session, onnxmodel))
+
+    for name, output in outputs.items():
+      for a, b in zip(outputs["uncached"], output, strict=True):
+        np.testing.assert_allclose(b, a, rtol=1e-4, atol=1e-5, err_msg=f"{name} session output differs")
+
+    cached = sorted(os.listdir(cache_dir))
+    print(f"cached files: {', '.join(cached)} ({sum(os.path.getsize(os.path.join(cache_dir, f)) for f in cached) / 1e6:.1f} MB)")
+    print(f"{'session':<12} {'median s':>9} {'min s':>9}")
+    for name, t in times.items():
+      print(f"{name:<12} {np.median(t):9.3f} {np.min(t):9.3f}")
+  finally:
+    shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Times create_ort_session without the ONNX cache, with an empty cache and with a warm cache, "
+                                               "and checks that all three sessions give the same outputs",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("model", help="path of the .onnx model, e.g. selfdrive/modeld/models/supercombo.onnx")
+  parser.add_argument("--classic", action="store_true", help="use the classic_modeld runner")
+  parser.add_argument("--repeat", type=int, default=3)
+  args = parser.parse_args()
+
+  onnxmodel = importlib.import_module(f"openpilot.selfdrive.{'classic_modeld' if args.classic else 'modeld'}.runners.onnxmodel")
+  benchmark(onnxmodel, args.model, args.repeat)
@@ -4,6 +4,8 @@ import json
 import math
 from typing import Any, cast
 
+import numpy as np
+
 from openpilot.common.conversions import Conversions
 from openpilot.common.numpy_fast import clip
 from openpilot.common.params import Params
@@ -106,6 +108,46 @@ def distance_along_geometry(geometry: list[Coordinate], pos: Coordinate) -> floa
   return total_distance_closest
 
 
+def haversine_distance(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+  # vectorized Coordinate.distance_to
+  haversine_dlat = np.sin(np.radians(lat2 - lat1) / 2.0) ** 2
+  haversine_dlon = np.sin(np.radians(lon2 - lon1) / 2.0) ** 2
+  y = haversine_dlat + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * haversine_dlon
+  return 2 * np.arcsin(np.sqrt(y)) * EARTH_MEAN_RADIUS
+
+
+class GeometryIndex:
+  """Precomputed arrays of a step geometry, answering the distance queries above in a single vectorized pass."""
+  def __init__(self, geometry: list[Coordinate]) -> None:
+    self.geometry = geometry
+    self.lat = np.array([c.latitude for c in geometry], dtype=np.float64)
+    self.lon = np.array([c.longitude for c in geometry], dtype=np.float64)
+    self.segment_lengths = haversine_distance(self.lat[:-1], self.lon[:-1], self.lat[1:], self.lon[1:])
+    self.cumulative_lengths = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+
+  def point_distances(self, pos: Coordinate) -> np.ndarray:
+    return haversine_distance(self.lat, self.lon, pos.latitude, pos.longitude)
+
+  def segment_distances(self, pos: Coordinate) -> np.ndarray:
+    # minimum_distance to every segment
+    ab_lat, ab_lon = np.diff(self.lat), np.diff(self.lon)
+    ap_lat, ap_lon = pos.latitude - self.lat[:-1], pos.longitude - self.lon[:-1]
+    ab_ab = ab_lat * ab_lat + ab_lon * ab_lon
+    with np.errstate(divide='ignore', invalid='ignore'):
+      t = np.clip((ap_lat * ab_lat + ap_lon * ab_lon) / ab_ab, 0.0, 1.0)
+    degenerate = self.segment_lengths < 0.01
+    t[degenerate] = 0.0
+    return haversine_distance(self.lat[:-1] + ab_lat * t, self.lon[:-1] + ab_lon * t, pos.latitude, pos.longitude)
+
+  def distance_along(self, pos: Coordinate) -> float:
+    # same as distance_along_geometry
+    if len(self.geometry) <= 2:
+      return self.geometry[0].distance_to(pos)
+
+    closest_idx = int(np.argmin(self.segment_distances(pos)))
+    return float(self.cumulative_lengths[closest_idx] + self.geometry[closest_idx].distance_to(pos))
+
+
 def coordinate_from_param(param: str, params: Params = None) -> Coordinate | None:
   if params is None:
     params = Params()
@@ -2,20 +2,21 @@
 import json
 import math
 import os
+import queue
 import threading
 
+import numpy as np
 import requests
 
 import cereal.messaging as messaging
 from cereal import log
 from openpilot.common.api import Api
 from openpilot.common.numpy_fast import interp
+from openpilot.common.file_helpers import atomic_write_in_dir
 from openpilot.common.params import Params
 from openpilot.common.realtime import Ratekeeper
-from openpilot.selfdrive.navd.helpers import (Coordinate, coordinate_from_param,
-                                    distance_along_geometry, maxspeed_to_ms,
-                                    minimum_distance,
-                                    parse_banner_instructions)
+from openpilot.selfdrive.navd.helpers import (Coordinate, GeometryIndex, coordinate_from_param,
+                                    maxspeed_to_ms, parse_banner_instructions)
 from openpilot.common.swaglog import cloudlog
 
 from openpilot.selfdrive.frogpilot.frogpilot_variables import get_frogpilot_toggles, has_prime
@@ -43,6 +44,12 @@ class RouteEngine:
     self.step_idx = None
     self.route = None
     self.route_geometry = None
+    self.route_geometry_index = None
+
+    # cumulative step totals, element i is the sum over steps 0..i-1
+    self.step_distance_totals = None
+    self.step_duration_totals = None
+    self.step_duration_typical_totals = None
 
     self.recompute_backoff = 0
     self.recompute_countdown = 0
@@ -75,6 +82,22 @@ class RouteEngine:
     self.stop_coord = []
     self.stop_signal = []
 
+    # route snapshots for the fleet manager are written in the background, in order
+    self.snapshot_queue = queue.Queue()
+    threading.Thread(target=self.snapshot_writer, daemon=True).start()
+
+  def snapshot_writer(self):
+    while True:
+      filename, data = self.snapshot_queue.get()
+      try:
+        with atomic_write_in_dir(filename, overwrite=True) as json_file:
+          json.dump(data, json_file)
+      except OSError:
+        cloudlog.exception(f"navd.failed_to_write_{filename}")
+
+  def save_snapshot(self, filename, data):
+    self.snapshot_queue.put((filename, data))
+
   def update(self):
     self.sm.update(0)
 
@@ -212,10 +235,8 @@ class RouteEngine:
           print(f"Error decoding JSON: {e}")
 
       # Save slim json as file
-      with open('navdirections.json', 'w') as json_file:
-        json.dump(self.r2, json_file, indent=4)
-      with open('CurrentStep.json', 'w') as json_file:
-        json.dump(self.r3, json_file, indent=4)
+      self.save_snapshot('navdirections.json', self.r2)
+      self.save_snapshot('CurrentStep.json', dict(self.r3))
 
       if len(r['routes']):
         self.route = r['routes'][0]['legs'][0]['steps']
@@ -254,6 +275,13 @@ class RouteEngine:
           self.route_geometry.append(coords)
           maxspeed_idx -= 1  # Every segment ends with the same coordinate as the start of the next
 
+        self.route_geometry_index = [GeometryIndex(coords) for coords in self.route_geometry]
+        durations = [step['duration'] for step in self.route]
+        durations_typical = [step['duration'] if step['duration_typical'] is None else step['duration_typical'] for step in self.route]
+        self.step_distance_totals = np.concatenate(([0.0], np.cumsum([step['distance'] for step in self.route])))
+        self.step_duration_totals = np.concatenate(([0.0], np.cumsum(durations)))
+        self.step_duration_typical_totals = np.concatenate(([0.0], np.cumsum(durations_typical)))
+
         self.step_idx = 0
       else:
         cloudlog.warning("Got empty route response")
@@ -280,7 +308,8 @@ class RouteEngine:
 
     step = self.route[self.step_idx]
     geometry = self.route_geometry[self.step_idx]
-    along_geometry = distance_along_geometry(geometry, self.last_position)
+    geometry_index = self.route_geometry_index[self.step_idx]
+    along_geometry = geometry_index.distance_along(self.last_position)
     distance_to_maneuver_along_geometry = step['distance'] - along_geometry
 
     # Banner instructions are for the following maneuver step, don't use empty last step
@@ -297,13 +326,14 @@ class RouteEngine:
 
     # All instructions
     maneuvers = []
+    distance_totals = self.step_distance_totals
     for i, step_i in enumerate(self.route):
       if i < self.step_idx:
-        distance_to_maneuver = -sum(self.route[j]['distance'] for j in range(i+1, self.step_idx)) - along_geometry
+        distance_to_maneuver = -float(distance_totals[self.step_idx] - distance_totals[i+1]) - along_geometry
       elif i == self.step_idx:
         distance_to_maneuver = distance_to_maneuver_along_geometry
       else:
-        distance_to_maneuver = distance_to_maneuver_along_geometry + sum(self.route[j]['distance'] for j in range(self.step_idx+1, i+1))
+        distance_to_maneuver = distance_to_maneuver_along_geometry + float(distance_totals[i+1] - distance_totals[self.step_idx+1])
 
       instruction = parse_banner_instructions(step_i['bannerInstructions'], distance_to_maneuver)
       if instruction is None:
@@ -328,23 +358,20 @@ class RouteEngine:
       total_time_typical = step['duration_typical'] * remaining
 
     # Add up totals for future steps
-    for i in range(self.step_idx + 1, len(self.route)):
-      total_distance += self.route[i]['distance']
-      total_time += self.route[i]['duration']
-      if self.route[i]['duration_typical'] is None:
-        total_time_typical += self.route[i]['duration']
-      else:
-        total_time_typical += self.route[i]['duration_typical']
+    total_distance += float(distance_totals[-1] - distance_totals[self.step_idx + 1])
+    total_time += float(self.step_duration_totals[-1] - self.step_duration_totals[self.step_idx + 1])
+    total_time_typical += float(self.step_duration_typical_totals[-1] - self.step_duration_typical_totals[self.step_idx + 1])
 
     msg.navInstruction.distanceRemaining = total_distance
     msg.navInstruction.timeRemaining = total_time
     msg.navInstruction.timeRemainingTypical = total_time_typical
 
     # Speed limit
-    closest_idx, closest = min(enumerate(geometry), key=lambda p: p[1].distance_to(self.last_position))
+    closest_idx = int(np.argmin(geometry_index.point_distances(self.last_position)))
+    closest = geometry[closest_idx]
     if closest_idx > 0:
       # If we are not past the closest point, show previous
-      if along_geometry < distance_along_geometry(geometry, geometry[closest_idx]):
+      if along_geometry < geometry_index.distance_along(geometry[closest_idx]):
         closest = geometry[closest_idx - 1]
 
     if ('maxspeed' in closest.annotations) and self.localizer_valid:
@@ -371,9 +398,7 @@ class RouteEngine:
         # Update the 'CurrentStep' value in the JSON
         if 'routes' in self.r2 and len(self.r2['routes']) > 0:
           self.r3['CurrentStep'] = self.step_idx
-        # Write the modified JSON data back to the file
-        with open('CurrentStep.json', 'w') as json_file:
-          json.dump(self.r3, json_file, indent=4)
+        self.save_snapshot('CurrentStep.json', dict(self.r3))
       else:
         cloudlog.warning("Destination reached")
 
@@ -425,6 +450,10 @@ class RouteEngine:
   def clear_route(self):
     self.route = None
     self.route_geometry = None
+    self.route_geometry_index = None
+    self.step_distance_totals = None
+    self.step_duration_totals = None
+    self.step_duration_typical_totals = None
     self.step_idx = None
     self.nav_destination = None
 
@@ -442,15 +471,10 @@ class RouteEngine:
 
     # Compute closest distance to all line segments in the current path
     min_d = REROUTE_DISTANCE + 1
-    path = self.route_geometry[self.step_idx]
-    for i in range(len(path) - 1):
-      a = path[i]
-      b = path[i + 1]
-
-      if a.distance_to(b) < 1.0:
-        continue
-
-      min_d = min(min_d, minimum_distance(a, b, self.last_position))
+    geometry_index = self.route_geometry_index[self.step_idx]
+    segment_distances = geometry_index.segment_distances(self.last_position)[geometry_index.segment_lengths >= 1.0]
+    if len(segment_distances):
+      min_d = min(min_d, float(segment_distances.min()))
 
     if min_d > REROUTE_DISTANCE:
       self.reroute_counter += 1
@@ -15,6 +15,7 @@ from cereal.services import SERVICE_LIST
 from openpilot.common.dict_helpers import strip_deprecated_keys
 from openpilot.common.filter_simple import FirstOrderFilter
 from openpilot.common.params import Params
+from openpilot.common.params_writer import Durability, ParamsWriter
 from openpilot.common.realtime import DT_HW
 from openpilot.selfdrive.controls.lib.alertmanager import set_offroad_alert
 from openpilot.system.hardware import HARDWARE, TICI, AGNOS
@@ -22,6 +23,7 @@ from openpilot.system.loggerd.config import get_available_bytes, get_available_p
 from openpilot.system.statsd import statlog
 from openpilot.common.swaglog import cloudlog
 from openpilot.system.hardware.power_monitoring import PowerMonitoring
+from openpilot.system.hardware.sampling import CachedValue, ParamsWatcher, SysfsReader, ThermalZones
 from openpilot.system.hardware.fan_controller import TiciFanController
 from openpilot.system.version import terms_version, training_version
 
@@ -51,40 +53,26 @@ THERMAL_BANDS = OrderedDict({
 # Override to highest thermal band when offroad and above this temp
 OFFROAD_DANGER_TEMP = 75
 
+# Params checked every cycle for the startup conditions, re-read only when they change
+STARTUP_PARAMS = ["Offroad_ConnectivityNeeded", "DisableUpdates", "SnoozeUpdate", "DoUninstall", "HasAcceptedTerms",
+                  "CompletedTrainingVersion", "IsDriverViewEnabled", "IsTakingSnapshot", "Offroad_BadNvme", "LastAthenaPingTime"]
+STARTUP_MEMORY_PARAMS = ["ForceOnroad", "ForceOffroad"]
+
 prev_offroad_states: dict[str, tuple[bool, str | None]] = {}
 
-tz_by_type: dict[str, int] | None = None
-def populate_tz_by_type():
-  global tz_by_type
-  tz_by_type = {}
-  for n in os.listdir("/sys/devices/virtual/thermal"):
-    if not n.startswith("thermal_zone"):
-      continue
-    with open(os.path.join("/sys/devices/virtual/thermal", n, "type")) as f:
-      tz_by_type[f.read().strip()] = int(n.removeprefix("thermal_zone"))
+sysfs = SysfsReader()
+thermal_zones = ThermalZones(sysfs)
 
 def read_tz(x):
-  if x is None:
-    return 0
-
-  if isinstance(x, str):
-    if tz_by_type is None:
-      populate_tz_by_type()
-    x = tz_by_type[x]
-
-  try:
-    with open(f"/sys/devices/virtual/thermal/thermal_zone{x}/temp") as f:
-      return int(f.read())
-  except FileNotFoundError:
-    return 0
+  return thermal_zones.read(x)
 
 
 def read_thermal(thermal_config):
   dat = messaging.new_message('deviceState', valid=True)
-  dat.deviceState.cpuTempC = [read_tz(z) / thermal_config.cpu[1] for z in thermal_config.cpu[0]]
-  dat.deviceState.gpuTempC = [read_tz(z) / thermal_config.gpu[1] for z in thermal_config.gpu[0]]
-  dat.deviceState.memoryTempC = read_tz(thermal_config.mem[0]) / thermal_config.mem[1]
-  dat.deviceState.pmicTempC = [read_tz(z) / thermal_config.pmic[1] for z in thermal_config.pmic[0]]
+  dat.deviceState.cpuTempC = [t / thermal_config.cpu[1] for t in thermal_zones.read_many(thermal_config.cpu[0])]
+  dat.deviceState.gpuTempC = [t / thermal_config.gpu[1] for t in thermal_zones.read_many(thermal_config.gpu[0])]
+  dat.deviceState.memoryTempC = thermal_zones.read(thermal_config.mem[0]) / thermal_config.mem[1]
+  dat.deviceState.pmicTempC = [t / thermal_config.pmic[1] for t in thermal_zones.read_many(thermal_config.pmic[0])]
   return dat
 
 
@@ -199,10 +187,21 @@ def hardware_thread(end_event, hw_queue) -> None:
   engaged_prev = False
 
   params = Params()
+  # written every cycle or on every engagement, nothing needs them to survive a power loss
+  params_writer = ParamsWriter(params, {"IsEngaged": Durability.VOLATILE, "NetworkMetered": Durability.VOLATILE})
   power_monitor = PowerMonitoring()
 
+  startup_params = ParamsWatcher(params, STARTUP_PARAMS)
+  startup_memory_params = ParamsWatcher(params_memory, STARTUP_MEMORY_PARAMS)
+
   HARDWARE.initialize_hardware()
   thermal_config = HARDWARE.get_thermal_config()
+  device_type = HARDWARE.get_device_type()
+
+  # slow changing values, sampled at a lower rate than the 2Hz loop
+  free_space_percent = CachedValue(lambda: get_available_percent(default=100.0), 5.)
+  free_space_gb = CachedValue(lambda: round(get_available_bytes(default=32.0 * (2 ** 30)) / (2 ** 30)), 30.)
+  used_space_gb = CachedValue(lambda: round(get_used_bytes(default=0.0 * (2 ** 30)) / (2 ** 30)), 30.)
 
   fan_controller = None
 
@@ -241,14 +240,14 @@ def hardware_thread(end_event, hw_queue) -> None:
       continue
 
     msg = read_thermal(thermal_config)
-    msg.deviceState.deviceType = HARDWARE.get_device_type()
+    msg.deviceState.deviceType = device_type
 
     try:
       last_hw_state = hw_queue.get_nowait()
     except queue.Empty:
       pass
 
-    msg.deviceState.freeSpacePercent = get_available_percent(default=100.0)
+    msg.deviceState.freeSpacePercent = free_space_percent.get()
     msg.deviceState.memoryUsagePercent = int(round(psutil.virtual_memory().percent))
     msg.deviceState.gpuUsagePercent = int(round(HARDWARE.get_gpu_usage_percent()))
     online_cpu_usage = [int(round(n)) for n in psutil.cpu_percent(percpu=True)]
@@ -301,15 +300,19 @@ def hardware_thread(end_event, hw_queue) -> None:
 
     # **** starting logic ****
 
-    startup_conditions["up_to_date"] = params.get("Offroad_ConnectivityNeeded") is None or params.get_bool("DisableUpdates") or params.get_bool("SnoozeUpdate") or frogpilot_toggles.offline_mode
-    startup_conditions["not_uninstalling"] = not params.get_bool("DoUninstall")
-    startup_conditions["accepted_terms"] = params.get("HasAcceptedTerms") == terms_version
+    startup_params.update()
+    startup_memory_params.update()
+
+    startup_conditions["up_to_date"] = startup_params.get("Offroad_ConnectivityNeeded") is None or startup_params.get_bool("DisableUpdates") or \
+                                       startup_params.get_bool("SnoozeUpdate") or frogpilot_toggles.offline_mode
+    startup_conditions["not_uninstalling"] = not startup_params.get_bool("DoUninstall")
+    startup_conditions["accepted_terms"] = startup_params.get("HasAcceptedTerms") == terms_version
 
     # with 2% left, we killall, otherwise the phone will take a long time to boot
     startup_conditions["free_space"] = msg.deviceState.freeSpacePercent > 2
-    startup_conditions["completed_training"] = params.get("CompletedTrainingVersion") == training_version
-    startup_conditions["not_driver_view"] = not params.get_bool("IsDriverViewEnabled")
-    startup_conditions["not_taking_snapshot"] = not params.get_bool("IsTakingSnapshot")
+    startup_conditions["completed_training"] = startup_params.get("CompletedTrainingVersion") == training_version
+    startup_conditions["not_driver_view"] = not startup_params.get_bool("IsDriverViewEnabled")
+    startup_conditions["not_taking_snapshot"] = not startup_params.get_bool("IsTakingSnapshot")
 
     # must be at an engageable thermal band to go onroad
     startup_conditions["device_temp_engageable"] = thermal_status < ThermalStatus.red
@@ -333,7 +336,7 @@ def hardware_thread(end_event, hw_queue) -> None:
           try:
             with open("/sys/block/nvme0n1/device/model") as f:
               model = f.read().strip()
-            if not model.startswith("Samsung SSD 980") and params.get("Offroad_BadNvme") is None:
+            if not model.startswith("Samsung SSD 980") and startup_params.get("Offroad_BadNvme") is None:
               set_offroad_alert_if_changed("Offroad_BadNvme", True)
               cloudlog.event("Unsupported NVMe", model=model, error=True)
           except Exception:
@@ -345,18 +348,18 @@ def hardware_thread(end_event, hw_queue) -> None:
       should_start = should_start and all(startup_conditions.values())
 
     # Handle force offroad/onroad
-    should_start |= params_memory.get_bool("ForceOnroad")
-    should_start &= not params_memory.get_bool("ForceOffroad")
+    should_start |= startup_memory_params.get_bool("ForceOnroad")
+    should_start &= not startup_memory_params.get_bool("ForceOffroad")
 
     if should_start != should_start_prev or (count == 0):
-      params.put_bool("IsEngaged", False)
+      params_writer.put_bool("IsEngaged", False)
       engaged_prev = False
       HARDWARE.set_power_save(not should_start)
 
     if sm.updated['controlsState']:
       engaged = sm['controlsState'].enabled
       if engaged != engaged_prev:
-        params.put_bool("IsEngaged", engaged)
+        params_writer.put_bool("IsEngaged", engaged)
         engaged_prev = engaged
 
       try:
@@ -406,7 +409,7 @@ def hardware_thread(end_event, hw_queue) -> None:
     msg.deviceState.started = started_ts is not None
     msg.deviceState.startedMonoTime = int(1e9*(started_ts or 0))
 
-    last_ping = params.get("LastAthenaPingTime")
+    last_ping = startup_params.get("LastAthenaPingTime")
     if last_ping is not None:
       msg.deviceState.lastAthenaPingTime = int(last_ping)
 
@@ -415,8 +418,8 @@ def hardware_thread(end_event, hw_queue) -> None:
 
     fpmsg = messaging.new_message('frogpilotDeviceState')
 
-    fpmsg.frogpilotDeviceState.freeSpace = round(get_available_bytes(default=32.0 * (2 ** 30)) / (2 ** 30))
-    fpmsg.frogpilotDeviceState.usedSpace = round(get_used_bytes(default=0.0 * (2 ** 30)) / (2 ** 30))
+    fpmsg.frogpilotDeviceState.freeSpace = free_space_gb.get()
+    fpmsg.frogpilotDeviceState.usedSpace = used_space_gb.get()
 
     pm.send("frogpilotDeviceState", fpmsg)
 
@@ -459,7 +462,7 @@ def hardware_thread(end_event, hw_queue) -> None:
         except Exception:
           cloudlog.exception("failed to save offroad status")
 
-    params.put_bool_nonblocking("NetworkMetered", msg.deviceState.networkMetered)
+    params_writer.put_bool("NetworkMetered", msg.deviceState.networkMetered)
 
     count += 1
     should_start_prev = should_start
@@ -36,6 +36,13 @@ class Paths:
       return os.environ['COMMA_CACHE'] + "/"
     return DEFAULT_DOWNLOAD_CACHE_ROOT + os.environ.get("OPENPILOT_PREFIX", "") + "/"
 
+  @staticmethod
+  def remux_cache_root() -> str:
+    if PC:
+      return os.path.join(Paths.comma_home(), "fleet_manager", "remux_cache", "")
+    else:
+      return "/data/media/fleet_manager/remux_cache/"
+
   @staticmethod
   def persist_root() -> str:
     if PC:
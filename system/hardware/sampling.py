@@ -0,0 +1,178 @@
+import os
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+THERMAL_DIR = "/sys/devices/virtual/thermal"
+MISSING_RETRY_INTERVAL = 10.  # seconds before trying to open a missing node again
+
+
+class SysfsReader:
+  """
+  Keeps sysfs/procfs nodes open and samples them with pread at offset 0,
+  which makes the kernel regenerate the value without reopening the file.
+
+  All paths are resolved relative to root, so tests can point it at a fake tree.
+  """
+  def __init__(self, root: str = "/", read_size: int = 4096):
+    self.root = root
+    self.read_size = read_size
+    self.fds: dict[str, int] = {}
+    self.missing: dict[str, float] = {}
+
+  def _get_fd(self, path: str) -> int | None:
+    fd = self.fds.get(path)
+    if fd is not None:
+      return fd
+
+    retry_t = self.missing.get(path)
+    if retry_t is not None and time.monotonic() < retry_t:
+      return None
+
+    try:
+      fd = os.open(os.path.join(self.root, path.lstrip("/")), os.O_RDONLY | os.O_CLOEXEC)
+    except OSError:
+      self.missing[path] = time.monotonic() + MISSING_RETRY_INTERVAL
+      return None
+
+    self.missing.pop(path, None)
+    self.fds[path] = fd
+    return fd
+
+  def _close(self, path: str) -> None:
+    fd = self.fds.pop(path, None)
+    if fd is not None:
+      os.close(fd)
+
+  def read(self, path: str) -> str | None:
+    fd = self._get_fd(path)
+    if fd is None:
+      return None
+
+    try:
+      return os.pread(fd, self.read_size, 0).decode()
+    except OSError:
+      # node went away, e.g. a driver was reloaded. reopen on the next read
+      self._close(path)
+      return None
+
+  def read_many(self, paths: Iterable[str]) -> list[str | None]:
+    return [self.read(p) for p in paths]
+
+  def read_value(self, path: str, parser: Callable[[str], Any], default: Any = 0) -> Any:
+    dat = self.read(path)
+    if dat is None:
+      return default
+    try:
+      return parser(dat)
+    except ValueError:
+      return default
+
+  def close(self) -> None:
+    for path in list(self.fds):
+      self._close(path)
+
+  def __del__(self):
+    self.close()
+
+
+class CachedValue:
+  """
+  Calls fn at most once every interval seconds. An interval of None caches forever.
+  """
+  def __init__(self, fn: Callable[[], Any], interval: float | None):
+    self.fn = fn
+    self.interval = interval
+    self.value: Any = None
+    self.last_update: float | None = None
+
+  def get(self) -> Any:
+    now = time.monotonic()
+    if self.last_update is None or (self.interval is not None and now - self.last_update >= self.interval):
+      self.value = self.fn()
+      self.last_update = now
+    return self.value
+
+  def invalidate(self) -> None:
+    self.last_update = None
+
+
+class ThermalZones:
+  """
+  Reads thermal zone temperatures by zone index or type name. Zone types are
+  resolved once, then every sample is one pread per zone.
+  """
+  def __init__(self, reader: SysfsReader, thermal_dir: str = THERMAL_DIR):
+    self.reader = reader
+    self.thermal_dir = thermal_dir
+    self._zones_by_type: dict[str, int] | None = None
+
+  @property
+  def zones_by_type(self) -> dict[str, int]:
+    if self._zones_by_type is None:
+      self._zones_by_type = {}
+      try:
+        names = os.listdir(os.path.join(self.reader.root, self.thermal_dir.lstrip("/")))
+      except FileNotFoundError:
+        names = []
+      for n in names:
+        if n.startswith("thermal_zone"):
+          with open(os.path.join(self.reader.root, self.thermal_dir.lstrip("/"), n, "type")) as f:
+            self._zones_by_type[f.read().strip()] = int(n.removeprefix("thermal_zone"))
+    return self._zones_by_type
+
+  def temp_path(self, zone: int | str | None) -> str | None:
+    if zone is None:
+      return None
+    if isinstance(zone, str):
+      zone = self.zones_by_type[zone]
+    return os.path.join(self.thermal_dir, f"thermal_zone{zone}", "temp")
+
+  def read(self, zone: int | str | None) -> int:
+    path = self.temp_path(zone)
+    return 0 if path is None else self.reader.read_value(path, int)
+
+  def read_many(self, zones: Iterable[int | str | None]) -> list[int]:
+    return [self.read(z) for z in zones]
+
+
+class ParamsWatcher:
+  """
+  Caches a fixed set of params. Writes and removals replace files in the params
+  directory, so the keys are only re-read when its mtime changes, and at least
+  every refresh_interval seconds to cover writes within the mtime granularity.
+  """
+  def __init__(self, params, keys: Iterable[str], refresh_interval: float = 5.):
+    self.params = params
+    self.keys = list(keys)
+    self.refresh_interval = refresh_interval
+    self.path = params.get_param_path()
+    self.values: dict[str, bytes | None] = {}
+    self.last_mtime: int | None = None
+    self.last_refresh = 0.
+
+  def _mtime(self) -> int | None:
+    try:
+      return os.stat(self.path).st_mtime_ns
+    except OSError:
+      return None
+
+  def update(self) -> bool:
+    """Re-reads the keys if the params may have changed, returns True if any value did"""
+    now = time.monotonic()
+    mtime = self._mtime()
+    if mtime is not None and mtime == self.last_mtime and now - self.last_refresh < self.refresh_interval:
+      return False
+
+    self.last_mtime = mtime
+    self.last_refresh = now
+    values = {k: self.params.get(k) for k in self.keys}
+    changed = values != self.values
+    self.values = values
+    return changed
+
+  def get(self, key: str) -> bytes | None:
+    return self.values[key]
+
+  def get_bool(self, key: str) -> bool:
+    return self.values[key] == b"1"
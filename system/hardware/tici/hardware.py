@@ -11,6 +11,7 @@ from pathlib import Path
 from cereal import log
 from openpilot.common.gpio import gpio_set, gpio_init, get_irqs_for_action
 from openpilot.system.hardware.base import HardwareBase, ThermalConfig
+from openpilot.system.hardware.sampling import SysfsReader
 from openpilot.system.hardware.tici import iwlist
 from openpilot.system.hardware.tici.pins import GPIO
 from openpilot.system.hardware.tici.amplifier import Amplifier
@@ -97,6 +98,11 @@ def get_device_type():
   return model.split('comma ')[-1]
 
 class Tici(HardwareBase):
+  @cached_property
+  def sysfs(self):
+    # persistent fds for the nodes sampled every hardwared cycle
+    return SysfsReader()
+
   @cached_property
   def bus(self):
     import dbus
@@ -333,10 +339,10 @@ class Tici(HardwareBase):
     return ret
 
   def get_current_power_draw(self):
-    return (self.read_param_file("/sys/class/hwmon/hwmon1/power1_input", int) / 1e6)
+    return (self.sysfs.read_value("/sys/class/hwmon/hwmon1/power1_input", int) / 1e6)
 
   def get_som_power_draw(self):
-    return (self.read_param_file("/sys/class/power_supply/bms/voltage_now", int) * self.read_param_file("/sys/class/power_supply/bms/current_now", int) / 1e12)
+    return (self.sysfs.read_value("/sys/class/power_supply/bms/voltage_now", int) * self.sysfs.read_value("/sys/class/power_supply/bms/current_now", int) / 1e12)
 
   def shutdown(self):
     os.system("sudo poweroff")
@@ -361,14 +367,11 @@ class Tici(HardwareBase):
       pass
 
   def get_screen_brightness(self):
-    try:
-      with open("/sys/class/backlight/panel0-backlight/max_brightness") as f:
-        max_brightness = float(f.read().strip())
-
-      with open("/sys/class/backlight/panel0-backlight/brightness") as f:
-        return int(float(f.read()) / (max_brightness / 100.))
-    except Exception:
+    max_brightness = self.sysfs.read_value("/sys/class/backlight/panel0-backlight/max_brightness", float, default=None)
+    brightness = self.sysfs.read_value("/sys/class/backlight/panel0-backlight/brightness", float, default=None)
+    if not max_brightness or brightness is None:
       return 0
+    return int(brightness / (max_brightness / 100.))
 
   def set_power_save(self, powersave_enabled):
     # amplifier, 100mW at idle
@@ -402,8 +405,7 @@ class Tici(HardwareBase):
 
   def get_gpu_usage_percent(self):
     try:
-      with open('/sys/class/kgsl/kgsl-3d0/gpubusy') as f:
-        used, total = f.read().strip().split()
+      used, total = self.sysfs.read('/sys/class/kgsl/kgsl-3d0/gpubusy').strip().split()
       return 100.0 * int(used) / int(total)
     except Exception:
       return 0
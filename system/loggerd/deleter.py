@@ -50,6 +50,15 @@ def deleter_thread(exit_event):
     out_of_percent = get_available_percent(default=MIN_PERCENT + 1) < MIN_PERCENT
 
     if out_of_percent or out_of_bytes:
+      # the fleet manager remux cache can be regenerated, drop it before any segment
+      remux_cache = Paths.remux_cache_root()
+      if os.path.isdir(remux_cache):
+        cloudlog.info(f"deleting {remux_cache}")
+        shutil.rmtree(remux_cache, ignore_errors=True)
+        if not os.path.isdir(remux_cache):
+          exit_event.wait(.1)
+          continue
+
       dirs = listdir_by_creation(Paths.log_root())
 
       # skip deleting most recent N preserved segments (and their prior segment)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import importlib
+import multiprocessing
+import time
+
+import numpy as np
+
+
+def import_and_report(module, conn):
+  try:
+    importlib.import_module(module)
+    conn.send((time.monotonic(), None))
+  except Exception as e:
+    conn.send((None, repr(e)))
+  conn.close()
+
+
+def time_to_import(context, module):
+  """Seconds from starting a child until it has imported the module, which is when a daemon can start its main()"""
+  parent_conn, child_conn = context.Pipe(duplex=False)
+  proc = context.Process(target=import_and_report, args=(module, child_conn))
+  start = time.monotonic()
+  proc.start()
+  child_conn.close()
+  ready, error = parent_conn.recv()
+  proc.join()
+  if error is not None:
+    raise RuntimeError(f"{module} failed to import in a {context.get_start_method()}ed child: {error}")
+  return ready - start
+
+
+def benchmark(modules, repeat):
+  # spawned children start from a fresh interpreter, so run them before anything is preimported here
+  times = {module: {} for module in modules}
+  spawn = multiprocessing.get_context("spawn")
+  for module in modules:
+    times[module]["spawn"] = np.median([time_to_import(spawn, module) for _ in range(repeat)])
+
+  # what manager_init does before starting any process
+  for module in modules:
+    importlib.import_module(module)
+  gc.freeze()
+
+  fork = multiprocessing.get_context("fork")
+  for module in modules:
+    times[module]["fork"] = np.median([time_to_import(fork, module) for _ in range(repeat)])
+
+  print(f"{'module':<56} {'spawn ms':>9} {'fork ms':>9}")
+  for module, t in times.items():
+    print(f"{module:<56} {t['spawn'] * 1e3:9.1f} {t['fork'] * 1e3:9.1f}")
+  print(f"{'total':<56} {sum(t['spawn'] for t in times.values()) * 1e3:9.1f} {sum(t['fork'] for t in times.values()) * 1e3:9.1f}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Times how long a managed python process takes to be ready to run, spawned from a fresh "
+                                               "interpreter and forked from a manager that preimported it",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("modules", nargs="*", help="modules to start, all enabled python processes of process_config by default")
+  parser.add_argument("--repeat", type=int, default=3)
+  args = parser.parse_args()
+
+  modules = args.modules
+  if not modules:
+    from openpilot.system.manager.process import PythonProcess
+    from openpilot.system.manager.process_config import managed_processes
+    modules = [p.module for p in managed_processes.values() if isinstance(p, PythonProcess) and p.enabled]
+
+  benchmark(modules, args.repeat)
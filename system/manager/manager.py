@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import datetime
+import gc
 import os
 import signal
 import sys
@@ -133,6 +134,10 @@ def manager_init() -> None:
   for p in managed_processes.values():
     p.prepare()
 
+  # move the preimported objects out of the GC's tracked generations so that collections
+  # in the manager or forked children don't dirty the shared copy-on-write pages
+  gc.freeze()
+
 
 def manager_cleanup() -> None:
   # send signals to kill all procs
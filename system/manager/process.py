@@ -1,4 +1,5 @@
 import importlib
+import multiprocessing
 import os
 import signal
 import struct
@@ -6,7 +7,7 @@ import time
 import subprocess
 from collections.abc import Callable, ValuesView
 from abc import ABC, abstractmethod
-from multiprocessing import Process
+from multiprocessing.process import BaseProcess
 
 from setproctitle import setproctitle
 
@@ -20,6 +21,10 @@ from openpilot.common.swaglog import cloudlog
 WATCHDOG_FN = "/dev/shm/wd_"
 ENABLE_WATCHDOG = os.getenv("NO_WATCHDOG") is None
 
+# children must fork from the manager so they inherit the modules preimported in prepare(),
+# regardless of the platform's default start method (spawn/forkserver would re-import everything)
+mp_context = multiprocessing.get_context("fork")
+
 
 def launcher(proc: str, name: str) -> None:
   try:
@@ -55,7 +60,7 @@ def nativelauncher(pargs: list[str], cwd: str, name: str) -> None:
   os.execvp(pargs[0], pargs)
 
 
-def join_process(process: Process, timeout: float) -> None:
+def join_process(process: BaseProcess, timeout: float) -> None:
   # Process().join(timeout) will hang due to a python 3 bug: https://bugs.python.org/issue28382
   # We have to poll the exitcode instead
   t = time.monotonic()
@@ -67,7 +72,7 @@ class ManagerProcess(ABC):
   daemon = False
   sigkill = False
   should_run: Callable[[bool, Params, car.CarParams], bool]
-  proc: Process | None = None
+  proc: BaseProcess | None = None
   enabled = True
   name = ""
 
@@ -198,7 +203,7 @@ class NativeProcess(ManagerProcess):
 
     cwd = os.path.join(BASEDIR, self.cwd)
     cloudlog.info(f"starting process {self.name}")
-    self.proc = Process(name=self.name, target=self.launcher, args=(self.cmdline, cwd, self.name))
+    self.proc = mp_context.Process(name=self.name, target=self.launcher, args=(self.cmdline, cwd, self.name))
     self.proc.start()
     self.watchdog_seen = False
     self.shutting_down = False
@@ -228,7 +233,7 @@ class PythonProcess(ManagerProcess):
       return
 
     cloudlog.info(f"starting python {self.module}")
-    self.proc = Process(name=self.name, target=self.launcher, args=(self.module, self.name))
+    self.proc = mp_context.Process(name=self.name, target=self.launcher, args=(self.module, self.name))
     self.proc.start()
     self.watchdog_seen = False
     self.shutting_down = False
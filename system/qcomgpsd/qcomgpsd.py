@@ -3,6 +3,7 @@ import os
 import sys
 import signal
 import itertools
+import operator
 import math
 import time
 import requests
@@ -13,6 +14,8 @@ from multiprocessing import Process, Event
 from typing import NoReturn
 from struct import unpack_from, calcsize, pack
 
+import numpy as np
+
 from cereal import log
 import cereal.messaging as messaging
 from openpilot.common.gpio import gpio_init, gpio_set
@@ -21,7 +24,7 @@ from openpilot.common.time import system_time_valid
 from openpilot.system.hardware.tici.pins import GPIO
 from openpilot.common.swaglog import cloudlog
 from openpilot.system.qcomgpsd.modemdiag import ModemDiag, DIAG_LOG_F, setup_logs, send_recv
-from openpilot.system.qcomgpsd.structs import (dict_unpacker, position_report, relist,
+from openpilot.system.qcomgpsd.structs import (dtype_unpacker, struct_dtype, unpack_array, position_report,
                                               gps_measurement_report, gps_measurement_report_sv,
                                               glonass_measurement_report, glonass_measurement_report_sv,
                                               oemdre_measurement_report, oemdre_measurement_report_sv, oemdre_svpoly_report,
@@ -86,6 +89,49 @@ measurementStatusGlonassFields = {
   "glonassTimeMarkValid": 17
 }
 
+def sv_dicts(sats, fields, bool_fields, status_fields):
+  """
+  Builds the sv list of a report from a structured array of satellites, with one tolist() for the fields
+  and one masked comparison per field the measurementStatus bits come from.
+
+  fields maps dtype fields to sv fields, bool_fields lists the sv fields stored as bools and
+  status_fields maps measurementStatus fields to a (dtype field, bit mask) pair.
+  """
+  get = operator.itemgetter(*(sats.dtype.names.index(f) for f in fields))
+  keys = list(fields.values())
+  status_keys, status_cols = [], []
+  for f in dict.fromkeys(f for f, _ in status_fields.values()):
+    bits = {k: mask for k, (src, mask) in status_fields.items() if src == f}
+    status_keys += bits
+    status_cols.append((sats[f][:, None] & np.array(list(bits.values()), dtype=sats[f].dtype)) != 0)
+  status_rows = np.concatenate(status_cols, axis=1).tolist() if status_cols else [[]] * len(sats)
+  svs = [{**dict(zip(keys, get(row), strict=True)), 'measurementStatus': dict(zip(status_keys, status_row, strict=True))}
+         for row, status_row in zip(sats.tolist(), status_rows, strict=True)]
+  for sv in svs:
+    for k in bool_fields:
+      sv[k] = bool(sv[k])
+  return svs
+
+def oemdre_sv_mapping(sv_dtype):
+  """sv_dicts fields and status fields of the satellites of an OEMDRE measurement report"""
+  fields = {f: f for f in sv_dtype.names if f not in ("unkn", "measurementStatus", "measurementStatus2", "multipathEstimateValid", "directionValid")}
+  status = {
+    "multipathEstimateIsValid": ("multipathEstimateValid", 0xFF),
+    "directionIsValid": ("directionValid", 0xFF),
+    **{k: ("measurementStatus", 1 << v) for k, v in measurementStatusFields.items()},
+  }
+  return fields, status
+
+def measurement_sv_mapping(sv_dtype, source_status_fields):
+  """sv_dicts fields and status fields of the satellites of a GPS or GLONASS measurement report"""
+  renames = {"parityErrorCount": "gpsParityErrorCount", "frequencyIndex": "glonassFrequencyIndex", "hemmingErrorCount": "glonassHemmingErrorCount"}
+  fields = {f: renames.get(f, f) for f in sv_dtype.names if f not in ("measurementStatus", "miscStatus", "pad")}
+  status = {
+    **{k: ("measurementStatus", 1 << v) for k, v in itertools.chain(measurementStatusFields.items(), source_status_fields.items())},
+    **{k: ("miscStatus", 1 << v) for k, v in miscStatusFields.items()},
+  }
+  return fields, status
+
 @retry(attempts=10, delay=1.0)
 def try_setup_logs(diag, logs):
   return setup_logs(diag, logs)
@@ -217,19 +263,24 @@ def wait_for_modem(cmd="AT+QGPS?"):
 
 
 def main() -> NoReturn:
-  unpack_gps_meas, size_gps_meas = dict_unpacker(gps_measurement_report, True)
-  unpack_gps_meas_sv, size_gps_meas_sv = dict_unpacker(gps_measurement_report_sv, True)
+  unpack_gps_meas, size_gps_meas = dtype_unpacker(gps_measurement_report, True)
+  gps_meas_sv_dtype = struct_dtype(gps_measurement_report_sv, True)
 
-  unpack_glonass_meas, size_glonass_meas = dict_unpacker(glonass_measurement_report, True)
-  unpack_glonass_meas_sv, size_glonass_meas_sv = dict_unpacker(glonass_measurement_report_sv, True)
+  unpack_glonass_meas, size_glonass_meas = dtype_unpacker(glonass_measurement_report, True)
+  glonass_meas_sv_dtype = struct_dtype(glonass_measurement_report_sv, True)
 
-  unpack_oemdre_meas, size_oemdre_meas = dict_unpacker(oemdre_measurement_report, True)
-  unpack_oemdre_meas_sv, size_oemdre_meas_sv = dict_unpacker(oemdre_measurement_report_sv, True)
+  unpack_oemdre_meas, size_oemdre_meas = dtype_unpacker(oemdre_measurement_report, True)
+  oemdre_meas_sv_dtype = struct_dtype(oemdre_measurement_report_sv, True)
 
-  unpack_svpoly, _ = dict_unpacker(oemdre_svpoly_report, True)
-  unpack_position, _ = dict_unpacker(position_report)
+  unpack_svpoly, _ = dtype_unpacker(oemdre_svpoly_report, True)
+  unpack_position, _ = dtype_unpacker(position_report)
 
-  unpack_position, _ = dict_unpacker(position_report)
+  # sv field mappings, resolved once per report type
+  oemdre_sv_fields, oemdre_sv_status = oemdre_sv_mapping(oemdre_meas_sv_dtype)
+  meas_sv = {
+    LOG_GNSS_GPS_MEASUREMENT_REPORT: (gps_meas_sv_dtype, *measurement_sv_mapping(gps_meas_sv_dtype, measurementStatusGPSFields)),
+    LOG_GNSS_GLONASS_MEASUREMENT_REPORT: (glonass_meas_sv_dtype, *measurement_sv_mapping(glonass_meas_sv_dtype, measurementStatusGlonassFields)),
+  }
 
   wait_for_modem()
 
@@ -299,7 +350,7 @@ def main() -> NoReturn:
           k += "Ms"
         if k == "version":
           assert v == 2
-        elif k == "svCount" or k.startswith("cdmaClockInfo["):
+        elif k == "svCount" or k == "cdmaClockInfo":
           # TODO: should we save cdmaClockInfo?
           pass
         elif k == "systemRtcValid":
@@ -307,38 +358,20 @@ def main() -> NoReturn:
         else:
           setattr(report, k, v)
 
-      report.init('sv', dat['svCount'])
-      sats = log_payload[size_oemdre_meas:]
-      for i in range(dat['svCount']):
-        sat = unpack_oemdre_meas_sv(sats[size_oemdre_meas_sv*i:size_oemdre_meas_sv*(i+1)])
-        sv = report.sv[i]
-        sv.init('measurementStatus')
-        for k,v in sat.items():
-          if k in ["unkn", "measurementStatus2"]:
-            pass
-          elif k == "multipathEstimateValid":
-            sv.measurementStatus.multipathEstimateIsValid = bool(v)
-          elif k == "directionValid":
-            sv.measurementStatus.directionIsValid = bool(v)
-          elif k == "goodParity":
-            setattr(sv, k, bool(v))
-          elif k == "measurementStatus":
-            for kk,vv in measurementStatusFields.items():
-              setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-          else:
-            setattr(sv, k, v)
+      sats = unpack_array(oemdre_meas_sv_dtype, log_payload, dat['svCount'], offset=size_oemdre_meas)
+      report.sv = sv_dicts(sats, oemdre_sv_fields, ("goodParity",), oemdre_sv_status)
       pm.send('qcomGnss', msg)
     elif log_type == LOG_GNSS_POSITION_REPORT:
       report = unpack_position(log_payload)
       if report["u_PosSource"] != 2:
         continue
-      vNED = [report["q_FltVelEnuMps[1]"], report["q_FltVelEnuMps[0]"], -report["q_FltVelEnuMps[2]"]]
-      vNEDsigma = [report["q_FltVelSigmaMps[1]"], report["q_FltVelSigmaMps[0]"], -report["q_FltVelSigmaMps[2]"]]
+      vNED = [report["q_FltVelEnuMps"][1], report["q_FltVelEnuMps"][0], -report["q_FltVelEnuMps"][2]]
+      vNEDsigma = [report["q_FltVelSigmaMps"][1], report["q_FltVelSigmaMps"][0], -report["q_FltVelSigmaMps"][2]]
 
       msg = messaging.new_message('gpsLocation', valid=True)
       gps = msg.gpsLocation
-      gps.latitude = report["t_DblFinalPosLatLon[0]"] * 180/math.pi
-      gps.longitude = report["t_DblFinalPosLatLon[1]"] * 180/math.pi
+      gps.latitude = report["t_DblFinalPosLatLon"][0] * 180/math.pi
+      gps.longitude = report["t_DblFinalPosLatLon"][1] * 180/math.pi
       gps.altitude = report["q_FltFinalPosAlt"]
       gps.speed = math.sqrt(sum([x**2 for x in vNED]))
       gps.bearingDeg = report["q_FltHeadingRad"] * 180/math.pi
@@ -363,7 +396,6 @@ def main() -> NoReturn:
     elif log_type == LOG_GNSS_OEMDRE_SVPOLY_REPORT:
       msg = messaging.new_message('qcomGnss', valid=True)
       dat = unpack_svpoly(log_payload)
-      dat = relist(dat)
       gnss = msg.qcomGnss
       gnss.logTs = log_time
       gnss.init('drSvPoly')
@@ -407,16 +439,12 @@ def main() -> NoReturn:
 
       if log_type == LOG_GNSS_GPS_MEASUREMENT_REPORT:
         dat = unpack_gps_meas(log_payload)
-        sats = log_payload[size_gps_meas:]
-        unpack_meas_sv, size_meas_sv = unpack_gps_meas_sv, size_gps_meas_sv
+        size_meas = size_gps_meas
         report.source = 0  # gps
-        measurement_status_fields = (measurementStatusFields.items(), measurementStatusGPSFields.items())
       elif log_type == LOG_GNSS_GLONASS_MEASUREMENT_REPORT:
         dat = unpack_glonass_meas(log_payload)
-        sats = log_payload[size_glonass_meas:]
-        unpack_meas_sv, size_meas_sv = unpack_glonass_meas_sv, size_glonass_meas_sv
+        size_meas = size_glonass_meas
         report.source = 1  # glonass
-        measurement_status_fields = (measurementStatusFields.items(), measurementStatusGlonassFields.items())
       else:
         raise RuntimeError(f"invalid log_type: {log_type}")
 
@@ -429,30 +457,11 @@ def main() -> NoReturn:
           pass
         else:
           setattr(report, k, v)
-      report.init('sv', dat['svCount'])
+      sv_dtype, sv_fields, sv_status = meas_sv[log_type]
       if dat['svCount'] > 0:
-        assert len(sats)//dat['svCount'] == size_meas_sv
-        for i in range(dat['svCount']):
-          sv = report.sv[i]
-          sv.init('measurementStatus')
-          sat = unpack_meas_sv(sats[size_meas_sv*i:size_meas_sv*(i+1)])
-          for k,v in sat.items():
-            if k == "parityErrorCount":
-              sv.gpsParityErrorCount = v
-            elif k == "frequencyIndex":
-              sv.glonassFrequencyIndex = v
-            elif k == "hemmingErrorCount":
-              sv.glonassHemmingErrorCount = v
-            elif k == "measurementStatus":
-              for kk,vv in itertools.chain(*measurement_status_fields):
-                setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-            elif k == "miscStatus":
-              for kk,vv in miscStatusFields.items():
-                setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-            elif k == "pad":
-              pass
-            else:
-              setattr(sv, k, v)
+        assert (len(log_payload) - size_meas)//dat['svCount'] == sv_dtype.itemsize
+      sats = unpack_array(sv_dtype, log_payload, dat['svCount'], offset=size_meas)
+      report.sv = sv_dicts(sats, sv_fields, (), sv_status)
 
       pm.send('qcomGnss', msg)
 
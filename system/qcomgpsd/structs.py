@@ -1,5 +1,7 @@
 from struct import unpack_from, calcsize
 
+import numpy as np
+
 LOG_GNSS_POSITION_REPORT = 0x1476
 LOG_GNSS_GPS_MEASUREMENT_REPORT = 0x1477
 LOG_GNSS_CLOCK_REPORT = 0x1478
@@ -290,43 +292,77 @@ def name_to_camelcase(nam):
       i += 1
   return ''.join(ret)
 
-def parse_struct(ss):
-  st = "<"
-  nams = []
+# struct format character -> little endian numpy type
+NP_TYPES = {"f": "<f4", "d": "<f8", "B": "u1", "b": "i1", "I": "<u4", "i": "<i4", "H": "<u2", "h": "<i2", "Q": "<u8"}
+
+def parse_fields(ss):
+  """Yields (struct format character, name, array length or None) for each member of a struct layout"""
   for l in ss.strip().split("\n"):
     if len(l.strip()) == 0:
       continue
     typ, nam = l.split(";")[0].split()
     #print(typ, nam)
     if typ == "float" or '_Flt' in nam:
-      st += "f"
+      fmt = "f"
     elif typ == "double" or '_Dbl' in nam:
-      st += "d"
+      fmt = "d"
     elif typ in ["uint8", "uint8_t"]:
-      st += "B"
+      fmt = "B"
     elif typ in ["int8", "int8_t"]:
-      st += "b"
+      fmt = "b"
     elif typ in ["uint32", "uint32_t"]:
-      st += "I"
+      fmt = "I"
     elif typ in ["int32", "int32_t"]:
-      st += "i"
+      fmt = "i"
     elif typ in ["uint16", "uint16_t"]:
-      st += "H"
+      fmt = "H"
     elif typ in ["int16", "int16_t"]:
-      st += "h"
+      fmt = "h"
     elif typ in ["uint64", "uint64_t"]:
-      st += "Q"
+      fmt = "Q"
     else:
       raise RuntimeError(f"unknown type {typ}")
     if '[' in nam:
-      cnt = int(nam.split("[")[1].split("]")[0])
-      st += st[-1]*(cnt-1)
+      yield fmt, nam.split("[")[0], int(nam.split("[")[1].split("]")[0])
+    else:
+      yield fmt, nam, None
+
+def parse_struct(ss):
+  st = "<"
+  nams = []
+  for fmt, nam, cnt in parse_fields(ss):
+    if cnt is not None:
+      st += fmt * cnt
       for i in range(cnt):
-        nams.append("%s[%d]" % (nam.split("[")[0], i))
+        nams.append("%s[%d]" % (nam, i))
     else:
+      st += fmt
       nams.append(nam)
   return st, nams
 
+def struct_dtype(ss, camelcase = False):
+  """Packed numpy structured dtype of a struct layout, array members become subarray fields"""
+  fields = []
+  for fmt, nam, cnt in parse_fields(ss):
+    if camelcase:
+      nam = name_to_camelcase(nam)
+    fields.append((nam, NP_TYPES[fmt]) if cnt is None else (nam, NP_TYPES[fmt], (cnt,)))
+  dt = np.dtype(fields)
+  assert dt.itemsize == calcsize(parse_struct(ss)[0])
+  return dt
+
+def unpack_array(dt, buf, count, offset = 0):
+  """Decodes count consecutive structs of dtype dt from buf without copying"""
+  return np.frombuffer(buf, dtype=dt, count=count, offset=offset)
+
+def dtype_unpacker(ss, camelcase = False):
+  """Like dict_unpacker, but array members are returned as lists instead of name[i] keys"""
+  dt = struct_dtype(ss, camelcase)
+  def unpack(x, offset = 0):
+    rec = np.frombuffer(x, dtype=dt, count=1, offset=offset)[0]
+    return {nam: rec[nam].tolist() for nam in dt.names}
+  return unpack, dt.itemsize
+
 def dict_unpacker(ss, camelcase = False):
   st, nams = parse_struct(ss)
   if camelcase:
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import math
+import time
+
+import capnp
+import numpy as np
+
+from cereal import log
+from openpilot.system.qcomgpsd.qcomgpsd import measurementStatusFields, measurementStatusGlonassFields, measurementStatusGPSFields, \
+                                              measurement_sv_mapping, miscStatusFields, oemdre_sv_mapping, sv_dicts
+from openpilot.system.qcomgpsd.structs import dict_unpacker, dtype_unpacker, relist, struct_dtype, unpack_array, \
+                                             glonass_measurement_report, glonass_measurement_report_sv, \
+                                             gps_measurement_report, gps_measurement_report_sv, \
+                                             oemdre_measurement_report, oemdre_measurement_report_sv, oemdre_svpoly_report, position_report
+
+SV_COUNTS = (0, 1, 12, 24, 40)
+
+# built once at startup, like qcomgpsd's main did
+unpack_oemdre_meas_sv, size_oemdre_meas_sv = dict_unpacker(oemdre_measurement_report_sv, True)
+meas_sv_unpackers = {id(layout): dict_unpacker(layout, True) for layout in (gps_measurement_report_sv, glonass_measurement_report_sv)}
+
+
+def previous_oemdre_sv(report, log_payload, sv_count, size_header):
+  """qcomgpsd's OEMDRE satellites before unpack_array, one dict_unpacker call and setattr per field"""
+  report.init('sv', sv_count)
+  sats = log_payload[size_header:]
+  for i in range(sv_count):
+    sat = unpack_oemdre_meas_sv(sats[size_oemdre_meas_sv*i:size_oemdre_meas_sv*(i+1)])
+    sv = report.sv[i]
+    sv.init('measurementStatus')
+    for k,v in sat.items():
+      if k in ["unkn", "measurementStatus2"]:
+        pass
+      elif k == "multipathEstimateValid":
+        sv.measurementStatus.multipathEstimateIsValid = bool(v)
+      elif k == "directionValid":
+        sv.measurementStatus.directionIsValid = bool(v)
+      elif k == "goodParity":
+        setattr(sv, k, bool(v))
+      elif k == "measurementStatus":
+        for kk,vv in measurementStatusFields.items():
+          setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+      else:
+        setattr(sv, k, v)
+
+
+def previous_measurement_sv(report, log_payload, sv_count, size_header, sv_layout, source_status_fields):
+  """qcomgpsd's GPS and GLONASS satellites before unpack_array"""
+  unpack_meas_sv, size_meas_sv = meas_sv_unpackers[id(sv_layout)]
+  measurement_status_fields = (measurementStatusFields.items(), source_status_fields.items())
+  sats = log_payload[size_header:]
+  report.init('sv', sv_count)
+  if sv_count > 0:
+    assert len(sats)//sv_count == size_meas_sv
+    for i in range(sv_count):
+      sv = report.sv[i]
+      sv.init('measurementStatus')
+      sat = unpack_meas_sv(sats[size_meas_sv*i:size_meas_sv*(i+1)])
+      for k,v in sat.items():
+        if k == "parityErrorCount":
+          sv.gpsParityErrorCount = v
+        elif k == "frequencyIndex":
+          sv.glonassFrequencyIndex = v
+        elif k == "hemmingErrorCount":
+          sv.glonassHemmingErrorCount = v
+        elif k == "measurementStatus":
+          for kk,vv in itertools.chain(*measurement_status_fields):
+            setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+        elif k == "miscStatus":
+          for kk,vv in miscStatusFields.items():
+            setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+        elif k == "pad":
+          pass
+        else:
+          setattr(sv, k, v)
+
+
+# report type, header layout, satellite layout, how qcomgpsd filled the sv list before and how it does now
+REPORTS = {
+  "gps": (log.QcomGnss.MeasurementReport, gps_measurement_report, gps_measurement_report_sv,
+          lambda report, payload, n, size: previous_measurement_sv(report, payload, n, size, gps_measurement_report_sv, measurementStatusGPSFields),
+          lambda dt: (dt, *measurement_sv_mapping(dt, measurementStatusGPSFields), ())),
+  "glonass": (log.QcomGnss.MeasurementReport, glonass_measurement_report, glonass_measurement_report_sv,
+              lambda report, payload, n, size: previous_measurement_sv(report, payload, n, size, glonass_measurement_report_sv,
+                                                                       measurementStatusGlonassFields),
+              lambda dt: (dt, *measurement_sv_mapping(dt, measurementStatusGlonassFields), ())),
+  "oemdre": (log.QcomGnss.DrMeasurementReport, oemdre_measurement_report, oemdre_measurement_report_sv, previous_oemdre_sv,
+             lambda dt: (dt, *oemdre_sv_mapping(dt), ("goodParity",))),
+}
+
+
+def values(v):
+  """Plain values of a report, enums as their raw number since random payloads hold values the schema has no name for"""
+  if isinstance(v, capnp.lib.capnp._DynamicStructBuilder):
+    return {k: values(getattr(v, k)) for k in v.schema.fieldnames}
+  if isinstance(v, capnp.lib.capnp._DynamicListBuilder):
+    return [values(x) for x in v]
+  if isinstance(v, capnp.lib.capnp._DynamicEnum):
+    return v.raw
+  return v
+
+
+def same(a, b):
+  if isinstance(a, dict):
+    return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+  if isinstance(a, list):
+    return isinstance(b, list) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b, strict=True))
+  if isinstance(a, float) and math.isnan(a):
+    return isinstance(b, float) and math.isnan(b)
+  return type(a) is type(b) and a == b
+
+
+def random_payload(rng, size_header, sv_dtype, n):
+  """
+  Random header and satellites. OEMDRE's observationState is 32 bits in the report and a 16 bit enum in the schema,
+  the firmware only sends small states, so it is kept in the enum's range like both paths need.
+  """
+  payload = bytearray(rng.bytes(size_header + sv_dtype.itemsize * n))
+  sats = np.frombuffer(payload, dtype=sv_dtype, count=n, offset=size_header)
+  sats["observationState"] = rng.integers(0, 1 << 16, n)
+  return bytes(payload)
+
+
+def check_sv(rng, payloads):
+  checked = 0
+  for name, (report_type, header, sv_layout, previous, mapping) in REPORTS.items():
+    size_header = struct_dtype(header, True).itemsize
+    sv_dtype, fields, status, bool_fields = mapping(struct_dtype(sv_layout, True))
+    for n in SV_COUNTS:
+      for _ in range(payloads):
+        payload = random_payload(rng, size_header, sv_dtype, n)
+        before, after = report_type.new_message(), report_type.new_message()
+        previous(before, payload, n, size_header)
+        after.sv = sv_dicts(unpack_array(sv_dtype, payload, n, offset=size_header), fields, bool_fields, status)
+        assert same(values(before), values(after)), f"{name} satellites differ for {payload.hex()}"
+        checked += 1
+  return checked
+
+
+def check_headers(rng, payloads):
+  checked = 0
+  for layout, camelcase in ((position_report, False), (oemdre_svpoly_report, True), (oemdre_measurement_report, True),
+                            (gps_measurement_report, True), (glonass_measurement_report, True)):
+    unpack, size = dict_unpacker(layout, camelcase)
+    unpack_dtype, size_dtype = dtype_unpacker(layout, camelcase)
+    assert size == size_dtype
+    for _ in range(payloads):
+      payload = rng.bytes(size)
+      assert same(relist(unpack(payload)), unpack_dtype(payload)), f"header differs for {payload.hex()}"
+      checked += 1
+  return checked
+
+
+def time_sv(name, n, reports):
+  report_type, header, sv_layout, previous, mapping = REPORTS[name]
+  size_header = struct_dtype(header, True).itemsize
+  sv_dtype, fields, status, bool_fields = mapping(struct_dtype(sv_layout, True))
+  payload = random_payload(np.random.default_rng(0), size_header, sv_dtype, n)
+
+  t = time.perf_counter()
+  for _ in range(reports):
+    previous(report_type.new_message(), payload, n, size_header)
+  before = (time.perf_counter() - t) / reports
+
+  t = time.perf_counter()
+  for _ in range(reports):
+    report_type.new_message().sv = sv_dicts(unpack_array(sv_dtype, payload, n, offset=size_header), fields, bool_fields, status)
+  after = (time.perf_counter() - t) / reports
+  return before, after
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Checks on random payloads that the GPS, GLONASS and OEMDRE satellite lists and the report headers "
+                                               "qcomgpsd builds with struct_dtype/unpack_array are the same as with dict_unpacker, and times both",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--payloads", type=int, default=200, help="random payloads per report type and satellite count")
+  parser.add_argument("--reports", type=int, default=500, help="reports per timing")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(args.seed)
+  print(f"satellite lists identical on {check_sv(rng, args.payloads)} payloads, headers identical on {check_headers(rng, args.payloads)} payloads")
+
+  print(f"{'report':<8} {'sats':>5} {'before us':>10} {'after us':>10} {'speedup':>8}")
+  for name in REPORTS:
+    for n in SV_COUNTS[1:]:
+      before, after = time_sv(name, n, args.reports)
+      print(f"{name:<8} {n:>5} {before * 1e6:10.1f} {after * 1e6:10.1f} {before / after:7.1f}x")
@@ -18,15 +18,18 @@ class LiveStreamVideoStreamTrack(TiciVideoStreamTrack):
     dt = DT_DMON if camera_type == "driver" else DT_MDL
     super().__init__(camera_type, dt)
 
-    self._sock = messaging.sub_sock(self.camera_to_sock_mapping[camera_type], conflate=True)
+    self._poller = messaging.Poller()
+    self._sock = messaging.sub_sock(self.camera_to_sock_mapping[camera_type], poller=self._poller, conflate=True)
     self._pts = 0
 
   async def recv(self):
+    loop = asyncio.get_running_loop()
     while True:
       msg = messaging.recv_one_or_none(self._sock)
       if msg is not None:
         break
-      await asyncio.sleep(0.005)
+      # wait for the next frame off the event loop, poll releases the GIL
+      await loop.run_in_executor(None, self._poller.poll, 100)
 
     evta = getattr(msg, msg.which())
 
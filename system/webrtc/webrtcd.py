@@ -3,6 +3,8 @@
 import argparse
 import asyncio
 import json
+import math
+import time
 import uuid
 import logging
 from dataclasses import dataclass, field
@@ -21,9 +23,36 @@ from openpilot.system.webrtc.schema import generate_field
 from cereal import messaging, log
 
 
+BRIDGE_ENCODINGS = ("json", "capnp")
+BRIDGE_POLL_TIMEOUT_MS = 100
+
+
+@dataclass
+class OutgoingServiceOptions:
+  fields: list[str] | None = None  # top level fields of the service to send, all if None
+  max_rate: float | None = None  # Hz, every message if None
+
+
 class CerealOutgoingMessageProxy:
-  def __init__(self, sm: messaging.SubMaster):
-    self.sm = sm
+  """
+  Forwards cereal services to data channels. Each message is encoded once for all channels,
+  either as json of the (optionally projected) service struct or as the raw capnp event.
+  """
+  def __init__(self, services: list[str], options: dict[str, OutgoingServiceOptions] | None = None, encoding: str = "json"):
+    assert encoding in BRIDGE_ENCODINGS, f"Invalid bridge encoding: {encoding}"
+    self.encoding = encoding
+    self.options = {s: (options or {}).get(s, OutgoingServiceOptions()) for s in services}
+    for s, o in self.options.items():
+      if o.fields is not None:
+        service_fields = generate_field(log.Event.schema.fields[s])
+        assert isinstance(service_fields, dict) and all(f in service_fields for f in o.fields), f"Invalid fields for {s}: {o.fields}"
+    self.min_dt = {s: 1. / o.max_rate if o.max_rate else 0. for s, o in self.options.items()}
+    self.last_sent = {s: 0. for s in services}
+    # latest message of each rate limited service that arrived before it was due
+    self.pending: dict[str, bytes] = {}
+
+    self.poller = messaging.Poller()
+    self.sock = {s: messaging.sub_sock(s, poller=self.poller, conflate=True) for s in services}
     self.channels: list[RTCDataChannel] = []
 
   def add_channel(self, channel: 'RTCDataChannel'):
@@ -41,16 +70,48 @@ class CerealOutgoingMessageProxy:
 
     return msg_dict
 
+  def next_due(self) -> float | None:
+    """Seconds until the first pending message may be sent, None if nothing is pending"""
+    if not self.pending:
+      return None
+    return max(min(self.last_sent[s] + self.min_dt[s] for s in self.pending) - time.monotonic(), 0.)
+
+  def wait(self, timeout: int = BRIDGE_POLL_TIMEOUT_MS) -> bool:
+    """Blocks until any service has a new message or a pending one is due, releases the GIL so it can run in an executor"""
+    due = self.next_due()
+    if due is not None:
+      timeout = min(timeout, math.ceil(due * 1000))
+    return len(self.poller.poll(timeout)) > 0 or due is not None
+
+  def encode(self, service: str, dat: bytes) -> bytes:
+    if self.encoding == "capnp":
+      return dat
+
+    evt = messaging.log_from_bytes(dat)
+    msg_content = getattr(evt, service)
+    fields = self.options[service].fields
+    if fields is None:
+      msg_dict = self.to_json(msg_content)
+    else:
+      # only convert the requested fields instead of the whole struct
+      msg_dict = {f: self.to_json(getattr(msg_content, f)) for f in fields}
+    outgoing_msg = {"type": service, "logMonoTime": evt.logMonoTime, "valid": evt.valid, "data": msg_dict}
+    return json.dumps(outgoing_msg).encode()
+
   def update(self):
-    # this is blocking in async context...
-    self.sm.update(0)
-    for service, updated in self.sm.updated.items():
-      if not updated:
+    """Sends the latest message of each service that is due, never blocks"""
+    for service, sock in self.sock.items():
+      dat = sock.receive(non_blocking=True)
+      if dat is not None:
+        self.pending[service] = dat
+
+    now = time.monotonic()
+    for service in list(self.pending):
+      if now - self.last_sent[service] < self.min_dt[service]:
         continue
-      msg_dict = self.to_json(self.sm[service])
-      mono_time, valid = self.sm.logMonoTime[service], self.sm.valid[service]
-      outgoing_msg = {"type": service, "logMonoTime": mono_time, "valid": valid, "data": msg_dict}
-      encoded_msg = json.dumps(outgoing_msg).encode()
+
+      self.last_sent[service] = now
+      encoded_msg = self.encode(service, self.pending.pop(service))
       for channel in self.channels:
         channel.send(encoded_msg)
 
@@ -91,15 +152,18 @@ class CerealProxyRunner:
   async def run(self):
     from aiortc.exceptions import InvalidStateError
 
+    loop = asyncio.get_running_loop()
     while True:
       try:
-        self.proxy.update()
+        # wait for new messages off the event loop, then forward them on it
+        if await loop.run_in_executor(None, self.proxy.wait):
+          self.proxy.update()
       except InvalidStateError:
         self.logger.warning("Cereal outgoing proxy invalid state (connection closed)")
         break
       except Exception:
         self.logger.exception("Cereal outgoing proxy failure")
-      await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
 
 
 class DynamicPubMaster(messaging.PubMaster):
@@ -117,7 +181,8 @@ class DynamicPubMaster(messaging.PubMaster):
 class StreamSession:
   shared_pub_master = DynamicPubMaster([])
 
-  def __init__(self, sdp: str, cameras: list[str], incoming_services: list[str], outgoing_services: list[str], debug_mode: bool = False):
+  def __init__(self, sdp: str, cameras: list[str], incoming_services: list[str], outgoing_services: list[str], debug_mode: bool = False,
+               outgoing_options: dict[str, OutgoingServiceOptions] | None = None, outgoing_encoding: str = "json"):
     from aiortc.mediastreams import VideoStreamTrack, AudioStreamTrack
     from aiortc.contrib.media import MediaBlackhole
     from openpilot.system.webrtc.device.video import LiveStreamVideoStreamTrack
@@ -149,7 +214,7 @@ class StreamSession:
     if len(incoming_services) > 0:
       self.incoming_bridge = CerealIncomingMessageProxy(self.shared_pub_master)
     if len(outgoing_services) > 0:
-      self.outgoing_bridge = CerealOutgoingMessageProxy(messaging.SubMaster(outgoing_services))
+      self.outgoing_bridge = CerealOutgoingMessageProxy(outgoing_services, outgoing_options, outgoing_encoding)
       self.outgoing_bridge_runner = CerealProxyRunner(self.outgoing_bridge)
 
     self.audio_output: AudioOutputSpeaker | MediaBlackhole | None = None
@@ -217,6 +282,34 @@ class StreamRequestBody:
   cameras: list[str]
   bridge_services_in: list[str] = field(default_factory=list)
   bridge_services_out: list[str] = field(default_factory=list)
+  # per outgoing service {"fields": [...], "max_rate": Hz}, both optional
+  bridge_services_out_options: dict[str, dict[str, Any]] = field(default_factory=dict)
+  bridge_encoding: str = "json"
+
+
+def parse_outgoing_options(services: list[str], raw_options: Any, encoding: str) -> dict[str, OutgoingServiceOptions]:
+  """Validates bridge_services_out_options and bridge_encoding, raises ValueError on anything the bridge can't honor"""
+  if encoding not in BRIDGE_ENCODINGS:
+    raise ValueError(f"Invalid bridge encoding: {encoding}")
+  if not isinstance(raw_options, dict):
+    raise ValueError("bridge_services_out_options must be an object")
+
+  options = {}
+  for service, raw in raw_options.items():
+    if service not in services:
+      raise ValueError(f"Options for {service}, which is not in bridge_services_out")
+    if not isinstance(raw, dict) or not set(raw) <= {"fields", "max_rate"}:
+      raise ValueError(f"Invalid options for {service}: {raw}")
+
+    fields, max_rate = raw.get("fields"), raw.get("max_rate")
+    if fields is not None:
+      service_fields = generate_field(log.Event.schema.fields[service])
+      if not isinstance(fields, list) or not isinstance(service_fields, dict) or not all(isinstance(f, str) and f in service_fields for f in fields):
+        raise ValueError(f"Invalid fields for {service}: {fields}")
+    if max_rate is not None and (isinstance(max_rate, bool) or not isinstance(max_rate, (int, float)) or not max_rate > 0):
+      raise ValueError(f"Invalid max_rate for {service}: {max_rate}")
+    options[service] = OutgoingServiceOptions(fields, max_rate)
+  return options
 
 
 async def get_stream(request: 'web.Request'):
@@ -224,7 +317,12 @@ async def get_stream(request: 'web.Request'):
   raw_body = await request.json()
   body = StreamRequestBody(**raw_body)
 
-  session = StreamSession(body.sdp, body.cameras, body.bridge_services_in, body.bridge_services_out, debug_mode)
+  try:
+    outgoing_options = parse_outgoing_options(body.bridge_services_out, body.bridge_services_out_options, body.bridge_encoding)
+  except ValueError as e:
+    raise web.HTTPBadRequest(text=str(e)) from e
+  session = StreamSession(body.sdp, body.cameras, body.bridge_services_in, body.bridge_services_out, debug_mode,
+                          outgoing_options, body.bridge_encoding)
   answer = await session.get_answer()
   session.start()
 
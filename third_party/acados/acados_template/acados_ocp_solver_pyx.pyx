@@ -45,6 +45,10 @@ import os
 from datetime import datetime
 import numpy as np
 
+# fields that can be set / read for all stages at once
+BULK_OUT_FIELDS = ['x', 'u', 'pi', 'lam', 't', 'sl', 'su']
+BULK_COST_FIELDS = ['yref']
+
 
 cdef class AcadosOcpSolverCython:
     """
@@ -67,9 +71,13 @@ cdef class AcadosOcpSolverCython:
 
     cdef str nlp_solver_type
 
+    # per stage dimensions of the fields supported by set_all / get_all
+    cdef dict stage_dims
+
     def __cinit__(self, model_name, nlp_solver_type, N):
 
         self.solver_created = False
+        self.stage_dims = {}
 
         self.N = N
         self.model_name = model_name
@@ -85,6 +93,10 @@ cdef class AcadosOcpSolverCython:
         # get pointers solver
         self.__get_pointers_solver()
 
+        # cache dimensions of the fields used every iteration
+        for field_ in ('x', 'u', 'yref'):
+            self.__get_stage_dims(field_)
+
 
     def __get_pointers_solver(self):
         """
@@ -100,6 +112,123 @@ cdef class AcadosOcpSolverCython:
         self.nlp_solver = acados_solver.acados_get_nlp_solver(self.capsule)
 
 
+    def __get_stage_dims(self, str field_):
+        """
+        Private function returning the dimension of field at every stage, computed once per solver
+        """
+        cdef list dims = self.stage_dims.get(field_)
+        if dims is not None:
+            return dims
+
+        if field_ not in BULK_OUT_FIELDS + BULK_COST_FIELDS:
+            raise Exception('AcadosOcpSolverCython: {} is not supported for all stages.\
+                \n Possible values are {}.'.format(field_, BULK_OUT_FIELDS + BULK_COST_FIELDS + ['p']))
+
+        field = field_.encode('utf-8')
+        cdef int stage
+        cdef int cost_dims[2]
+        # pi only exists on the N shooting intervals
+        cdef int n_stages = self.N if field_ == 'pi' else self.N + 1
+
+        dims = []
+        for stage in range(n_stages):
+            if field_ in BULK_COST_FIELDS:
+                acados_solver_common.ocp_nlp_cost_dims_get_from_attr(self.nlp_config, \
+                    self.nlp_dims, self.nlp_out, stage, field, &cost_dims[0])
+                dims.append(cost_dims[0])
+            else:
+                dims.append(acados_solver_common.ocp_nlp_dims_get_from_attr(self.nlp_config, \
+                    self.nlp_dims, self.nlp_out, stage, field))
+
+        self.stage_dims[field_] = dims
+        return dims
+
+
+    def set_all(self, str field_, values_):
+        """
+        Set numerical data for consecutive shooting nodes, starting at stage 0, in one call.
+
+            :param field: string in ['x', 'u', 'pi', 'lam', 't', 'sl', 'su', 'yref', 'p']
+            :param values: 2D array with one row per stage
+
+            .. note:: the number of columns must match the largest dimension of field over the set stages.
+                      Stages with a smaller dimension (e.g. yref at the terminal node) use the leading
+                      entries of their row.
+        """
+        if not isinstance(values_, np.ndarray):
+            raise Exception(f"set_all: values must be numpy array, got {type(values_)}.")
+
+        cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] values = np.ascontiguousarray(values_, dtype=np.float64)
+        cdef int n_stages = values.shape[0]
+        cdef int n_cols = values.shape[1]
+        cdef int stage
+
+        field = field_.encode('utf-8')
+        cdef const char *c_field = field
+
+        if n_stages > self.N + 1:
+            raise Exception('AcadosOcpSolverCython.set_all(): got {} stages, solver has {}.'.format(n_stages, self.N + 1))
+
+        # treat parameters separately, dimensions are checked by acados_update_params
+        if field_ == 'p':
+            for stage in range(n_stages):
+                assert acados_solver.acados_update_params(self.capsule, stage, &values[stage, 0], n_cols) == 0
+            return
+
+        cdef list dims = self.__get_stage_dims(field_)
+        if n_stages > len(dims) or n_cols != max(dims[:n_stages]):
+            msg = 'AcadosOcpSolverCython.set_all(): mismatching dimension for field "{}" '.format(field_)
+            msg += 'with dimensions {} (you have {})'.format(dims, (n_stages, n_cols))
+            raise Exception(msg)
+
+        if field_ in BULK_COST_FIELDS:
+            for stage in range(n_stages):
+                acados_solver_common.ocp_nlp_cost_model_set(self.nlp_config,
+                    self.nlp_dims, self.nlp_in, stage, c_field, <void *> &values[stage, 0])
+        else:
+            for stage in range(n_stages):
+                acados_solver_common.ocp_nlp_out_set(self.nlp_config,
+                    self.nlp_dims, self.nlp_out, stage, c_field, <void *> &values[stage, 0])
+
+
+    def get_all(self, str field_, out_=None):
+        """
+        Get the last solution of the solver for consecutive shooting nodes, starting at stage 0, in one call.
+
+            :param field: string in ['x', 'u', 'pi', 'lam', 't', 'sl', 'su']
+            :param out: optional C-contiguous float64 2D array filled in place, one row per stage.
+                        Defaults to a new array covering every stage where field exists.
+
+            .. note:: rows of stages where field has a smaller dimension (e.g. u at the terminal node)
+                      are left untouched past that dimension.
+        """
+        if field_ not in BULK_OUT_FIELDS:
+            raise Exception('AcadosOcpSolverCython.get_all(): {} is an invalid argument.\
+                    \n Possible values are {}.'.format(field_, BULK_OUT_FIELDS))
+
+        cdef list dims = self.__get_stage_dims(field_)
+        if out_ is None:
+            out_ = np.zeros((len(dims), max(dims)))
+
+        cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] out = out_
+        cdef int n_stages = out.shape[0]
+        cdef int stage
+
+        if n_stages > len(dims) or out.shape[1] != max(dims[:n_stages]):
+            msg = 'AcadosOcpSolverCython.get_all(): mismatching dimension for field "{}" '.format(field_)
+            msg += 'with dimensions {} (you have {})'.format(dims, (n_stages, out.shape[1]))
+            raise Exception(msg)
+
+        field = field_.encode('utf-8')
+        cdef const char *c_field = field
+
+        for stage in range(n_stages):
+            acados_solver_common.ocp_nlp_out_get(self.nlp_config, \
+                self.nlp_dims, self.nlp_out, stage, c_field, <void *> &out[stage, 0])
+
+        return out_
+
+
     def solve_for_x0(self, x0_bar):
         """
         Wrapper around `solve()` which sets initial state constraint, solves the OCP, and returns u0.
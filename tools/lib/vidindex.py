@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import argparse
+import io
+import mmap
 import os
 import struct
+from contextlib import contextmanager
 from enum import IntEnum
 
+import numpy as np
+
 from openpilot.tools.lib.filereader import FileReader
 
 DEBUG = int(os.getenv("DEBUG", "0"))
@@ -166,6 +171,14 @@ def get_hevc_nal_unit_length(dat: bytes, nal_unit_start: int) -> int:
     print("  nal_unit_len:", nal_unit_len)
   return nal_unit_len
 
+def get_hevc_nal_unit_starts(dat) -> np.ndarray:
+  # find every start code in one pass: each 0x01 byte that is preceded by two 0x00 bytes.
+  # start codes can't overlap and emulation prevention keeps them out of NAL unit payloads,
+  # so this matches walking the stream with get_hevc_nal_unit_length
+  buf = np.frombuffer(dat, dtype=np.uint8)
+  ones = np.flatnonzero(buf[NAL_UNIT_START_CODE_SIZE - 1:] == NAL_UNIT_START_CODE[-1])
+  return ones[(buf[ones] == 0x00) & (buf[ones + 1] == 0x00)]
+
 def get_hevc_nal_unit_type(dat: bytes, nal_unit_start: int) -> HevcNalUnitType:
   # 7.3.1.2 NAL unit header syntax
   # nal_unit_header( ) {    // descriptor
@@ -258,38 +271,52 @@ def get_hevc_slice_type(dat: bytes, nal_unit_start: int, nal_unit_type: HevcNalU
     raise VideoFileInvalid("slice_type must be 0, 1, or 2")
   return slice_type, is_first_slice
 
-def hevc_index(hevc_file_name: str, allow_corrupt: bool=False) -> tuple[list, int, bytes]:
+@contextmanager
+def open_hevc_data(hevc_file_name: str):
   with FileReader(hevc_file_name) as f:
-    dat = f.read()
+    if isinstance(f, io.BufferedReader) and os.fstat(f.fileno()).st_size > 0:
+      # local files are memory-mapped instead of being copied into memory
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dat:
+        yield dat
+    else:
+      yield f.read()
 
+def hevc_index(hevc_file_name: str, allow_corrupt: bool=False) -> tuple[list, int, bytes]:
+  with open_hevc_data(hevc_file_name) as dat:
+    return _hevc_index(dat, allow_corrupt)
+
+def _hevc_index(dat, allow_corrupt: bool) -> tuple[list, int, bytes]:
   if len(dat) < NAL_UNIT_START_CODE_SIZE + 1:
     raise VideoFileInvalid("data is too short")
 
   if dat[0] != 0x00:
     raise VideoFileInvalid("first byte must be 0x00")
 
-  prefix_dat = b""
+  prefix_dat = []
   frame_types = list()
 
+  nal_unit_starts = get_hevc_nal_unit_starts(dat).tolist()
+  nal_unit_ends = nal_unit_starts[1:] + [len(dat)]
+
   i = 1 # skip past first byte 0x00
   try:
-    while i < len(dat):
-      require_nal_unit_start(dat, i)
-      nal_unit_len = get_hevc_nal_unit_length(dat, i)
+    require_nal_unit_start(dat, i)
+    for i, nal_unit_end in zip(nal_unit_starts, nal_unit_ends, strict=True):
+      if DEBUG:
+        print("  nal_unit_len:", nal_unit_end - i)
       nal_unit_type = get_hevc_nal_unit_type(dat, i)
       if nal_unit_type in HEVC_PARAMETER_SET_NAL_UNITS:
-        prefix_dat += dat[i:i+nal_unit_len]
+        prefix_dat.append(dat[i:nal_unit_end])
       elif nal_unit_type in HEVC_CODED_SLICE_SEGMENT_NAL_UNITS:
         slice_type, is_first_slice = get_hevc_slice_type(dat, i, nal_unit_type)
         if is_first_slice:
           frame_types.append((slice_type, i))
-      i += nal_unit_len
   except Exception as e:
     if not allow_corrupt:
       raise
     print(f"ERROR: NAL unit skipped @ {i}\n", str(e))
 
-  return frame_types, len(dat), prefix_dat
+  return frame_types, len(dat), b"".join(prefix_dat)
 
 def main() -> None:
   parser = argparse.ArgumentParser()
@@ -0,0 +1,185 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import cereal.messaging as messaging
+from cereal import car, log
+from openpilot.common.realtime import DT_MDL
+from openpilot.selfdrive.controls.lib.longcontrol import LongCtrlState
+from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import A_CHANGE_COST, DANGER_ZONE_COST, J_EGO_COST, LEAD_ACCEL_TAU
+from openpilot.selfdrive.controls.lib.longitudinal_planner import LongitudinalPlanner
+from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_acceleration import FrogPilotAcceleration
+from openpilot.selfdrive.frogpilot.controls.lib.frogpilot_following import FrogPilotFollowing
+from openpilot.selfdrive.modeld.constants import ModelConstants
+
+
+def get_sim_car_params():
+  CP = car.CarParams.new_message()
+  CP.openpilotLongitudinalControl = True
+  CP.steerRatio = 15.38
+  CP.wheelbase = 2.7
+  CP.longitudinalActuatorDelay = 0.15
+  CP.vEgoStopping = 0.5
+  return CP
+
+
+class Plant:
+  """
+  Closes the loop around LongitudinalPlanner: the ego follows the planned acceleration exactly
+  and the lead follows the scenario speed profile. Stands in for FrogPilotPlanner towards
+  FrogPilotFollowing and FrogPilotAcceleration so tuning toggles apply as on the road.
+  """
+  def __init__(self, scenario, mpc=None):
+    self.scenario = scenario
+    self.toggles = SimpleNamespace(**scenario.get_toggles())
+    self.ts = DT_MDL
+
+    if mpc is not None:
+      mpc.reset()
+    self.planner = LongitudinalPlanner(get_sim_car_params(), init_v=scenario.initial_speed, mpc=mpc)
+
+    # attributes read by the FrogPilot helpers from their planner
+    self.lead_one = log.RadarState.LeadData.new_message()
+    self.tracking_lead = False
+    self.v_cruise = 0.0
+    self.frogpilot_following = FrogPilotFollowing(self)
+    self.frogpilot_acceleration = FrogPilotAcceleration(self)
+
+    self.t = 0.0
+    self.speed = scenario.initial_speed
+    self.acceleration = 0.0
+    self.distance = 0.0
+    self.distance_lead = scenario.initial_distance_lead
+    self.v_lead_prev = scenario.lead_speed(0.0)
+    self.lead_visible = scenario.lead_visible(0.0)
+
+  def step(self):
+    scenario = self.scenario
+    v_lead = scenario.lead_speed(self.t)
+    v_cruise = scenario.cruise_speed(self.t)
+
+    lead_visible = scenario.lead_visible(self.t)
+    if lead_visible and not self.lead_visible:
+      # a new lead, starting from its logged gap and without the speed jump from the previous one
+      lead_distance = scenario.lead_distance(self.t)
+      if lead_distance is not None:
+        self.distance_lead = self.distance + lead_distance
+      self.v_lead_prev = v_lead
+    self.lead_visible = lead_visible
+
+    a_lead = (v_lead - self.v_lead_prev) / self.ts
+    self.v_lead_prev = v_lead
+
+    lead = self.lead_one
+    lead.status = lead_visible and scenario.lead_prob > 0.5
+    lead.dRel = float(max(0., self.distance_lead - self.distance)) if lead_visible else 200.
+    lead.vRel = float(v_lead - self.speed) if lead_visible else 0.
+    lead.aRel = float(a_lead - self.acceleration)
+    lead.vLead = float(v_lead)
+    lead.vLeadK = float(v_lead)
+    lead.aLeadK = float(a_lead)
+    lead.aLeadTau = float(LEAD_ACCEL_TAU)
+    lead.modelProb = float(scenario.lead_prob if lead_visible else 0.)
+
+    radar = messaging.new_message('radarState')
+    radar.radarState.leadOne = lead
+    radar.radarState.leadTwo = log.RadarState.LeadData.new_message()
+
+    # the model is not simulated, its plan is a constant extrapolation of ego speed
+    model = messaging.new_message('modelV2').modelV2
+    model.position.x = [float((self.speed + 0.5) * t) for t in ModelConstants.T_IDXS]
+    model.velocity.x = [float(self.speed + 0.5)] * ModelConstants.IDX_N
+    model.acceleration.x = [0.0] * ModelConstants.IDX_N
+
+    control = messaging.new_message('controlsState')
+    control.controlsState.enabled = scenario.enabled
+    control.controlsState.longControlState = LongCtrlState.pid if scenario.enabled else LongCtrlState.off
+    control.controlsState.vCruise = float(v_cruise * 3.6)
+    control.controlsState.experimentalMode = scenario.e2e
+    control.controlsState.personality = scenario.personality
+
+    car_state = messaging.new_message('carState')
+    car_state.carState.vEgo = float(self.speed)
+    car_state.carState.aEgo = float(self.acceleration)
+    car_state.carState.standstill = self.speed < 0.01
+
+    frogpilot_car_state = messaging.new_message('frogpilotCarState')
+    frogpilot_car_state.frogpilotCarState.trafficModeActive = scenario.traffic_mode
+
+    # what FrogPilotPlanner would have published for this frame
+    self.tracking_lead = bool(lead.status)
+    self.v_cruise = v_cruise
+    self.frogpilot_following.update(self.acceleration, control.controlsState, frogpilot_car_state.frogpilotCarState,
+                                    lead.dRel, self.speed, v_lead, self.toggles)
+    self.frogpilot_acceleration.update(control.controlsState, frogpilot_car_state.frogpilotCarState, v_cruise, self.speed, self.toggles)
+
+    frogpilot_plan = messaging.new_message('frogpilotPlan')
+    fp = frogpilot_plan.frogpilotPlan
+    fp.accelerationJerk = float(A_CHANGE_COST * self.frogpilot_following.acceleration_jerk)
+    fp.dangerJerk = float(DANGER_ZONE_COST * self.frogpilot_following.danger_jerk)
+    fp.speedJerk = float(J_EGO_COST * self.frogpilot_following.speed_jerk)
+    fp.tFollow = float(self.frogpilot_following.t_follow)
+    fp.maxAcceleration = float(self.frogpilot_acceleration.max_accel)
+    fp.minAcceleration = float(self.frogpilot_acceleration.min_accel)
+    fp.vCruise = float(v_cruise)
+
+    sm = {'radarState': radar.radarState,
+          'carState': car_state.carState,
+          'carControl': car.CarControl.new_message(),
+          'controlsState': control.controlsState,
+          'liveParameters': log.LiveParametersData.new_message(),
+          'modelV2': model,
+          'frogpilotCarState': frogpilot_car_state.frogpilotCarState,
+          'frogpilotPlan': fp}
+    self.planner.update(False, False, sm, self.toggles)
+
+    mpc = self.planner.mpc
+    self.speed = max(self.planner.v_desired_filter.x, 0.)
+    self.acceleration = self.planner.a_desired if self.speed > 0. else 0.
+    self.distance += self.speed * self.ts
+    self.distance_lead += v_lead * self.ts
+    self.t += self.ts
+
+    return {
+      "gap": self.distance_lead - self.distance if lead_visible else None,
+      "speed": self.speed,
+      "acceleration": self.acceleration,
+      "solve_time": mpc.solve_time,
+      "solution_status": mpc.solution_status,
+      "fcw": self.planner.fcw,
+    }
+
+
+def run_scenario(scenario, mpc=None):
+  """
+  Runs a scenario to completion and returns its summary metrics.
+  """
+  assert scenario.duration > 0, f"{scenario.name}: duration must be positive"
+
+  start = time.monotonic()
+  plant = Plant(scenario, mpc=mpc)
+  steps = [plant.step() for _ in range(max(int(round(scenario.duration / plant.ts)), 1))]
+
+  accels = np.array([s["acceleration"] for s in steps])
+  jerks = np.diff(accels, prepend=accels[0]) / plant.ts
+  solve_times = np.array([s["solve_time"] for s in steps])
+  gaps = [s["gap"] for s in steps if s["gap"] is not None]
+  min_gap = float(min(gaps)) if gaps else None
+
+  return {
+    "name": scenario.name,
+    "sim_time": len(steps) * plant.ts,
+    "wall_time": time.monotonic() - start,
+    "min_gap": min_gap,
+    "crashed": min_gap is not None and min_gap <= 0.,
+    "final_speed": steps[-1]["speed"],
+    "min_accel": float(accels.min()),
+    "max_accel": float(accels.max()),
+    "max_jerk": float(np.abs(jerks).max()),
+    "rms_jerk": float(np.sqrt(np.mean(jerks ** 2))),
+    "mean_solve_time": float(solve_times.mean()),
+    "max_solve_time": float(solve_times.max()),
+    "solver_failures": sum(s["solution_status"] != 0 for s in steps),
+    "fcw_frames": sum(bool(s["fcw"]) for s in steps),
+  }
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from openpilot.tools.longitudinal_sim.scenario import load_scenarios, scenario_from_log
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+DEFAULT_SCENARIOS = os.path.join(SCENARIOS_DIR, "maneuvers.json")
+
+# one solver per worker process, reset between scenarios
+_worker_mpc = None
+
+
+def _init_worker():
+  global _worker_mpc
+  from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc import LongitudinalMpc
+  _worker_mpc = LongitudinalMpc()
+
+
+def _run(scenario):
+  from openpilot.tools.longitudinal_sim.plant import run_scenario
+  try:
+    return run_scenario(scenario, mpc=_worker_mpc)
+  except Exception as e:
+    return {"name": scenario.name, "error": repr(e)}
+
+
+def run_scenarios(scenarios, workers=None):
+  workers = min(workers or os.cpu_count() or 1, len(scenarios))
+  with Pool(workers, initializer=_init_worker) as pool:
+    results = list(pool.imap_unordered(_run, scenarios))
+  results.sort(key=lambda r: r["name"])
+  return results
+
+
+def format_result(r):
+  if "error" in r:
+    return f"{r['name']:<60} ERROR {r['error']}"
+  min_gap = f"{r['min_gap']:7.2f}" if r['min_gap'] is not None else "    n/a"
+  return (f"{r['name']:<60} {min_gap} {r['max_jerk']:8.2f} {r['rms_jerk']:8.2f} "
+          f"{r['mean_solve_time'] * 1e3:7.2f} {r['max_solve_time'] * 1e3:7.2f} {r['solver_failures']:5d} {r['fcw_frames']:4d}"
+          f"{'  CRASH' if r['crashed'] else ''}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Run longitudinal planner scenarios offline across a process pool",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("scenarios", nargs="*", default=[DEFAULT_SCENARIOS], help="scenario json files")
+  parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes, defaults to the number of CPUs")
+  parser.add_argument("--filter", default=None, help="only run scenarios whose name contains this")
+  parser.add_argument("--log", action="append", default=[], help="route or segment to replay the lead of, can be repeated")
+  parser.add_argument("--log-duration", type=float, default=None, help="truncate log scenarios to this many seconds")
+  parser.add_argument("--output", default=None, help="write per-scenario metrics as json")
+  args = parser.parse_args()
+
+  scenarios = [s for path in args.scenarios for s in load_scenarios(path)]
+  if args.log:
+    from openpilot.tools.lib.logreader import LogReader
+    scenarios += [scenario_from_log(LogReader(route), route, args.log_duration) for route in args.log]
+  if args.filter is not None:
+    scenarios = [s for s in scenarios if args.filter in s.name]
+  if not scenarios:
+    parser.error("no scenarios to run")
+
+  start = time.monotonic()
+  results = run_scenarios(scenarios, args.workers)
+  wall_time = time.monotonic() - start
+  sim_time = sum(r.get("sim_time", 0.) for r in results)
+
+  print(f"{'scenario':<60} {'min gap':>7} {'max jerk':>8} {'rms jerk':>8} {'solve ms':>7} {'max ms':>7} {'fails':>5} {'fcw':>4}")
+  for r in results:
+    print(format_result(r))
+  print(f"\n{len(results)} scenarios, {sim_time:.1f}s simulated in {wall_time:.1f}s ({sim_time / max(wall_time, 1e-9):.1f}x real time)")
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump(results, f, indent=2)
@@ -0,0 +1,182 @@
+import itertools
+import json
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+# Stock values of the toggles read by the longitudinal planner and FrogPilotFollowing / FrogPilotAcceleration,
+# scenarios override any of them under "toggles"
+DEFAULT_TOGGLES = {
+  "acceleration_profile": 0,
+  "deceleration_profile": 0,
+  "map_acceleration": False,
+  "map_deceleration": False,
+  "human_acceleration": False,
+  "human_following": False,
+  "conditional_slower_lead": False,
+  "taco_tune": False,
+  "increased_stopped_distance": 0,
+  "custom_personalities": False,
+  "aggressive_follow": 1.25,
+  "aggressive_jerk_acceleration": 0.5,
+  "aggressive_jerk_deceleration": 0.5,
+  "aggressive_jerk_danger": 0.5,
+  "aggressive_jerk_speed": 0.5,
+  "aggressive_jerk_speed_decrease": 0.5,
+  "standard_follow": 1.45,
+  "standard_jerk_acceleration": 1.0,
+  "standard_jerk_deceleration": 1.0,
+  "standard_jerk_danger": 0.5,
+  "standard_jerk_speed": 1.0,
+  "standard_jerk_speed_decrease": 1.0,
+  "relaxed_follow": 1.75,
+  "relaxed_jerk_acceleration": 1.0,
+  "relaxed_jerk_deceleration": 1.0,
+  "relaxed_jerk_danger": 0.5,
+  "relaxed_jerk_speed": 1.0,
+  "relaxed_jerk_speed_decrease": 1.0,
+  "traffic_mode_jerk_acceleration": [0.5, 0.5],
+  "traffic_mode_jerk_deceleration": [0.5, 0.5],
+  "traffic_mode_jerk_danger": [1.0, 1.0],
+  "traffic_mode_jerk_speed": [0.5, 0.5],
+  "traffic_mode_jerk_speed_decrease": [0.5, 0.5],
+  "traffic_mode_t_follow": [0.5, 1.0],
+}
+
+
+@dataclass
+class Scenario:
+  """
+  A lead and cruise speed profile to drive the longitudinal planner through.
+
+  Profiles are given as breakpoints in seconds and interpolated at the planner rate.
+  A scenario without lead_speeds has no lead car. lead_present optionally hides the lead from each
+  lead_t breakpoint until the next one, and lead_distances resets the gap whenever it shows up again.
+  """
+  name: str
+  duration: float
+  initial_speed: float = 0.0
+  initial_distance_lead: float = 200.0
+  lead_t: list[float] = field(default_factory=lambda: [0.0])
+  lead_speeds: list[float] | None = None
+  lead_prob: float = 1.0
+  lead_present: list[bool] | None = None
+  lead_distances: list[float] | None = None
+  cruise_t: list[float] = field(default_factory=lambda: [0.0])
+  cruise_speeds: list[float] = field(default_factory=lambda: [30.0])
+  personality: str = "standard"
+  traffic_mode: bool = False
+  e2e: bool = False
+  enabled: bool = True
+  toggles: dict = field(default_factory=dict)
+
+  @property
+  def has_lead(self):
+    return self.lead_speeds is not None
+
+  def lead_speed(self, t):
+    return float(np.interp(t, self.lead_t, self.lead_speeds)) if self.has_lead else 0.0
+
+  def lead_breakpoint(self, t):
+    return max(int(np.searchsorted(self.lead_t, t, side="right")) - 1, 0)
+
+  def lead_visible(self, t):
+    if not self.has_lead:
+      return False
+    return self.lead_present is None or bool(self.lead_present[self.lead_breakpoint(t)])
+
+  def lead_distance(self, t):
+    """The gap to a lead showing up at t, None to keep the simulated one"""
+    return float(self.lead_distances[self.lead_breakpoint(t)]) if self.lead_distances is not None else None
+
+  def cruise_speed(self, t):
+    return float(np.interp(t, self.cruise_t, self.cruise_speeds))
+
+  def get_toggles(self):
+    return {**DEFAULT_TOGGLES, **self.toggles}
+
+
+def expand_sweep(entry):
+  """
+  Expands the optional "sweep" key of a scenario entry, mapping fields to lists of values,
+  into one scenario per combination
+  """
+  entry = dict(entry)
+  sweep = entry.pop("sweep", {})
+  base = Scenario(**entry)
+  if not sweep:
+    return [base]
+
+  keys = list(sweep)
+  scenarios = []
+  for values in itertools.product(*(sweep[k] for k in keys)):
+    overrides = dict(zip(keys, values, strict=True))
+    suffix = ",".join(f"{k}={v}" for k, v in overrides.items())
+    toggles = {**base.toggles, **overrides.pop("toggles", {})}
+    scenarios.append(replace(base, name=f"{base.name}[{suffix}]", toggles=toggles, **overrides))
+  return scenarios
+
+
+def load_scenarios(path):
+  with open(path) as f:
+    entries = json.load(f)
+  return [scenario for entry in entries for scenario in expand_sweep(entry)]
+
+
+def scenario_from_log(lr, name, max_duration=None):
+  """
+  Builds a scenario replaying the lead speed, cruise speed and the stretches with and without a lead of a drive.
+  Each time a lead shows up the gap starts from the logged one.
+  """
+  t0 = None
+  initial_speed = None
+  initial_distance_lead = None
+  lead_t, lead_speeds, lead_present, lead_distances = [], [], [], []
+  cruise_t, cruise_speeds = [], []
+
+  for msg in lr:
+    which = msg.which()
+    if which not in ('carState', 'radarState', 'controlsState'):
+      continue
+
+    t0 = msg.logMonoTime if t0 is None else t0
+    t = (msg.logMonoTime - t0) * 1e-9
+    if max_duration is not None and t > max_duration:
+      break
+
+    if which == 'carState' and initial_speed is None:
+      initial_speed = msg.carState.vEgo
+    elif which == 'controlsState':
+      cruise_t.append(t)
+      cruise_speeds.append(msg.controlsState.vCruise / 3.6)
+    elif which == 'radarState':
+      lead = msg.radarState.leadOne
+      if lead.status:
+        if initial_distance_lead is None:
+          initial_distance_lead = lead.dRel
+        lead_t.append(t)
+        lead_speeds.append(lead.vLead)
+        lead_present.append(True)
+        lead_distances.append(lead.dRel)
+      elif not lead_present or lead_present[-1]:
+        # only where the lead disappears, the speed and gap are unused until the next lead shows up
+        lead_t.append(t)
+        lead_speeds.append(lead_speeds[-1] if lead_speeds else 0.0)
+        lead_present.append(False)
+        lead_distances.append(lead_distances[-1] if lead_distances else 200.0)
+
+  if not cruise_t:
+    raise ValueError("log has no controlsState messages")
+
+  return Scenario(
+    name=name,
+    duration=cruise_t[-1],
+    initial_speed=initial_speed or 0.0,
+    initial_distance_lead=initial_distance_lead if initial_distance_lead is not None else 200.0,
+    lead_t=lead_t if initial_distance_lead is not None else [0.0],
+    lead_speeds=lead_speeds if initial_distance_lead is not None else None,
+    lead_present=lead_present if initial_distance_lead is not None else None,
+    lead_distances=lead_distances if initial_distance_lead is not None else None,
+    cruise_t=cruise_t,
+    cruise_speeds=cruise_speeds,
+  )